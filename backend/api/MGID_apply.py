@@ -1,13 +1,15 @@
 from fastapi import Depends, HTTPException, APIRouter
+from fastapi.encoders import jsonable_encoder
 from sqlalchemy.orm import Session
 import warnings
-from database import word_crud, template_crud, models, schemas, MGID_crud
+from database import word_crud, template_crud, models, schemas, MGID_crud, MGID_registry_crud
 from database.base import SessionLocal, engine
-from common import constants, status, utils, error, auth
+from common import cache, constants, status, utils, error, auth
 from api import user
 import uvicorn, json
 from common import db
 import uuid
+from settings import settings
 
 router = APIRouter()
 
@@ -62,7 +64,13 @@ def create_MGID_apply_object(
     db_object = models.Object(
         template_id=constants.MGID_APPLY_TEMPLATE_ID, json_data=json_data
     )
-    obj = word_crud.create_object(db=db, db_object=db_object)
+    try:
+        obj = word_crud.create_object(db=db, db_object=db_object)
+    except error.DuplicateMGIDError as e:
+        return {
+            "status": status.API_ERR_CREATE_DUPLICATE_OBJECT,
+            "message": f"MGID {e.MGID} already exists",
+        }
     if obj is None:
         warnings.warn("Warning: Unable to create the word object.")
         return {
@@ -72,17 +80,45 @@ def create_MGID_apply_object(
     return {"status": status.API_OK, "data": obj}
 
 
+def _cache_MGID_result(MGID: str, obj: models.Object, kind: str):
+    # 外部申请的 MGID 为 external，本库数据为 internal
+    data_type = "external" if kind == MGID_registry_crud.KIND_APPLY else "internal"
+    result = jsonable_encoder({"type": data_type, "data": obj})
+    cache.MGID_cache.set(MGID, result, tags=(str(obj.id), str(obj.template_id)))
+    return result
+
+
 @router.get("/api/get_MGID/{MGID}/{custom}")
 def get_MGID(MGID: str, custom: str, db: Session = Depends(db.get_db)):
-    obj = MGID_crud.get_MGID(db, MGID=MGID + "/" + custom)
-    if obj is None:
-        data_type = "not_found"
+    key = MGID + "/" + custom
+    cached = cache.MGID_cache.get(key)
+    if cached is not None:
+        return cached
+    resolved = MGID_registry_crud.resolve(db, key)
+    if resolved is None:
         raise HTTPException(status_code=404, detail="MGID is not found")
-    elif str(obj.template_id) != constants.MGID_APPLY_TEMPLATE_ID:
-        data_type = "internal"
-    else:
-        data_type = "external"
-    return {"type": data_type, "data": obj}
+    return _cache_MGID_result(key, *resolved)
+
+
+@router.post("/api/get_MGID_batch")
+def get_MGID_batch(query: schemas.MGIDResolveQuery, db: Session = Depends(db.get_db)):
+    """批量解析：data 为 {MGID: 与 /api/get_MGID 相同的结果}，不存在的 MGID 为 null；未命中缓存的一次查询。"""
+    MGIDs = list(dict.fromkeys(query.MGIDs))
+    if len(MGIDs) > settings.MGID_RESOLVE_MAX_BATCH:
+        return {
+            "status": status.API_ERR_INVALID_INPUT,
+            "message": f"At most {settings.MGID_RESOLVE_MAX_BATCH} MGIDs per request",
+        }
+    results, missing = {}, []
+    for MGID in MGIDs:
+        cached = cache.MGID_cache.get(MGID)
+        if cached is None:
+            missing.append(MGID)
+        else:
+            results[MGID] = cached
+    for MGID, resolved in MGID_registry_crud.resolve_batch(db, missing).items():
+        results[MGID] = _cache_MGID_result(MGID, *resolved)
+    return {"status": status.API_OK, "data": {MGID: results.get(MGID) for MGID in MGIDs}}
 
 
 @router.post("/api/MGID_list")
@@ -92,14 +128,32 @@ def get_MGID_list(
     current_user: models.User = Depends(auth.get_current_active_user),
 ):
     current_user_name = current_user.user_name
-    db_MGID_list = MGID_crud.get_object_list(
+    db_MGID_list, next_cursor = MGID_crud.get_object_list(
                         db=db,
                         user=current_user_name,
                         template_id=constants.MGID_APPLY_TEMPLATE_ID,
                         start=query.start,
-                        size=query.size,)
+                        size=query.size,
+                        cursor=query.cursor,)
     # Always return status=0 so frontend stops spinner even if no user header
-    return {"status": status.API_OK, "data": db_MGID_list}
+    return {"status": status.API_OK, "data": db_MGID_list, "next_cursor": next_cursor}
+
+
+@router.post("/api/MGID_page")
+def get_MGID_page(
+    query: utils.ListQuery,
+    db: Session = Depends(db.get_db),
+    current_user: models.User = Depends(auth.get_current_active_user),
+):
+    page = MGID_crud.get_object_page(
+        db=db,
+        user=current_user.user_name,
+        template_id=constants.MGID_APPLY_TEMPLATE_ID,
+        start=query.start,
+        size=query.size,
+        cursor=query.cursor,
+    )
+    return {"status": status.API_OK, **page}
 
 
 @router.get("/api/MGID_count")
@@ -1,15 +1,23 @@
-from fastapi import Depends, HTTPException, APIRouter, Header
+from fastapi import Depends, HTTPException, APIRouter, Header, Request
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
-from common import constants, status, utils
+from common import cache, constants, password_hasher, reference_data, status, utils
 from common import auth
 from database import (
     admin_crud,
     country_crud,
+    search_crud,
     organization_crud,
+    serialnumber_crud,
     user_crud,
     models,
     schemas,
 )
+from settings import settings
+import codecs
+import csv
+import itertools
 from database.base import SessionLocal, engine
 import uvicorn
 from common import db
@@ -27,6 +35,24 @@ def whoami(current_user=Depends(auth.get_current_active_user)):
     return {"status": status.API_OK, "data": {"user_name": current_user.user_name, "user_type": getattr(current_user, "user_type", None)}}
 
 
+@router.get("/api/admin/cache_stats")
+def get_cache_stats(current_user=Depends(auth.require_roles(["admin", "super_admin"]))):
+    """公开接口响应缓存的命中 / 未命中等统计。"""
+    return {"status": status.API_OK, "data": cache.stats()}
+
+
+@router.get("/api/admin/search_stats")
+def get_search_stats(current_user=Depends(auth.require_roles(["admin", "super_admin"]))):
+    """统一检索并发执行的部分结果、超时类型、排队改串行次数。"""
+    return {"status": status.API_OK, "data": search_crud.stats()}
+
+
+@router.get("/api/admin/password_hash_stats")
+def get_password_hash_stats(current_user=Depends(auth.require_roles(["admin", "super_admin"]))):
+    """密码哈希线程池的排队深度、执行 / 等待耗时、拒绝次数。"""
+    return {"status": status.API_OK, "data": password_hasher.hasher.stats()}
+
+
 @router.post("/api/admin/words_list")
 def get_admin_words_list(
     query: utils.ListQuery,
@@ -34,21 +60,41 @@ def get_admin_words_list(
     db: Session = Depends(db.get_db),
 ):
     if query.status_filter == "all":
-        db_word_list = admin_crud.admin_words_list(
+        db_word_list, next_cursor = admin_crud.admin_words_list(
             db=db,
             word_template_id=constants.WORD_TEMPLATE_ID,
             start=query.start,
             size=query.size,
+            cursor=query.cursor,
         )
     else:
-        db_word_list = admin_crud.filter_words_list(
+        db_word_list, next_cursor = admin_crud.filter_words_list(
             db=db,
             word_template_id=constants.WORD_TEMPLATE_ID,
             status_filter=query.status_filter,
             start=query.start,
             size=query.size,
+            cursor=query.cursor,
         )
-    return {"status": status.API_OK, "data": db_word_list}
+    return {"status": status.API_OK, "data": db_word_list, "next_cursor": next_cursor}
+
+
+@router.post("/api/admin/words_page")
+def get_admin_words_page(
+    query: utils.ListQuery,
+    current_user=Depends(auth.require_roles(["admin", "super_admin"])),
+    db: Session = Depends(db.get_db),
+):
+    """words_list + words_count 合并：一次返回 data / count / count_exact / next_cursor。"""
+    page = admin_crud.admin_words_page(
+        db=db,
+        word_template_id=constants.WORD_TEMPLATE_ID,
+        status_filter=query.status_filter,
+        start=query.start,
+        size=query.size,
+        cursor=query.cursor,
+    )
+    return {"status": status.API_OK, **page}
 
 
 @router.post("/api/admin/words_count")
@@ -78,19 +124,37 @@ def get_admin_templates_list(
     db: Session = Depends(db.get_db),
 ):
     if query.status_filter == "all":
-        db_template_list = admin_crud.admin_templates_list(
+        db_template_list, next_cursor = admin_crud.admin_templates_list(
             db=db,
             start=query.start,
             size=query.size,
+            cursor=query.cursor,
         )
     else:
-        db_template_list = admin_crud.filter_templates_list(
+        db_template_list, next_cursor = admin_crud.filter_templates_list(
             db=db,
             status_filter=query.status_filter,
             start=query.start,
             size=query.size,
+            cursor=query.cursor,
         )
-    return {"status": status.API_OK, "data": db_template_list}
+    return {"status": status.API_OK, "data": db_template_list, "next_cursor": next_cursor}
+
+
+@router.post("/api/admin/templates_page")
+def get_admin_templates_page(
+    query: utils.ListQuery,
+    current_user=Depends(auth.require_roles(["admin", "super_admin"])),
+    db: Session = Depends(db.get_db),
+):
+    page = admin_crud.admin_templates_page(
+        db=db,
+        status_filter=query.status_filter,
+        start=query.start,
+        size=query.size,
+        cursor=query.cursor,
+    )
+    return {"status": status.API_OK, **page}
 
 
 @router.post("/api/admin/templates_count")
@@ -116,19 +180,37 @@ def get_admin_data_list(
     db: Session = Depends(db.get_db),
 ):
     if query.status_filter == "all":
-        db_word_list = admin_crud.admin_data_list(
+        db_word_list, next_cursor = admin_crud.admin_data_list(
             db=db,
             start=query.start,
             size=query.size,
+            cursor=query.cursor,
         )
     else:
-        db_word_list = admin_crud.filter_data_list(
+        db_word_list, next_cursor = admin_crud.filter_data_list(
             db=db,
             status_filter=query.status_filter,
             start=query.start,
             size=query.size,
+            cursor=query.cursor,
         )
-    return {"status": status.API_OK, "data": db_word_list}
+    return {"status": status.API_OK, "data": db_word_list, "next_cursor": next_cursor}
+
+
+@router.post("/api/admin/data_page")
+def get_admin_data_page(
+    query: utils.ListQuery,
+    current_user=Depends(auth.require_roles(["admin", "super_admin"])),
+    db: Session = Depends(db.get_db),
+):
+    page = admin_crud.admin_data_page(
+        db=db,
+        status_filter=query.status_filter,
+        start=query.start,
+        size=query.size,
+        cursor=query.cursor,
+    )
+    return {"status": status.API_OK, **page}
 
 
 @router.post("/api/admin/data_count")
@@ -155,13 +237,30 @@ def get_MGID_list(
     current_user=Depends(auth.require_roles(["admin", "super_admin"])),
     db: Session = Depends(db.get_db),
 ):
-    db_MGID_list = admin_crud.get_MGID_list(
+    db_MGID_list, next_cursor = admin_crud.get_MGID_list(
+        db=db,
+        template_id=constants.MGID_APPLY_TEMPLATE_ID,
+        start=query.start,
+        size=query.size,
+        cursor=query.cursor,
+    )
+    return {"status": status.API_OK, "data": db_MGID_list, "next_cursor": next_cursor}
+
+
+@router.post("/api/admin/MGID_page")
+def get_MGID_page(
+    query: utils.ListQuery,
+    current_user=Depends(auth.require_roles(["admin", "super_admin"])),
+    db: Session = Depends(db.get_db),
+):
+    page = admin_crud.get_MGID_page(
         db=db,
         template_id=constants.MGID_APPLY_TEMPLATE_ID,
         start=query.start,
         size=query.size,
+        cursor=query.cursor,
     )
-    return {"status": status.API_OK, "data": db_MGID_list}
+    return {"status": status.API_OK, **page}
 
 
 @router.get("/api/admin/MGID_count")
@@ -379,6 +478,156 @@ def set_user_role(
     # 防止降级自己导致失去权限（可选逻辑）
     if user_name == current_user.user_name and new_role_norm != "super_admin":
         return {"status": status.API_PERMISSION_DENIED, "message": "cannot downgrade self"}
-    db.query(models.User).filter(models.User.user_name == user_name).update({models.User.user_type: new_role_norm})
-    db.commit()
+    user_crud.set_user_type(db, user_name, new_role_norm)
     return {"status": status.API_OK}
+
+
+_USER_IMPORT_REQUIRED = ("user_name", "password", "country", "organization")
+
+
+def _normalize_import_row(row) -> dict:
+    if not isinstance(row, dict):
+        return {}
+    # CSV 多出的列键为 None；密码不去空格
+    normalized = {
+        key: str(value).strip()
+        for key, value in row.items()
+        if key and key != "password" and value is not None
+    }
+    if row.get("password") is not None:
+        normalized["password"] = str(row["password"])
+    normalized["user_type"] = (normalized.get("user_type") or "normal").lower()
+    return normalized
+
+
+def _check_import_row(row: dict, creator_level: int, seen: set, existing: set, known: dict):
+    """返回 None 表示通过，否则返回该行的错误。"""
+    for field in _USER_IMPORT_REQUIRED:
+        if not str(row.get(field) or "").strip():
+            return {"status": status.API_ERR_INVALID_INPUT, "message": f"missing {field}"}
+    user_name = row["user_name"]
+    # 与 /api/user_add/ 相同的用户名 / 密码格式校验
+    format_error = utils.check_user_name_password(user_name, row["password"])
+    if format_error is not None:
+        return format_error
+    if user_name in existing or user_name in seen:
+        return {"status": status.API_INVALID_USER_NAME, "message": "user name already exists"}
+    if row["user_type"] not in constants.ADMIN_LEVEL:
+        return {"status": status.API_INVALID_PARAMETER, "message": "invalid user_type"}
+    # 只能导入不高于自己级别的用户
+    if constants.ADMIN_LEVEL[row["user_type"]] < creator_level:
+        return {"status": status.API_PERMISSION_DENIED, "message": "user_type above creator"}
+    if row["organization"] not in known["organization"]:
+        return {"status": status.API_INVALID_USER_ORGANIZATION, "message": "unknown organization"}
+    if row["country"] not in known["country"]:
+        return {"status": status.API_INVALID_USER_COUNTRY, "message": "unknown country"}
+    return None
+
+
+def _import_users(db: Session, creator_type: str, rows: list):
+    # 逐行校验（国家 / 机构查内存缓存，重名一次 IN 查询）；通过的行并行哈希、一次分配编号、一个事务写入
+    rows = [_normalize_import_row(row) for row in rows]
+    existing = user_crud.get_existing_user_names(db, [r["user_name"] for r in rows if r.get("user_name")])
+    reference = reference_data.reference
+    # 每个不同的国家 / 机构只查一次
+    known = {
+        "organization": {
+            name for name in {r.get("organization") for r in rows}
+            if name and reference.organization(db, name) is not None
+        },
+        "country": {
+            name for name in {r.get("country") for r in rows}
+            if name and reference.country(db, name) is not None
+        },
+    }
+    creator_level = constants.ADMIN_LEVEL.get(creator_type, len(constants.ADMIN_LEVEL))
+
+    results, accepted, seen = [], [], set()
+    for index, row in enumerate(rows):
+        row_error = _check_import_row(row, creator_level, seen, existing, known)
+        if row_error is not None:
+            results.append({"index": index, "user_name": row.get("user_name"), **row_error})
+            continue
+        seen.add(row["user_name"])
+        accepted.append((index, row))
+        results.append(None)
+
+    if accepted:
+        hashed_passwords = password_hasher.hasher.hash_many([row["password"] for _, row in accepted])
+        user_numbers = serialnumber_crud.allocate(db=db, type="user", count=len(accepted))
+        users = [
+            models.User(
+                user_name=row["user_name"],
+                display_name=row.get("display_name") or row["user_name"],
+                hashed_password=hashed_password,
+                country=row["country"],
+                organization=row["organization"],
+                user_number="{0:04d}".format(user_number),
+                user_type=row["user_type"],
+            )
+            for (_, row), hashed_password, user_number in zip(accepted, hashed_passwords, user_numbers)
+        ]
+        if not user_crud.add_users_batch(db, users):
+            return {
+                "status": status.API_ERR_DB_FAILED,
+                "message": "Unable to add the users",
+            }
+        for (index, row), user in zip(accepted, users):
+            results[index] = {
+                "index": index,
+                "user_name": user.user_name,
+                "status": status.API_OK,
+                "user_number": user.user_number,
+            }
+
+    return {
+        "status": status.API_OK,
+        "data": {
+            "created": len(accepted),
+            "failed": len(rows) - len(accepted),
+            "results": results,
+        },
+    }
+
+
+@router.post("/api/admin/users/bulk_import")
+async def bulk_import_users(
+    request: Request,
+    current_user=Depends(auth.require_roles(["admin", "super_admin"])),
+    db: Session = Depends(db.get_db),
+):
+    """批量导入用户，请求体二选一：
+
+    - multipart/form-data 上传 CSV 文件（字段名 file），首行为表头：
+      user_name,display_name,password,country,organization,user_type
+    - JSON：{"users": [{...}, ...]}（schemas.UserBulkImport）
+
+    user_type 缺省为 normal，且不能高于导入者自身的级别。校验失败的行不影响其它行；
+    通过的行在一个事务内写入，results 按行顺序给出每行的 user_number 或错误。
+    CSV 逐行读取，读到第 USER_IMPORT_MAX_ROWS + 1 行即停止，不把整个文件读入内存。
+    """
+    limit = settings.USER_IMPORT_MAX_ROWS
+    if request.headers.get("content-type", "").startswith("multipart/form-data"):
+        form = await request.form()
+        file = form.get("file")
+        if file is None or isinstance(file, str):
+            return {"status": status.API_INVALID_PARAMETER, "message": "file is required"}
+        try:
+            # utf-8-sig：去掉 Windows 导出 CSV 开头的 BOM
+            reader = csv.DictReader(codecs.iterdecode(file.file, encoding="utf-8-sig"))
+            rows = list(itertools.islice(reader, limit + 1))
+        except UnicodeDecodeError:
+            return {"status": status.API_INVALID_CSV_ENCODE, "message": "CSV must be UTF-8 encoded"}
+        except csv.Error as e:
+            return {"status": status.API_INVALID_CSV_ROW, "message": str(e)}
+    else:
+        try:
+            rows = schemas.UserBulkImport.model_validate(await request.json()).users
+        except (ValueError, ValidationError) as e:
+            return {"status": status.API_ERR_INVALID_INPUT, "message": str(e)}
+    if len(rows) > limit:
+        return {
+            "status": status.API_ERR_INVALID_INPUT,
+            "message": f"At most {limit} users per request",
+        }
+    return await run_in_threadpool(_import_users, db, current_user.user_type, rows)
@@ -1,4 +1,6 @@
-from fastapi import Depends, HTTPException, APIRouter, UploadFile, File
+from fastapi import Depends, HTTPException, APIRouter, UploadFile, File, Request
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
 import urllib.parse
 from botocore.exceptions import ClientError
 import threading
@@ -9,7 +11,7 @@ import warnings, json
 
 from database import template_crud, development_data_crud, models, schemas
 from database.base import SessionLocal, engine
-from common import object_store_service, error, constants, status, utils, auth
+from common import object_store_service, error, constants, status, utils, auth, compiled_template
 from data_parser import web_submit
 import uvicorn
 from common import db
@@ -30,6 +32,7 @@ from common.object_store_service import _get_s3
 import boto3
 from botocore.exceptions import ClientError
 import time
+from settings import settings
 
 # 全局上传会话管理
 active_uploads: Dict[str, Dict[str, Any]] = {}
@@ -123,7 +126,9 @@ if not logger.handlers:
     
     # 创建文件处理器，确保日志可以打印
     try:
-        file_handler = logging.FileHandler('upload_logs.log', encoding='utf-8')
+        file_handler = logging.FileHandler(
+            os.path.join(settings.LOG_DIR, "upload_logs.log"), encoding="utf-8"
+        )
         file_handler.setLevel(logging.INFO)
         file_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
         file_handler.setFormatter(file_formatter)
@@ -167,6 +172,106 @@ def create_data_object_web_submit(
     return {"status": status.API_OK, "data": development_data_create}
 
 
+async def _read_ndjson(request: Request, limit: int):
+    """逐块读取 NDJSON 请求体，每个非空行为一条记录；超过 limit 条返回 None。"""
+    records, buffer = [], b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        records.extend(line.decode("utf-8") for line in lines if line.strip())
+        if len(records) > limit:
+            return None
+    if buffer.strip():
+        records.append(buffer.decode("utf-8"))
+    return records if len(records) <= limit else None
+
+
+def _bulk_submit(db: Session, user_name: str, template_id: str, records: list):
+    # 模板只加载一次，逐条校验；通过的记录一次分配 MGID、一个事务写入
+    template = compiled_template.get(db, template_id)
+    if not template:
+        return {"status": 404, "message": "Template not found"}
+
+    results, accepted = [], []
+    for index, record in enumerate(records):
+        try:
+            json_data, record_error = utils.build_development_json_data(template, record)
+        except Exception as e:
+            json_data, record_error = None, {"status": status.API_ERR_INVALID_INPUT, "message": str(e)}
+        if json_data is None:
+            results.append({"index": index, **record_error})
+        else:
+            accepted.append((index, json_data))
+            results.append(None)
+
+    if accepted:
+        # 与单条提交一致：generate_development_json_data 返回的 cutorm_field 为 {}
+        cutorm_field = {}
+        MGIDs = utils.generateMGID_batch(
+            accepted[0][1], cutorm_field, user_name, db, len(accepted)
+        )
+        json_data_list = [
+            utils.initialize_data_metadata(json_data, cutorm_field, user_name, db, MGID=MGID)
+            for (_, json_data), MGID in zip(accepted, MGIDs)
+        ]
+        ids = development_data_crud.create_development_data_batch(
+            json_data_list, template_id, db
+        )
+        if ids is None:
+            return {
+                "status": status.API_ERR_DB_FAILED,
+                "message": "Unable to create the development data objects",
+            }
+        for (index, _), object_id, MGID in zip(accepted, ids, MGIDs):
+            results[index] = {"index": index, "status": status.API_OK, "id": object_id, "MGID": MGID}
+
+    return {
+        "status": status.API_OK,
+        "data": {
+            "created": len(accepted),
+            "failed": len(records) - len(accepted),
+            "results": results,
+        },
+    }
+
+
+@router.post("/api/development_data/bulk_submit")
+async def create_data_objects_bulk_submit(
+    request: Request,
+    template_id: Optional[str] = None,
+    db: Session = Depends(db.get_db),
+    current_user: models.User = Depends(auth.get_current_active_user),
+):
+    """批量提交同一模板的数据，请求体二选一：
+
+    - JSON：{"template_id": ..., "records": [json_data, ...]}（schemas.DataBulkCreate）
+    - NDJSON（Content-Type: application/x-ndjson）：每行一条 json_data，template_id 由查询参数给出
+
+    校验失败的记录不影响其它记录；results 按提交顺序给出每条的 id / MGID 或错误。
+    """
+    limit = settings.BULK_SUBMIT_MAX_RECORDS
+    if "ndjson" in request.headers.get("content-type", ""):
+        if not template_id:
+            return {"status": status.API_INVALID_PARAMETER, "message": "template_id is required"}
+        records = await _read_ndjson(request, limit)
+    else:
+        try:
+            bulk = schemas.DataBulkCreate.model_validate(await request.json())
+        except (ValueError, ValidationError) as e:
+            return {"status": status.API_ERR_INVALID_INPUT, "message": str(e)}
+        template_id, records = bulk.template_id, bulk.records
+        if len(records) > limit:
+            records = None
+    if records is None:
+        return {
+            "status": status.API_ERR_INVALID_INPUT,
+            "message": f"At most {limit} records per request",
+        }
+    return await run_in_threadpool(
+        _bulk_submit, db, current_user.user_name, template_id, records
+    )
+
+
 @router.post("/api/update_development_data/{object_id}")
 def update_development_data(
     object_id: str,
@@ -203,9 +308,15 @@ def update_development_data(
             json_data, old_dev_data.json_data, current_user.user_name
         )
     # Removed object store write
-        development_data_crud.update_development_data(
-            json_data, data.template_id, db, object_id
-        )
+        try:
+            development_data_crud.update_development_data(
+                json_data, data.template_id, db, object_id
+            )
+        except error.DuplicateMGIDError as e:
+            return {
+                "status": status.API_ERR_CREATE_DUPLICATE_OBJECT,
+                "message": f"MGID {e.MGID} already exists",
+            }
         return {"status": status.API_OK}
 
 
@@ -247,21 +358,41 @@ def get_dev_data_list(
     current_user: models.User = Depends(auth.get_current_active_user),
 ):
     if query.status_filter == "all":
-        db_dev_data_list = development_data_crud.get_dev_data_list(
+        db_dev_data_list, next_cursor = development_data_crud.get_dev_data_list(
             db=db,
             user=current_user.user_name,
             start=query.start,
             size=query.size,
+            cursor=query.cursor,
         )
     else:
-        db_dev_data_list = development_data_crud.filter_dev_data_list(
+        db_dev_data_list, next_cursor = development_data_crud.filter_dev_data_list(
             db=db,
             user=current_user.user_name,
             status_filter=query.status_filter,
             start=query.start,
             size=query.size,
+            cursor=query.cursor,
         )
-    return {"status": status.API_OK, "data": db_dev_data_list}
+    return {"status": status.API_OK, "data": db_dev_data_list, "next_cursor": next_cursor}
+
+
+@router.post("/api/dev_data_page")
+def get_dev_data_page(
+    query: utils.ListQuery,
+    db: Session = Depends(db.get_db),
+    current_user: models.User = Depends(auth.get_current_active_user),
+):
+    """dev_data_list + dev_data_count 合并：一次返回 data / count / count_exact / next_cursor。"""
+    page = development_data_crud.get_dev_data_page(
+        db=db,
+        user=current_user.user_name,
+        status_filter=query.status_filter,
+        start=query.start,
+        size=query.size,
+        cursor=query.cursor,
+    )
+    return {"status": status.API_OK, **page}
 
 
 @router.post("/api/dev_data_count")
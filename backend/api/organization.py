@@ -1,12 +1,11 @@
 from fastapi import Depends, HTTPException, APIRouter, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
 from database import organization_crud, schemas, models
 from database.base import SessionLocal, engine
 import uvicorn
 from common import db, status, utils, error
-import csv
-import codecs
 
 
 router = APIRouter()
@@ -14,22 +13,21 @@ router = APIRouter()
 
 @router.post("/api/create_organization/")
 async def insert_organization_from_excel(
-    file: UploadFile = File(...), db: Session = Depends(db.get_db)
+    file: UploadFile = File(...), report: bool = False, db: Session = Depends(db.get_db)
 ):
+    """逐行流式导入（COPY + 一条合并语句）。report=true 时返回新增 / 重复 / 格式错误的统计与行号，
+    否则只返回状态码：存在重复或格式错误的行时为 API_INVALID_CSV_ROW。"""
     try:
-        contents = csv.reader(codecs.iterdecode(file.file, encoding="utf-8"))
-    except:
+        result = await run_in_threadpool(
+            organization_crud.import_organization_csv, db, utils.iter_csv_rows(file.file)
+        )
+    except UnicodeDecodeError:
         return status.API_INVALID_CSV_ENCODE
-    organization_list = list()
-    for row in contents:
-        # windows forces csv start with a BOM character '\ufeff', other OS doesnt require BOM
-        if "\ufeff" in row[0]:
-            row[0] = row[0][1:]
-        organization_list.append(row)
-    # Removed file persistence to object store
-    return organization_crud.create_organization(
-        db=db, organization_list=organization_list
-    )
+    if report:
+        return {"status": status.API_OK, "data": result}
+    if result["duplicate"] or result["invalid"]:
+        return status.API_INVALID_CSV_ROW
+    return status.API_OK
 
 
 @router.get("/api/organization_list/{begin_word}")
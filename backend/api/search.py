@@ -1,25 +1,92 @@
-from fastapi import Depends, HTTPException, APIRouter
+from fastapi import Depends, HTTPException, APIRouter, Query
+from fastapi.encoders import jsonable_encoder
 from sqlalchemy.orm import Session
 import warnings, json
+from typing import Optional
 
-from database import search_crud, models, schemas
+from database import search_crud, models, schemas, pagination
 from database.base import SessionLocal, engine
-from common import constants, status, utils
+from common import cache, constants, status, suggest_service, utils
 from schema_parser import template_create_schema, data_create_schema
 import uvicorn
 from common import db
+from settings import settings
 
 router = APIRouter()
 
 
+def _search_cache_key(query: schemas.Query) -> str:
+    # 检索本身不区分大小写，键按小写 / 去重排序后的类型归一化
+    return json.dumps(
+        [
+            query.query.lower(),
+            sorted(set(query.queryType)),
+            query.start,
+            query.size,
+            sorted((query.cursors or {}).items()),
+            query.mode,
+            query.facets,
+        ],
+        ensure_ascii=False,
+    )
+
+
 @router.post("/api/unauth/search/")
 def search(query: schemas.Query, db: Session = Depends(db.get_db)):
     db_object = models.Object(template_id=constants.WORD_TEMPLATE_ID)
-    db_search_list = search_crud.get_search_list(
-        db=db,
-        query=query.query,
-        queryType=query.queryType,
-        start=query.start,
-        size=query.size,
-    )
+    if query.mode not in search_crud.SEARCH_MODES:
+        return {"status": status.API_INVALID_PARAMETER, "message": "invalid search mode"}
+    cache_key = _search_cache_key(query)
+    cached = cache.search_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    try:
+        if settings.SEARCH_PARALLEL and len(set(query.queryType)) > 1:
+            db_search_list = search_crud.get_search_list_parallel(
+                query=query.query,
+                queryType=query.queryType,
+                start=query.start,
+                size=query.size,
+                cursors=query.cursors,
+                mode=query.mode,
+                facets=query.facets,
+            )
+        else:
+            db_search_list = search_crud.get_search_list(
+                db=db,
+                query=query.query,
+                queryType=query.queryType,
+                start=query.start,
+                size=query.size,
+                cursors=query.cursors,
+                mode=query.mode,
+                facets=query.facets,
+            )
+    except pagination.InvalidCursor as e:
+        return {"status": status.API_INVALID_PARAMETER, "message": str(e)}
+    db_search_list = jsonable_encoder(db_search_list)
+    # 部分结果（有类型超时）不缓存
+    if not db_search_list.get("timedOut"):
+        cache.search_cache.set(cache_key, db_search_list)
     return db_search_list
+
+
+@router.get("/api/unauth/suggest")
+def suggest(
+    q: str,
+    types: Optional[str] = None,
+    k: int = Query(10, ge=1, le=50),
+    db: Session = Depends(db.get_db),
+):
+    """输入联想：types 为逗号分隔的 word / template / organization，默认全部。
+
+    每类返回前 k 条（完全匹配 > 前缀 > 子串）；超出时间预算时 truncated 为 true。
+    """
+    kinds = suggest_service.KINDS
+    if types:
+        kinds = tuple(t for t in types.split(",") if t in suggest_service.KINDS)
+        if not kinds:
+            return {"status": status.API_INVALID_PARAMETER, "message": "invalid types"}
+    suggest_service.suggest_index.ensure_fresh(db)
+    data, truncated = suggest_service.suggest_index.suggest(q, kinds=kinds, k=k)
+    return {"status": status.API_OK, "data": data, "truncated": truncated}
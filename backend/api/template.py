@@ -4,7 +4,7 @@ import warnings, json
 
 from database import template_crud, user_crud, models, schemas
 from database.base import SessionLocal, engine
-from common import constants, status, utils, db, error, auth
+from common import cache, constants, status, utils, db, error, auth
 from schema_parser import template_create_schema, basic_information_schema
 from data_parser import file_submit
 import uvicorn
@@ -20,11 +20,16 @@ def read_template(
     db: Session = Depends(db.get_db),
     current_user: models.User = Depends(auth.get_current_active_user),
 ):
+    cached = cache.template_cache.get(template_id.lower())
+    if cached is not None:
+        return cached
     db_template = template_crud.get_template(db, template_id=template_id)
     if db_template is None:
         raise HTTPException(status_code=404, detail="Template not found")
     # 统一返回格式 {status:0, data:{id,name,json_schema}}
-    return {"status": status.API_OK, "data": {"id": str(db_template.id), "name": db_template.name, "json_schema": db_template.json_schema}}
+    result = {"status": status.API_OK, "data": {"id": str(db_template.id), "name": db_template.name, "json_schema": db_template.json_schema}}
+    cache.template_cache.set(str(db_template.id), result)
+    return result
 
 
 @router.post("/api/templates/")
@@ -179,21 +184,41 @@ def get_templates_list(
 ):
     current_user_name = current_user.user_name
     if query.status_filter == "all":
-        db_template_list = template_crud.get_templates_list(
+        db_template_list, next_cursor = template_crud.get_templates_list(
             db=db,
             user=current_user_name,
             start=query.start,
             size=query.size,
+            cursor=query.cursor,
         )
     else:
-        db_template_list = template_crud.filter_templates_list(
+        db_template_list, next_cursor = template_crud.filter_templates_list(
             db=db,
             user=current_user_name,
             status_filter=query.status_filter,
             start=query.start,
             size=query.size,
+            cursor=query.cursor,
         )
-    return {"status": status.API_OK, "data": db_template_list}
+    return {"status": status.API_OK, "data": db_template_list, "next_cursor": next_cursor}
+
+
+@router.post("/api/templates_page")
+def get_templates_page(
+    query: utils.ListQuery,
+    db: Session = Depends(db.get_db),
+    current_user: models.User = Depends(auth.get_current_active_user),
+):
+    """templates_list + templates_count 合并：一次返回 data / count / count_exact / next_cursor。"""
+    page = template_crud.get_templates_page(
+        db=db,
+        user=current_user.user_name,
+        status_filter=query.status_filter,
+        start=query.start,
+        size=query.size,
+        cursor=query.cursor,
+    )
+    return {"status": status.API_OK, **page}
 
 
 @router.post("/api/templates_count")
@@ -7,13 +7,11 @@ from typing import Optional
 from database import (
     user_crud,
     serialnumber_crud,
-    country_crud,
-    organization_crud,
     models,
     schemas,
 )
 from database.base import engine
-from common import constants, status, db, auth
+from common import constants, status, db, auth, reference_data, utils
 from settings import settings
 from datetime import timedelta
 import json
@@ -57,7 +55,7 @@ async def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(db.get_db),
 ):
-    user = auth.authenticate_user(db, form_data.username, form_data.password)
+    user = await auth.authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=http_status.HTTP_401_UNAUTHORIZED,
@@ -66,7 +64,7 @@ async def login_for_access_token(
         )
     access_token_expires = timedelta(minutes=auth.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = auth.create_access_token(
-        data={"sub": user.user_name}, expires_delta=access_token_expires
+        data={"sub": user.user_name, **auth.user_claims(user)}, expires_delta=access_token_expires
     )
     refresh_token = auth.create_refresh_token(user.user_name)
     _set_refresh_cookie(response, refresh_token)
@@ -78,12 +76,13 @@ def refresh_token(
     request: Request,
     response: Response,
     refresh_payload: Optional[dict] = None,
+    db: Session = Depends(db.get_db),
 ):
     payload = refresh_payload or {}
     token = payload.get("refresh_token") or request.cookies.get(REFRESH_COOKIE_NAME)
     if not token:
         raise HTTPException(status_code=400, detail="Missing refresh_token")
-    pair = auth.refresh_access_token(token)
+    pair = auth.refresh_access_token(token, db_session=db)
     _set_refresh_cookie(response, pair.refresh_token)
     return pair
 
@@ -127,29 +126,30 @@ def logout(response: Response, request: Request):
 @router.post("/api/user_add/")
 def add_user(data: schemas.UserAdd, db: Session = Depends(db.get_db)):
     user_data = json.loads(data.user_json_data)
+    format_error = utils.check_user_name_password(user_data.get("user_name"), user_data.get("password"))
+    if format_error is not None:
+        return format_error
     # to avoid repeated username causing serial number increasing
-    if user_crud.get_userinfo_by_name(db=db, name=user_data["user_name"]) is not None:
+    # 用户名是否存在直接查库：进程内缓存可能落后于其它进程的注册
+    reference = reference_data.reference
+    if user_crud.get_existing_user_names(db, [user_data["user_name"]]):
         return {
             "status": status.API_INVALID_USER_NAME,
         }
-    elif (
-        organization_crud.get_organization_by_name(
-            db=db, name=user_data["organization"]
-        )
-        is None
-    ):
+    elif reference.organization(db, user_data["organization"]) is None:
         return {
             "status": status.API_INVALID_USER_ORGANIZATION,
         }
-    elif country_crud.get_country_by_name(db=db, name=user_data["country"]) is None:
+    elif reference.country(db, user_data["country"]) is None:
         return {
             "status": status.API_INVALID_USER_COUNTRY,
         }
+    # 先哈希再取号：连续编号方式下取号持有 serial_number 行锁直到提交，不能把 bcrypt 包在里面
+    hashed_password = auth.get_password_hash(user_data["password"])
+
     user_number = serialnumber_crud.get_serial_number(db=db, type="user")
     user_number = "{0:04d}".format(user_number)
-    
-    hashed_password = auth.get_password_hash(user_data["password"])
-    
+
     db_user = models.User(
                             user_name=user_data["user_name"],
                             display_name=user_data["display_name"],
@@ -171,15 +171,19 @@ def add_user(data: schemas.UserAdd, db: Session = Depends(db.get_db)):
 
 
 @router.get("/api/users/me", response_model=schemas.User)
-async def read_users_me(current_user: models.User = Depends(auth.get_current_active_user)):
-    return current_user
+def read_users_me(
+    current_user: auth.CurrentUser = Depends(auth.get_current_active_user),
+    db: Session = Depends(db.get_db),
+):
+    # 完整资料仍从数据库读取（认证本身不再查库）
+    return user_crud.get_userinfo_by_name(db=db, name=current_user.user_name)
 
 
 # 兼容旧前端：提供 /api/userinfo/ 路由，返回当前用户基础信息
 @router.get("/api/userinfo/")
-def userinfo(current_user: models.User = Depends(auth.get_current_active_user)):
+def userinfo(current_user: auth.CurrentUser = Depends(auth.get_current_active_user)):
     return {
         "username": current_user.user_name,
-        "display_name": getattr(current_user, "display_name", current_user.user_name),
+        "display_name": current_user.display_name or current_user.user_name,
         "user_type": getattr(current_user, "user_type", None),
     }
\ No newline at end of file
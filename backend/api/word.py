@@ -1,8 +1,18 @@
-from fastapi import Depends, HTTPException, APIRouter, Header, Body
+from fastapi import Depends, HTTPException, APIRouter, Header, Body, Request, Response
+from fastapi.responses import JSONResponse
+from fastapi.encoders import jsonable_encoder
 from sqlalchemy.orm import Session
 import warnings, json
-from database import word_crud, template_crud, serialnumber_crud, models, schemas
-from common import constants, status, utils, auth
+from database import (
+    word_crud,
+    word_closure_crud,
+    template_crud,
+    serialnumber_crud,
+    models,
+    schemas,
+    pagination,
+)
+from common import cache, constants, error, status, taxonomy_service, utils, auth
 from common import db
 import uuid
 
@@ -26,38 +36,25 @@ def _serialize_word(obj: models.Object):
 
 
 def _compute_depth(db: Session, super_id: str) -> int:
-    """直接使用父节点的 hierarchy_level + 1，若父缺失或没存则回退为2/1"""
-    parent_obj = word_crud.get_object(db=db, object_id=super_id)
-    if parent_obj is None:
-        return 1
-    parent_level = parent_obj.json_data.get("hierarchy_level")
-    if parent_level is None:
-        # 回退：尝试逐级向上（兼容旧数据）
-        depth = 1
-        current = super_id
-        while current:
-            p = word_crud.get_object(db=db, object_id=current)
-            if p is None:
-                break
-            depth += 1
-            current = p.json_data.get("super_class_id") or p.json_data.get("parent_word_id")
-            if depth > MAX_WORD_DEPTH:
-                return depth
-        return depth
-    return int(parent_level) + 1
+    """父节点在闭包表中的层级 + 1；父节点不在表中时视为新的根 (返回 1)"""
+    return word_closure_crud.level(db, super_id) + 1
 
 
 def _detect_cycle(db: Session, node_id: str, new_super_id: str) -> bool:
-    """检测将 node 的父级改为 new_super_id 是否形成循环"""
-    current = new_super_id
-    while current:
-        if current == node_id:
-            return True
-        obj = word_crud.get_object(db=db, object_id=current)
-        if obj is None:
-            return False
-        current = obj.json_data.get("parent_word_id") or obj.json_data.get("super_class_id")
-    return False
+    """检测将 node 的父级改为 new_super_id 是否形成循环（new_super_id 为 node 自身或其后代）"""
+    return word_closure_crud.is_ancestor(db, node_id, new_super_id)
+
+
+def _taxonomy_response(request: Request, db: Session, build):
+    """从词汇层级快照构建响应并带上 ETag；GET 请求的 If-None-Match 命中时返回 304。"""
+    with taxonomy_service.taxonomy.read(db) as snapshot:
+        etag = snapshot.etag
+        if request.method == "GET":
+            tags = [t.strip() for t in request.headers.get("if-none-match", "").split(",")]
+            if etag in tags or "*" in tags:
+                return Response(status_code=304, headers={"ETag": etag})
+        content = jsonable_encoder(build(snapshot))
+    return JSONResponse(content, headers={"ETag": etag})
 
 
 # ==== helpers: build getWordCreateSchema (rich, with object/array/list) ====
@@ -277,7 +274,10 @@ def create_word_object(
         return {"status": status.API_ERR_INVALID_INPUT, "message": "json_data must be dict"}
     json_data = utils.initialize_word_metadata(cast(Dict[str, Any], post_data), cast(int, serial_number), current_user_name)
     db_object = models.Object(template_id=constants.WORD_TEMPLATE_ID, json_data=json_data)
-    obj = word_crud.create_object(db=db, db_object=db_object)
+    try:
+        obj = word_crud.create_object(db=db, db_object=db_object)
+    except error.DuplicateMGIDError as e:
+        return {"status": status.API_ERR_CREATE_DUPLICATE_OBJECT, "message": f"MGID {e.MGID} already exists"}
     if obj is None:
         return {"status": status.API_ERR_DB_FAILED, "message": "Unable to create the word object"}
     return {"status": status.API_OK, "data": _serialize_word(obj)}
@@ -350,7 +350,10 @@ def update_word(
     )
     json_data = utils.initialize_word_metadata(post_data, serial_number, current_user_name)
     # 直接更新
-    word_crud.update_object(db=db, json_data=json_data, object_id=word_id)
+    try:
+        word_crud.update_object(db=db, json_data=json_data, object_id=word_id)
+    except error.DuplicateMGIDError as e:
+        return {"status": status.API_ERR_CREATE_DUPLICATE_OBJECT, "message": f"MGID {e.MGID} already exists"}
     updated = word_crud.get_object(db, object_id=word_id)
     return {"status": status.API_OK, "data": _serialize_word(updated)}
 
@@ -363,23 +366,43 @@ def get_my_words_list(
 ):
     current_user_name = current_user.user_name
     if query.status_filter == "all":
-        db_word_list = word_crud.get_my_words_list(
+        db_word_list, next_cursor = word_crud.get_my_words_list(
             db=db,
             user=current_user_name,
             word_template_id=constants.WORD_TEMPLATE_ID,
             start=query.start,
             size=query.size,
+            cursor=query.cursor,
         )
     else:
-        db_word_list = word_crud.filter_words_list(
+        db_word_list, next_cursor = word_crud.filter_words_list(
             db=db,
             user=current_user_name,
             word_template_id=constants.WORD_TEMPLATE_ID,
             status_filter=query.status_filter,
             start=query.start,
             size=query.size,
+            cursor=query.cursor,
         )
-    return {"status": status.API_OK, "data": db_word_list}
+    return {"status": status.API_OK, "data": db_word_list, "next_cursor": next_cursor}
+
+
+@router.post("/api/my_words_page")
+def get_my_words_page(
+    query: utils.ListQuery,
+    db: Session = Depends(db.get_db),
+    current_user: models.User = Depends(auth.get_current_active_user),
+):
+    """my_words_list + words_count 合并：一次返回 data / count / count_exact / next_cursor。"""
+    page = word_crud.get_my_words_page(
+        db=db,
+        user=current_user.user_name,
+        status_filter=query.status_filter,
+        start=query.start,
+        size=query.size,
+        cursor=query.cursor,
+    )
+    return {"status": status.API_OK, **page}
 
 
 @router.get("/api/word_list/{begin_word}")
@@ -423,21 +446,17 @@ def delete_word(word: schemas.Word, db: Session = Depends(db.get_db)):
 
 
 @router.get("/api/words/children_one")
-def get_children_one(parent_id: str | None = None, db: Session = Depends(db.get_db)):
-    if parent_id:
-        objs = word_crud.get_children(db, parent_id=parent_id)
-    else:
-        objs = word_crud.get_root_objects(db)
-    data = []
-    for o in objs:
-        item = {"id": str(o.id)}
-        item.update(o.json_data)
-        data.append(item)
-    return {"status": status.API_OK, "data": data}
+def get_children_one(request: Request, parent_id: str | None = None, db: Session = Depends(db.get_db)):
+    """parent_id 的直接子节点；不传时返回根节点。数据来自进程内词汇层级快照：其它进程 / 直接 SQL 的修改最多延迟 TAXONOMY_REFRESH_SECONDS（默认 300）秒可见。"""
+    def build(snapshot):
+        nodes = snapshot.children(parent_id) if parent_id else snapshot.roots()
+        return {"status": status.API_OK, "data": nodes}
+
+    return _taxonomy_response(request, db, build)
 
 
 @router.get("/api/words/flatten/{word_id}")
-def get_flatten_word(word_id: uuid.UUID, db: Session = Depends(db.get_db)):
+def get_flatten_word(request: Request, word_id: uuid.UUID, db: Session = Depends(db.get_db)):
     """给定节点ID, 沿父链(包含自身)一路找到根object, 将所有属性扁平合并后返回.
 
     合并策略:
@@ -445,45 +464,31 @@ def get_flatten_word(word_id: uuid.UUID, db: Session = Depends(db.get_db)):
     2. 下层(子)的同名键覆盖上层(父)的键值.
     3. 保留最终节点 id; 其它中间节点 id 不并入普通字段, 若需要可在 ancestors 中查看.
     4. 仅针对 json_data 中的键做合并; 系统附加的 hierarchy_level, super_class_id 保留叶子最终值.
+    数据来自进程内词汇层级快照：其它进程 / 直接 SQL 的修改最多延迟 TAXONOMY_REFRESH_SECONDS（默认 300）秒可见。
     返回示例:
     {"status":0, "data": {"id": "<当前节点UUID>", "ancestors": ["root_id", ...], "merged": {<合并后的所有字段>}}}
     """
-    path = word_crud.get_path_to_root(db, word_id=str(word_id), max_depth=MAX_WORD_DEPTH)
-    if not path:
-        return {"status": status.API_INVALID_PARAMETER, "message": "word not found"}
-    # path 当前顺序: 叶子 -> 根; 需要反转
-    path_rev = list(reversed(path))
-
-    def _deep_merge(dst: dict, src: dict):
-        for k, v in src.items():
-            if k in dst and isinstance(dst[k], dict) and isinstance(v, dict):
-                _deep_merge(dst[k], v)
-            else:
-                dst[k] = v
-
-    merged: dict = {}
-    ancestors: list[str] = []
-    for idx, node in enumerate(path_rev):
-        node_id = node.get("id")
-        if node_id:
-            ancestors.append(node_id)
-        for k, v in node.items():
-            if k == "id":
-                continue
-            if isinstance(v, dict) and isinstance(merged.get(k), dict):
-                _deep_merge(merged[k], v)
-            else:
-                merged[k] = v
-    current_id = str(word_id)
-    return {"status": status.API_OK, "data": {"id": current_id, "ancestors": ancestors, "merged": merged}}
+
+    def build(snapshot):
+        flattened = snapshot.flatten(word_id, MAX_WORD_DEPTH)
+        if flattened is None:
+            return {"status": status.API_INVALID_PARAMETER, "message": "word not found"}
+        return {"status": status.API_OK, "data": flattened}
+
+    return _taxonomy_response(request, db, build)
 
 
 @router.get("/api/words/{word_id}")
 def read_word(word_id: uuid.UUID, db: Session = Depends(db.get_db)):
+    cached = cache.word_cache.get(str(word_id))
+    if cached is not None:
+        return cached
     db_word = word_crud.get_object(db, object_id=str(word_id))
     if db_word is None or str(db_word.template_id) != constants.WORD_TEMPLATE_ID:
         return {"status": status.API_INVALID_PARAMETER, "message": "Word not found"}
-    return {"status": status.API_OK, "data": _serialize_word(db_word)}
+    result = jsonable_encoder({"status": status.API_OK, "data": _serialize_word(db_word)})
+    cache.word_cache.set(str(word_id), result)
+    return result
 
 
 @router.get("/api/words/unit/{word_id}")
@@ -516,89 +521,84 @@ def changeObjectReviewStatus(
 
 
 @router.get("/api/words/children/{word_id}")
-def get_children(word_id: uuid.UUID, db: Session = Depends(db.get_db)):
-    children = word_crud.get_children(db, parent_id=str(word_id))
-    data = []
-    for c in children:
-        item = {"id": str(c.id)}
-        item.update(c.json_data)
-        data.append(item)
-    return {"status": status.API_OK, "data": data}
+def get_children(request: Request, word_id: uuid.UUID, db: Session = Depends(db.get_db)):
+    """word_id 的直接子节点。数据来自进程内词汇层级快照：其它进程 / 直接 SQL 的修改最多延迟 TAXONOMY_REFRESH_SECONDS（默认 300）秒可见。"""
+    return _taxonomy_response(
+        request, db, lambda snapshot: {"status": status.API_OK, "data": snapshot.children(word_id)}
+    )
 
 
 @router.get("/api/words/subtree/{word_id}")
-def get_subtree(word_id: uuid.UUID, db: Session = Depends(db.get_db)):
-    # 采用 CTE 版本，提高深层结构查询效率
-    flat_list = word_crud.build_subtree_cte_flat(db, root_id=str(word_id), max_depth=MAX_WORD_DEPTH)
-    if not flat_list:
-        return {"status": status.API_INVALID_PARAMETER, "message": "word not found"}
-    return {"status": status.API_OK, "data": flat_list}
+def get_subtree(request: Request, word_id: uuid.UUID, db: Session = Depends(db.get_db)):
+    """word_id 及其后代的扁平列表，按层级（层序）排列。数据来自进程内词汇层级快照：其它进程 / 直接 SQL 的修改最多延迟 TAXONOMY_REFRESH_SECONDS（默认 300）秒可见。"""
+    def build(snapshot):
+        flat_list = snapshot.subtree_flat(word_id, MAX_WORD_DEPTH)
+        if not flat_list:
+            return {"status": status.API_INVALID_PARAMETER, "message": "word not found"}
+        return {"status": status.API_OK, "data": flat_list}
+
+    return _taxonomy_response(request, db, build)
 
 
 @router.get("/api/words/path/{word_id}")
-def get_path(word_id: uuid.UUID, db: Session = Depends(db.get_db)):
-    path = word_crud.get_path_to_root(db, word_id=str(word_id), max_depth=MAX_WORD_DEPTH)
-    if not path:
-        return {"status": status.API_INVALID_PARAMETER, "message": "word not found"}
-    return {"status": status.API_OK, "data": path}
+def get_path(request: Request, word_id: uuid.UUID, db: Session = Depends(db.get_db)):
+    """从当前节点到根节点的链（当前在前）。数据来自进程内词汇层级快照：其它进程 / 直接 SQL 的修改最多延迟 TAXONOMY_REFRESH_SECONDS（默认 300）秒可见。"""
+    def build(snapshot):
+        path = snapshot.path(word_id, MAX_WORD_DEPTH)
+        if not path:
+            return {"status": status.API_INVALID_PARAMETER, "message": "word not found"}
+        return {"status": status.API_OK, "data": path}
+
+    return _taxonomy_response(request, db, build)
 
 
 # ==== Batch flatten endpoint (B) ====
 @router.post("/api/words/flatten_batch")
-def flatten_batch(word_ids: list[uuid.UUID] = Body(..., embed=True), db: Session = Depends(db.get_db)):
+def flatten_batch(
+    request: Request,
+    word_ids: list[uuid.UUID] = Body(..., embed=True),
+    db: Session = Depends(db.get_db),
+):
     """批量扁平化多个词汇，减少前端多次请求开销 (B).
 
     返回: {status:0, data:[ {id, ancestors, merged}, ... ], failed:[<无法找到的id字符串>]}
+    数据来自进程内词汇层级快照：其它进程 / 直接 SQL 的修改最多延迟 TAXONOMY_REFRESH_SECONDS（默认 300）秒可见。
     """
-    results = []
-    failed: list[str] = []
-    for wid in word_ids:
-        path = word_crud.get_path_to_root(db, word_id=str(wid), max_depth=MAX_WORD_DEPTH)
-        if not path:
-            failed.append(str(wid))
-            continue
-        path_rev = list(reversed(path))
-        def _deep_merge(dst: dict, src: dict):
-            for k, v in src.items():
-                if k in dst and isinstance(dst[k], dict) and isinstance(v, dict):
-                    _deep_merge(dst[k], v)
-                else:
-                    dst[k] = v
-        merged: dict = {}
-        ancestors: list[str] = []
-        for node in path_rev:
-            node_id = node.get("id")
-            if node_id:
-                ancestors.append(node_id)
-            for k, v in node.items():
-                if k == "id":
-                    continue
-                if isinstance(v, dict) and isinstance(merged.get(k), dict):
-                    _deep_merge(merged[k], v)
-                else:
-                    merged[k] = v
-        results.append({"id": str(wid), "ancestors": ancestors, "merged": merged})
-    return {"status": status.API_OK, "data": results, "failed": failed}
+
+    def build(snapshot):
+        results = []
+        failed: list[str] = []
+        for wid in word_ids:
+            flattened = snapshot.flatten(wid, MAX_WORD_DEPTH)
+            if flattened is None:
+                failed.append(str(wid))
+                continue
+            results.append(flattened)
+        return {"status": status.API_OK, "data": results, "failed": failed}
+
+    return _taxonomy_response(request, db, build)
 
 
 @router.get("/api/words/subtree_cte/{word_id}")
-def get_subtree_cte(word_id: uuid.UUID, db: Session = Depends(db.get_db)):
-    data = word_crud.build_subtree_cte_flat(db, root_id=str(word_id), max_depth=MAX_WORD_DEPTH)
-    if not data:
-        return {"status": status.API_INVALID_PARAMETER, "message": "word not found"}
-    return {"status": status.API_OK, "data": data}
+def get_subtree_cte(request: Request, word_id: uuid.UUID, db: Session = Depends(db.get_db)):
+    """同 /api/words/subtree/{word_id}。数据来自进程内词汇层级快照：其它进程 / 直接 SQL 的修改最多延迟 TAXONOMY_REFRESH_SECONDS（默认 300）秒可见。"""
+    return get_subtree(request, word_id, db)
 
 
 @router.post("/api/words/search")
 def search_words(query: schemas.SearchWordsQuery, db: Session = Depends(db.get_db)):
-    total, items = word_crud.search_words(
-        db=db,
-        author=query.author,
-        review_status_prefix=query.review_status_prefix,
-        name_contains=query.name_contains,
-        start=query.start,
-        size=query.size,
-    )
+    try:
+        total, items, next_cursor = word_crud.search_words(
+            db=db,
+            author=query.author,
+            review_status_prefix=query.review_status_prefix,
+            name_contains=query.name_contains,
+            start=query.start,
+            size=query.size,
+            cursor=query.cursor,
+        )
+    except pagination.InvalidCursor as e:
+        return {"status": status.API_INVALID_PARAMETER, "message": str(e)}
     serialized = []
     for o in items:
         d = {"id": str(o.id)}
@@ -607,4 +607,4 @@ def search_words(query: schemas.SearchWordsQuery, db: Session = Depends(db.get_d
             if (not d.get("english_name")) and d.get("chinese_name"):
                 d["english_name"] = d["chinese_name"]
         serialized.append(d)
-    return {"status": status.API_OK, "total": total, "data": serialized}
+    return {"status": status.API_OK, "total": total, "data": serialized, "next_cursor": next_cursor}
@@ -0,0 +1,120 @@
+"""Benchmark of the data submission payload normalizer (no database needed).
+
+Usage (example, from the backend directory):
+  python benchmarks/bench_web_submit.py
+  python benchmarks/bench_web_submit.py --fields 400 --depth 3 --rounds 200
+
+Builds a synthetic nested template (`word_order`) and a matching JSON payload,
+checks that web_submit.compile_word_order produces exactly the same result as
+web_submit.get_development_data_rec, then times both.
+Return codes:
+  0 success
+  1 invalid args
+  2 outputs differ
+"""
+import argparse
+import copy
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_parser import web_submit  # noqa: E402
+
+
+def build_template(fields: int, depth: int):
+    """返回 (word_order, payload)：单值字段与数组 / 对象嵌套交替出现。"""
+
+    def level(prefix: str, count: int, remaining: int):
+        order, payload = [], {}
+        for i in range(count):
+            title = f"{prefix}{i}"
+            kind = i % 8
+            if kind == 0:
+                order.append({"title": title, "type": "string", "required": True})
+                payload[title] = f"值{i}"
+            elif kind == 1:
+                order.append({"title": title, "type": "number", "unit": "mm"})
+                payload[title] = i * 1.5
+            elif kind == 2:
+                order.append({"title": title, "type": "number_range", "unit": "MPa"})
+                payload[title] = {"start": i, "end": i + 10}
+            elif kind == 3:
+                order.append({"title": title, "type": "enum_text"})
+                payload[title] = ["a", "b"]
+            elif kind == 4:
+                order.append({"title": title, "type": "file"})
+                payload[title] = f"file:{title}.png:sha{i}"
+            elif kind == 5:
+                order.append(
+                    {"title": title, "type": "array", "order": [{"title": "元素", "type": "number", "unit": "g"}]}
+                )
+                payload[title] = list(range(20))
+            elif kind == 6 and remaining > 0:
+                sub_order, sub_payload = level(title + "-", max(count // 4, 4), remaining - 1)
+                order.append({"title": title, "type": "object", "order": sub_order})
+                payload[title] = sub_payload
+            elif kind == 7 and remaining > 0:
+                sub_order, sub_payload = level(title + "-", 4, remaining - 1)
+                order.append(
+                    {
+                        "title": title,
+                        "type": "array",
+                        "order": [{"title": "行", "type": "object", "order": sub_order}],
+                    }
+                )
+                payload[title] = [dict(sub_payload) for _ in range(5)]
+            else:
+                order.append({"title": title, "type": "date"})
+                payload[title] = "2024-01-01"
+        return order, payload
+
+    return level("字段", fields, depth)
+
+
+def main(argv: list) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--fields", type=int, default=200)
+    parser.add_argument("--depth", type=int, default=2)
+    parser.add_argument("--rounds", type=int, default=100)
+    try:
+        args = parser.parse_args(argv)
+    except SystemExit:
+        return 1
+
+    word_order, payload = build_template(args.fields, args.depth)
+    raw = json.dumps(payload, ensure_ascii=False)
+    run = web_submit.compile_word_order(word_order)
+
+    legacy_content, compiled_content = [], []
+    legacy = web_submit.get_development_data_rec(raw, word_order, legacy_content)
+    compiled = run(raw, compiled_content)
+    if json.dumps([legacy, legacy_content]) != json.dumps([compiled, compiled_content]):
+        print("[ERR] compiled normalizer output differs from get_development_data_rec")
+        return 2
+    print(f"[OK] outputs identical: top-level fields={args.fields} depth={args.depth} payload={len(raw)} bytes")
+
+    def timed(name, fn):
+        seconds = min(timeit.repeat(fn, number=args.rounds, repeat=3)) / args.rounds
+        print(f"  {name:<28} {seconds * 1000:8.3f} ms/call")
+        return seconds
+
+    print("normalize (parse + walk):")
+    before = timed("get_development_data_rec", lambda: web_submit.get_development_data_rec(raw, word_order, []))
+    after = timed("compiled", lambda: run(raw, []))
+    print(f"  speedup x{before / after:.2f}")
+    # 已解析的 payload（批量提交中已是对象的记录）：只剩遍历；deepcopy 抵消 file 字段改写，两边同样计入
+    print("normalize (pre-parsed payload, walk only):")
+    before = timed("get_development_data_rec", lambda: web_submit.get_development_data_rec(copy.deepcopy(payload), word_order, []))
+    after = timed("compiled", lambda: run(copy.deepcopy(payload), []))
+    copying = timed("deepcopy alone", lambda: copy.deepcopy(payload))
+    print(f"  speedup x{(before - copying) / (after - copying):.2f} (deepcopy subtracted)")
+    timed("safe_json_loads alone", lambda: web_submit.safe_json_loads(raw))
+    timed("compile_word_order (once)", lambda: web_submit.compile_word_order(word_order))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,32 +1,23 @@
 import os
 import logging
+import time
 from datetime import datetime, timedelta, timezone
 from typing import Optional, List, Callable
 
 from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from passlib.context import CryptContext
-
-# --- bcrypt compatibility shim (passlib expects bcrypt.__about__.__version__) ---
-try:
-    import bcrypt as _bcrypt_mod  # type: ignore
-    if not getattr(_bcrypt_mod, "__about__", None):
-        class _About:  # minimal stub
-            __version__ = getattr(_bcrypt_mod, "__version__", "0")
-        _bcrypt_mod.__about__ = _About()  # type: ignore[attr-defined]
-except Exception:
-    # If anything fails we ignore; passlib will still work (only a warning suppressed)
-    pass
 from pydantic import BaseModel
 
-from database import user_crud, models
+from database import user_crud
 # Logger
 auth_logger = logging.getLogger("auth")
 if not auth_logger.handlers:
     logging.basicConfig(level=logging.INFO, format="[%(asctime)s] %(levelname)s %(name)s: %(message)s")
 from sqlalchemy.orm import Session
-from common import db
+from common import cache, db
+from common.password_hasher import hasher
 from settings import settings
 
 # --- Configuration ---
@@ -50,12 +41,28 @@ class TokenPair(BaseModel):
 class TokenData(BaseModel):
     username: Optional[str] = None
 
+class CurrentUser(BaseModel):
+    """已认证用户：来自访问令牌中的声明或数据库，受保护接口只依赖这些字段。"""
+    user_name: str
+    user_type: Optional[str] = None
+    organization: Optional[str] = None
+    country: Optional[str] = None
+    display_name: Optional[str] = None
+
+    @classmethod
+    def from_user(cls, user) -> "CurrentUser":
+        return cls(
+            user_name=user.user_name,
+            user_type=user.user_type,
+            organization=user.organization,
+            country=user.country,
+            display_name=getattr(user, "display_name", None),
+        )
+
 # --- Security Setup ---
 
-# Password Hashing context
-# Revert to pure bcrypt to avoid ambiguous detection between bcrypt_sha256 and raw bcrypt hashes.
-# We rely on PostgreSQL pgcrypto (crypt) which produces standard bcrypt ($2a/$2b) hashes.
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")  # retained for potential future use
+# Password hashing / verification run in-process on common.password_hasher (standard bcrypt
+# $2a/$2b, compatible with hashes previously produced by PostgreSQL pgcrypto crypt()).
 
 # OAuth2 Scheme
 # The tokenUrl points to our future login endpoint.
@@ -65,49 +72,38 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/token", auto_error=True)
 # --- Password and Token Utility Functions ---
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify password using PostgreSQL pgcrypto directly.
+    """Verify a bcrypt hash in-process (bounded executor, no DB connection).
 
-    We avoid passlib here due to observed false negatives where crypt() matches
-    but passlib.verify() returns False. Bcrypt truncates >72 chars internally; we emulate.
+    We avoid passlib here due to observed false negatives on pgcrypto hashes;
+    bcrypt only uses the first 72 bytes, same as pgcrypto.
     """
-    if len(plain_password) > 72:
-        plain_password = plain_password[:72]
-    try:
-        from sqlalchemy import text
-        from database.base import engine as _eng
-        with _eng.connect() as conn:
-            row = conn.execute(text("SELECT crypt(:p, :h)=:h AS m"), {"p": plain_password, "h": hashed_password}).first()
-            return bool(row and row[0])
-    except Exception as e:
-        auth_logger.warning(f"verify_password_pgcrypto_failed err={e}")
-        return False
+    return hasher.verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
-    """Generate bcrypt hash using PostgreSQL pgcrypto (crypt + gen_salt('bf', 12)).
+    """Generate a bcrypt hash (cost PASSWORD_HASH_ROUNDS) in-process.
 
-    This enforces a single hashing source (database). If pgcrypto is misconfigured,
-    we raise an explicit 500 error to avoid silently mixing hashing schemes.
+    Raises 503 when the hashing queue is full.
     """
-    from sqlalchemy import text
-    from database.base import engine
-    try:
-        with engine.connect() as conn:
-            row = conn.execute(text("SELECT crypt(:p, gen_salt('bf', 12)) AS h"), {"p": password}).first()
-            if row and row[0]:
-                return row[0]
-    except Exception as e:
-        auth_logger.error(f"pgcrypto hash failed (no fallback): {e}")
-        raise HTTPException(status_code=500, detail="Password hashing service unavailable")
-    raise HTTPException(status_code=500, detail="Password hashing service unavailable (empty result)")
+    return hasher.hash(password)
+
+def user_claims(user) -> dict:
+    """写入访问令牌的用户声明（角色 / 机构 / 国家 / 显示名），见 get_current_user。"""
+    return {
+        "role": user.user_type,
+        "org": user.organization,
+        "country": user.country,
+        "name": getattr(user, "display_name", None),
+    }
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Creates a new JWT access token."""
     to_encode = data.copy()
+    now = datetime.now(timezone.utc)
     if expires_delta:
-        expire = datetime.now(timezone.utc) + expires_delta
+        expire = now + expires_delta
     else:
-        expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+        expire = now + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    to_encode.update({"exp": expire, "iat": now})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
@@ -119,7 +115,8 @@ def create_refresh_token(username: str):
 def decode_token(token: str):
     return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
 
-def refresh_access_token(refresh_token: str):
+def refresh_access_token(refresh_token: str, db_session: Optional[Session] = None):
+    """用刷新令牌换新的令牌对；传入 db_session 时重新读取用户（已删除则 401）并写入最新声明。"""
     try:
         payload = decode_token(refresh_token)
         if payload.get("type") != "refresh":
@@ -127,7 +124,13 @@ def refresh_access_token(refresh_token: str):
         username = payload.get("sub")
         if not username:
             raise HTTPException(status_code=400, detail="Invalid token subject")
-        new_access = create_access_token({"sub": username}, expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
+        data = {"sub": username}
+        if db_session is not None:
+            principal = load_principal(db_session, username)
+            if principal is None:
+                raise HTTPException(status_code=401, detail="Refresh token invalid or expired")
+            data.update(user_claims(principal))
+        new_access = create_access_token(data, expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
         new_refresh = create_refresh_token(username)
         return TokenPair(access_token=new_access, refresh_token=new_refresh)
     except JWTError:
@@ -136,12 +139,15 @@ def refresh_access_token(refresh_token: str):
 
 # --- Main Authentication Functions ---
 
-def authenticate_user(db_session: Session, username: str, password: str):
+async def authenticate_user(db_session: Session, username: str, password: str):
     """
     Finds a user by username and verifies their password.
     Returns the user object if successful, otherwise returns False.
+    The only DB access is the user lookup; the session is closed before the
+    bcrypt check so the connection is not held while hashing.
     """
-    user = user_crud.get_userinfo_by_name(db=db_session, name=username)
+    user = await run_in_threadpool(user_crud.get_userinfo_by_name, db=db_session, name=username)
+    db_session.close()
     if not user:
         auth_logger.info(f"login failed: user_not_found username={username}")
         return False
@@ -149,29 +155,53 @@ def authenticate_user(db_session: Session, username: str, password: str):
     if not hp:
         auth_logger.info(f"login failed: empty_hash username={username}")
         return False
-    if not verify_password(password, hp):
-        # 追加二级校验：直接用 pgcrypto crypt 比较，区分哈希不匹配还是 passlib 解析异常
-        pgcrypto_match = None
-        try:
-            from sqlalchemy import text
-            from database.base import engine as _eng
-            with _eng.connect() as _conn:
-                row = _conn.execute(text("SELECT crypt(:p, :h)=:h AS m"), {"p": password, "h": hp}).first()
-                if row is not None:
-                    pgcrypto_match = bool(row[0])
-        except Exception as e:
-            auth_logger.warning(f"debug_pgcrypto_failed username={username} err={e}")
-        auth_logger.info(
-            f"login failed: bad_password username={username} hash_prefix={hp[:12]} len_pwd={len(password)} pgcrypto_match={pgcrypto_match}"
-        )
+    if not await hasher.verify_async(password, hp):
+        auth_logger.info(f"login failed: bad_password username={username}")
         return False
-    auth_logger.info(f"login success username={username} method=pgcrypto")
+    auth_logger.info(f"login success username={username} method=bcrypt")
     return user
 
+def _principal_from_claims(username: str, payload: dict) -> Optional[CurrentUser]:
+    """令牌签发不超过 AUTH_TOKEN_CLAIMS_MAX_AGE 秒、且签发后该用户未被改角色 / 删除时，直接信任其中的声明。"""
+    max_age = settings.AUTH_TOKEN_CLAIMS_MAX_AGE
+    issued = payload.get("iat")
+    # 缺少任一声明（如加入 name 之前签发的令牌）时回退查库
+    if max_age <= 0 or not {"role", "name"} <= payload.keys() or not isinstance(issued, (int, float)):
+        return None
+    if time.time() - issued > max_age or issued <= cache.user_revoked_at(username):
+        return None
+    return CurrentUser(
+        user_name=username,
+        user_type=payload.get("role"),
+        organization=payload.get("org"),
+        country=payload.get("country"),
+        display_name=payload.get("name"),
+    )
+
+def load_principal(db_session: Session, username: str, payload: Optional[dict] = None) -> Optional[CurrentUser]:
+    """缓存 -> 令牌声明 -> 数据库，结果缓存 AUTH_USER_CACHE_TTL 秒（角色变更 / 删除时即时失效）。"""
+    principal = cache.auth_user_cache.get(username)
+    if principal is not None:
+        return principal
+    principal = _principal_from_claims(username, payload or {})
+    if principal is None:
+        revoked_at = cache.user_revoked_at(username)
+        user = user_crud.get_userinfo_by_name(db=db_session, name=username)
+        if user is None:
+            return None
+        principal = CurrentUser.from_user(user)
+        if cache.user_revoked_at(username) != revoked_at:
+            # 查询期间角色被修改：本次结果不入缓存
+            return principal
+    cache.auth_user_cache.set(username, principal)
+    return principal
+
 async def get_current_user(token: str = Depends(oauth2_scheme), db_session: Session = Depends(db.get_db)):
     """
-    Decodes the JWT token, validates it, and returns the user model.
+    Decodes the JWT token, validates it, and returns the authenticated user.
     This function will be used as a dependency for protected endpoints.
+    Role / organization / country come from the token claims or a short-TTL
+    cache, so most requests do not query the users table (see load_principal).
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -188,12 +218,12 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db_session: Sess
         raise credentials_exception
     
     assert isinstance(token_data.username, str)
-    user = user_crud.get_userinfo_by_name(db=db_session, name=token_data.username)
+    user = load_principal(db_session, token_data.username, payload)
     if user is None:
         raise credentials_exception
     return user
 
-async def get_current_active_user(current_user: models.User = Depends(get_current_user)):
+async def get_current_active_user(current_user: CurrentUser = Depends(get_current_user)):
     # 未来可扩展 is_active 字段
     return current_user
 
@@ -207,7 +237,7 @@ def require_roles(roles: List[str]) -> Callable:
     """
     role_set = {r.strip().lower() for r in roles}
 
-    def _dependency(current_user: models.User = Depends(get_current_active_user)):
+    def _dependency(current_user: CurrentUser = Depends(get_current_active_user)):
         raw = getattr(current_user, "user_type", "") or ""
         normalized = raw.strip().lower()
         # 兼容旧数据可能存在的填充空格/大小写问题
@@ -0,0 +1,160 @@
+"""进程内响应缓存（TTL + LRU），用于公开只读接口。
+
+缓存值应为已序列化的响应（jsonable_encoder 之后的 dict / list），
+不要缓存 ORM 对象。条目可带标签（如对象 id），对象变化时按标签失效。
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable
+
+from settings import settings
+
+_MISSING = object()
+
+
+class TTLCache:
+    def __init__(self, name: str, maxsize: int, ttl: float):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._tags: Dict[Hashable, set] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING and entry[0] > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not _MISSING:
+                self._remove(key)
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any, tags: Iterable[Hashable] = ()) -> None:
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            tags = tuple(tags)
+            self._data[key] = (time.monotonic() + self.ttl, value, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._data) > self.maxsize:
+                self._remove(next(iter(self._data)))
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+                self.invalidations += 1
+
+    def invalidate_tag(self, tag: Hashable) -> None:
+        with self._lock:
+            for key in list(self._tags.get(tag, ())):
+                self._remove(key)
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self.invalidations += len(self._data)
+            self._data.clear()
+            self._tags.clear()
+
+    def _remove(self, key: Hashable) -> None:
+        _, _, tags = self._data.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+_registry: Dict[str, TTLCache] = {}
+
+
+def get_cache(name: str, maxsize: int = None, ttl: float = None) -> TTLCache:
+    """按名称取（或创建）缓存实例，同名共享。"""
+    if name not in _registry:
+        _registry[name] = TTLCache(
+            name,
+            maxsize or settings.RESPONSE_CACHE_SIZE,
+            ttl or settings.RESPONSE_CACHE_TTL,
+        )
+    return _registry[name]
+
+
+def stats() -> dict:
+    return {name: c.stats() for name, c in _registry.items()}
+
+
+# 公开只读接口的响应缓存
+search_cache = get_cache("search")
+word_cache = get_cache("word")
+template_cache = get_cache("template")
+MGID_cache = get_cache("MGID")
+# 认证用户（见 common.auth.get_current_user）
+auth_user_cache = get_cache("auth_user", ttl=settings.AUTH_USER_CACHE_TTL)
+# 数据提交路径的模板编译结果（见 common.compiled_template）
+compiled_template_cache = get_cache(
+    "compiled_template", settings.COMPILED_TEMPLATE_CACHE_SIZE, settings.COMPILED_TEMPLATE_CACHE_TTL
+)
+
+
+def invalidate_object(object_id) -> None:
+    """对象（词汇 / 数据 / MGID 申请）内容或审核状态变化后调用。"""
+    key = str(object_id)
+    word_cache.invalidate(key)
+    MGID_cache.invalidate_tag(key)
+    # 检索结果可能包含任意对象，整体失效
+    search_cache.clear()
+
+
+def invalidate_template(template_id) -> None:
+    """模板内容或审核状态变化后调用；同时失效该模板下对象的 MGID 解析结果。"""
+    key = str(template_id)
+    template_cache.invalidate(key)
+    compiled_template_cache.invalidate(key)
+    MGID_cache.invalidate_tag(key)
+    search_cache.clear()
+
+
+# 用户名 -> 最近一次角色变更 / 删除的时间；"*" 表示全部用户
+_user_revoked_at: Dict[str, float] = {}
+
+
+def invalidate_user(user_name: str = None) -> None:
+    """用户角色变更 / 删除后调用（不传用户名表示全部用户）：
+    失效认证缓存，且此前签发的令牌中的声明不再直接信任。"""
+    key = user_name or "*"
+    _user_revoked_at[key] = time.time()
+    if user_name is None:
+        auth_user_cache.clear()
+    else:
+        auth_user_cache.invalidate(user_name)
+
+
+def user_revoked_at(user_name: str) -> float:
+    return max(_user_revoked_at.get(user_name, 0.0), _user_revoked_at.get("*", 0.0))
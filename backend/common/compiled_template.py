@@ -0,0 +1,92 @@
+"""数据提交热路径使用的模板编译结果（按模板 id 缓存，LRU + TTL）。
+
+提交 / 更新数据、样品检索每次都要用到模板的 word_order 与引用格式，
+原先每次读取整行模板（json_schema 含 schema、origin_* 等大字段）。
+这里缓存解析后的只读结果；模板内容 / 审核状态变化时由 cache.invalidate_template 失效，
+TTL 兜住其它进程或直接 SQL 的修改。
+"""
+import hashlib
+import json
+import uuid
+from typing import Optional
+
+from common import cache, utils
+from data_parser import web_submit
+from database import template_crud
+
+
+class CompiledTemplate:
+    """只读：word_order 等字段在请求之间共享，调用方不得修改。"""
+
+    __slots__ = (
+        "id",
+        "name",
+        "version",
+        "word_order",
+        "normalize",
+        "type_map",
+        "data_generate_method",
+        "institution",
+        "template_type",
+        "citation_template",
+    )
+
+    def __init__(self, template):
+        schema = template.json_schema or {}
+        self.id = str(template.id)
+        self.name = template.name
+        self.word_order = schema.get("word_order", [])
+        try:
+            # normalize(post_data, data_content_out) -> (normalized, errors)
+            self.normalize = web_submit.compile_word_order(self.word_order)
+        except Exception:
+            # word_order 结构不完整时退回逐项解释执行，出错时机与原来一致（提交到该字段时）
+            word_order = self.word_order
+            self.normalize = lambda post_data, out: web_submit.get_development_data_rec(
+                post_data, word_order, out
+            )
+        self.type_map = {
+            obj.get("title"): obj.get("type") for obj in self.word_order if isinstance(obj, dict)
+        }
+        self.data_generate_method = schema.get("data_generate_method")
+        self.institution = schema.get("institution")
+        self.template_type = schema.get("template_type")
+        self.citation_template = "{}，{}[{}].".format(
+            schema.get("source_standard_number", ""),
+            template.name,
+            utils.template_source_type(self.data_generate_method, self.template_type),
+        )
+        # 内容版本：只取编译结果依赖的字段（citation_count 等计数变化不影响）
+        content = [
+            self.name,
+            self.word_order,
+            self.data_generate_method,
+            self.institution,
+            self.template_type,
+            self.citation_template,
+        ]
+        self.version = hashlib.sha1(
+            json.dumps(content, ensure_ascii=False, sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()[:16]
+
+
+def _key(template_id) -> Optional[str]:
+    try:
+        return str(uuid.UUID(str(template_id)))
+    except ValueError:
+        return None
+
+
+def get(db, template_id) -> Optional[CompiledTemplate]:
+    """取模板的编译结果；模板不存在返回 None。"""
+    key = _key(template_id)
+    if key is None:
+        return None
+    compiled = cache.compiled_template_cache.get(key)
+    if compiled is None:
+        template = template_crud.get_template(db, key)
+        if template is None:
+            return None
+        compiled = CompiledTemplate(template)
+        cache.compiled_template_cache.set(key, compiled)
+    return compiled
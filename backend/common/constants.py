@@ -57,3 +57,8 @@ EXCLUDETEMPLATES = (
 )
 
 ADMIN_LEVEL = {"super_admin": 0, "admin": 1, "normal": 2}
+
+USER_NAME_MAX_LENGTH = 64
+
+# bcrypt 只使用密码的前 72 字节
+PASSWORD_MAX_BYTES = 72
@@ -15,3 +15,16 @@ class FileWriteFailError(Error):
     def __init__(self, message, file_name=""):
         self.file_name = file_name
         self.message = message
+
+
+class DuplicateMGIDError(Error):
+    """Exception raised when an object write collides with an MGID already in use.
+
+    Attributes:
+        MGID -- the colliding MGID
+        message -- explanation of the error
+    """
+
+    def __init__(self, MGID, message="MGID already exists"):
+        self.MGID = MGID
+        self.message = message
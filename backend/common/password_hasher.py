@@ -0,0 +1,128 @@
+"""密码哈希 / 校验（bcrypt，进程内计算）。
+
+bcrypt（cost 12 约 0.2 秒）在独立的有界线程池中执行：不占用数据库连接、不阻塞事件循环，
+也不挤占 FastAPI 的默认线程池。已提交未完成的任务超过 PASSWORD_HASH_MAX_PENDING 时直接返回 503，
+登录洪峰时快速失败而不是无限排队。与 pgcrypto crypt() 生成的 $2a$ / $2b$ 哈希兼容。
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List
+
+import bcrypt
+from fastapi import HTTPException
+
+from settings import settings
+
+logger = logging.getLogger("password_hasher")
+
+
+def _encode(password: str) -> bytes:
+    # bcrypt 只使用前 72 字节（与 pgcrypto 一致）；bcrypt>=5 对超长输入会直接报错
+    return password.encode("utf-8")[:72]
+
+
+def _hash(password: str, rounds: int) -> str:
+    return bcrypt.hashpw(_encode(password), bcrypt.gensalt(rounds)).decode("ascii")
+
+
+def _hash_chunk(passwords: List[str], rounds: int) -> List[str]:
+    return [_hash(p, rounds) for p in passwords]
+
+
+def _verify(password: str, hashed: str) -> bool:
+    try:
+        return bcrypt.checkpw(_encode(password), hashed.encode("ascii"))
+    except ValueError:
+        # 非 bcrypt 格式的哈希
+        return False
+
+
+class PasswordHasher:
+    def __init__(self, workers: int, max_pending: int, rounds: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.rounds = rounds
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._lock = threading.Lock()
+        self._pending = 0  # 已提交未完成（排队 + 执行中）
+        self._running = 0
+        self._peak_pending = 0
+        self._completed = 0
+        self._rejected = 0
+        self._wait_seconds = 0.0
+        self._run_seconds = 0.0
+
+    def _submit(self, fn, *args) -> Future:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._rejected += 1
+                logger.warning(f"[password] queue full pending={self._pending}, rejected")
+                raise HTTPException(status_code=503, detail="Password hashing service busy")
+            self._pending += 1
+            self._peak_pending = max(self._peak_pending, self._pending)
+        submitted = time.monotonic()
+
+        def _run():
+            started = time.monotonic()
+            with self._lock:
+                self._running += 1
+                self._wait_seconds += started - submitted
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._pending -= 1
+                    self._completed += 1
+                    self._run_seconds += time.monotonic() - started
+
+        return self._executor.submit(_run)
+
+    def hash(self, password: str) -> str:
+        return self._submit(_hash, password, self.rounds).result()
+
+    def verify(self, password: str, hashed: str) -> bool:
+        return self._submit(_verify, password, hashed).result()
+
+    def hash_many(self, passwords: List[str], chunk_size: int = 8) -> List[str]:
+        """批量哈希：按小块提交，同时在途不超过 workers 块，登录等单条任务可穿插执行。"""
+        chunks = [passwords[i:i + chunk_size] for i in range(0, len(passwords), chunk_size)]
+        results = [None] * len(chunks)
+        in_flight = deque()
+        for index, chunk in enumerate(chunks):
+            if len(in_flight) >= self.workers:
+                done, future = in_flight.popleft()
+                results[done] = future.result()
+            in_flight.append((index, self._submit(_hash_chunk, chunk, self.rounds)))
+        for done, future in in_flight:
+            results[done] = future.result()
+        return [h for chunk in results for h in chunk]
+
+    async def verify_async(self, password: str, hashed: str) -> bool:
+        return await asyncio.wrap_future(self._submit(_verify, password, hashed))
+
+    def stats(self) -> dict:
+        with self._lock:
+            completed = self._completed
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "running": self._running,
+                "queue_depth": self._pending - self._running,
+                "peak_pending": self._peak_pending,
+                "completed": completed,
+                "rejected": self._rejected,
+                "avg_wait_ms": round(self._wait_seconds * 1000 / completed, 2) if completed else 0.0,
+                "avg_run_ms": round(self._run_seconds * 1000 / completed, 2) if completed else 0.0,
+            }
+
+
+hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+    rounds=settings.PASSWORD_HASH_ROUNDS,
+)
@@ -0,0 +1,164 @@
+"""国家、机构与用户资料（国家 / 机构 / 角色）的进程内缓存。
+
+MGID 生成、用户注册校验、模板表单生成按名称查这些小表，启动时（main.lifespan）整表加载，
+之后直接读内存。国家 / 机构导入或删除、用户增删改由 CRUD 调用 refresh_* 更新，
+另按 REFERENCE_DATA_REFRESH_SECONDS 在后台定期全量重建，兜住其它进程的修改。
+内存中查不到时回退查询一次数据库（其它进程刚写入的数据），查到即补入缓存。
+"""
+import logging
+import threading
+import time
+from collections import namedtuple
+from typing import Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from database import models
+from database.base import SessionLocal
+from settings import settings
+
+logger = logging.getLogger("reference_data")
+
+Entry = namedtuple("Entry", "id name")
+UserProfile = namedtuple("UserProfile", "user_name country organization user_type")
+
+
+def _user_rows(db: Session):
+    # 只取资料列，不加载密码哈希等整行数据
+    return db.query(
+        models.User.user_name, models.User.country, models.User.organization, models.User.user_type
+    )
+
+
+def _profile(user) -> UserProfile:
+    return UserProfile(user.user_name, user.country, user.organization, user.user_type)
+
+
+class ReferenceData:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._countries: Dict[str, Entry] = {}
+        self._organizations: Dict[str, Entry] = {}
+        self._users: Dict[str, UserProfile] = {}
+        self.loaded_at: Optional[float] = None
+        self._reloading = False
+
+    # ---- 全量加载 ----
+
+    def _load_locations(self, db: Session):
+        countries = {r.name: Entry(r.id, r.name) for r in db.query(models.Country.id, models.Country.name)}
+        organizations = {
+            r.name: Entry(r.id, r.name)
+            for r in db.query(models.Organization.id, models.Organization.name)
+        }
+        return countries, organizations
+
+    def load(self, db: Session):
+        countries, organizations = self._load_locations(db)
+        users = {u.user_name: _profile(u) for u in _user_rows(db)}
+        with self._lock:
+            self._countries, self._organizations, self._users = countries, organizations, users
+            self.loaded_at = time.monotonic()
+        logger.info(
+            f"[reference] loaded: countries={len(countries)} "
+            f"organizations={len(organizations)} users={len(users)}"
+        )
+
+    def _reload_in_background(self):
+        with self._lock:
+            if self._reloading:
+                return
+            self._reloading = True
+
+        def _run():
+            db = SessionLocal()
+            try:
+                self.load(db)
+            except Exception as e:
+                logger.warning(f"[reference] reload failed: {e!r}")
+            finally:
+                db.close()
+                self._reloading = False
+
+        threading.Thread(target=_run, name="reference-reload", daemon=True).start()
+
+    def ensure_fresh(self, db: Session):
+        """首次使用时同步加载；过期后在后台重建，期间继续使用旧数据。"""
+        if self.loaded_at is None:
+            with self._lock:
+                if self.loaded_at is None:
+                    self.load(db)
+            return
+        if time.monotonic() - self.loaded_at > settings.REFERENCE_DATA_REFRESH_SECONDS:
+            self._reload_in_background()
+
+    # ---- 查询 ----
+
+    def country(self, db: Session, name: str) -> Optional[Entry]:
+        self.ensure_fresh(db)
+        entry = self._countries.get(name)
+        if entry is None and name:
+            row = db.query(models.Country.id, models.Country.name).filter(models.Country.name == name).first()
+            if row is not None:
+                entry = self._countries[name] = Entry(row.id, row.name)
+        return entry
+
+    def organization(self, db: Session, name: str) -> Optional[Entry]:
+        self.ensure_fresh(db)
+        entry = self._organizations.get(name)
+        if entry is None and name:
+            row = (
+                db.query(models.Organization.id, models.Organization.name)
+                .filter(models.Organization.name == name)
+                .first()
+            )
+            if row is not None:
+                entry = self._organizations[name] = Entry(row.id, row.name)
+        return entry
+
+    def user(self, db: Session, name: str) -> Optional[UserProfile]:
+        self.ensure_fresh(db)
+        profile = self._users.get(name)
+        if profile is None and name:
+            user = _user_rows(db).filter(models.User.user_name == name).first()
+            if user is not None:
+                profile = self._users[name] = _profile(user)
+        return profile
+
+    # ---- 增量更新 ----
+
+    def refresh_locations(self, db: Session):
+        """国家 / 机构导入或删除后调用（两张表都很小，直接重读）。"""
+        if self.loaded_at is None:
+            return
+        try:
+            countries, organizations = self._load_locations(db)
+        except Exception as e:
+            logger.warning(f"[reference] refresh locations failed: {e!r}")
+            self._reload_in_background()
+            return
+        with self._lock:
+            self._countries, self._organizations = countries, organizations
+
+    def refresh_user(self, db: Session, name: str):
+        if self.loaded_at is None:
+            return
+        try:
+            user = _user_rows(db).filter(models.User.user_name == name).first()
+        except Exception as e:
+            logger.warning(f"[reference] refresh user {name} failed: {e!r}")
+            self._reload_in_background()
+            return
+        with self._lock:
+            if user is None:
+                self._users.pop(name, None)
+            else:
+                self._users[name] = _profile(user)
+
+    def invalidate_users(self):
+        """无法确定具体用户的修改（如按编号删除）后触发后台重建。"""
+        if self.loaded_at is not None:
+            self._reload_in_background()
+
+
+reference = ReferenceData()
@@ -0,0 +1,267 @@
+"""输入联想（search-as-you-type）的内存索引。
+
+索引已审核通过的词汇、可检索模板与机构名称：
+- 前缀：归一化名称的有序列表 + 二分查找；
+- 子串：名称的单字 / 二元组倒排表，取交集后再校验。
+词汇 / 模板审核状态或内容变化时由 CRUD 调用 refresh_* 增量更新，
+另按 SUGGEST_REFRESH_SECONDS 在后台定期全量重建，兜住绕过 CRUD 的修改。
+"""
+import bisect
+import logging
+import threading
+import time
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from common import constants
+from database import models
+from database.base import SessionLocal
+from settings import settings
+
+logger = logging.getLogger("suggest")
+
+KIND_WORD = "word"
+KIND_TEMPLATE = "template"
+KIND_ORGANIZATION = "organization"
+KINDS = (KIND_WORD, KIND_TEMPLATE, KIND_ORGANIZATION)
+
+
+def normalize(text: str) -> str:
+    return unicodedata.normalize("NFKC", text or "").strip().lower()
+
+
+def _grams(text: str) -> set:
+    grams = set(text)
+    grams.update(text[i : i + 2] for i in range(len(text) - 1))
+    return grams
+
+
+class _KindIndex:
+    """单一类型的索引；条目键为 id，每个条目可有多个名称（如中英文名）。"""
+
+    def __init__(self):
+        self.entries: Dict[str, dict] = {}
+        self.names: Dict[str, Tuple[str, ...]] = {}
+        self.sorted_names: List[Tuple[str, str]] = []
+        self.grams: Dict[str, set] = {}
+
+    def upsert(self, entry_id: str, names, payload: dict):
+        self.remove(entry_id)
+        normalized = tuple(dict.fromkeys(n for n in map(normalize, names) if n))
+        if not normalized:
+            return
+        self.entries[entry_id] = payload
+        self.names[entry_id] = normalized
+        for name in normalized:
+            bisect.insort(self.sorted_names, (name, entry_id))
+            for gram in _grams(name):
+                self.grams.setdefault(gram, set()).add(entry_id)
+
+    def remove(self, entry_id: str):
+        names = self.names.pop(entry_id, None)
+        self.entries.pop(entry_id, None)
+        if not names:
+            return
+        for name in names:
+            i = bisect.bisect_left(self.sorted_names, (name, entry_id))
+            if i < len(self.sorted_names) and self.sorted_names[i] == (name, entry_id):
+                del self.sorted_names[i]
+            for gram in _grams(name):
+                ids = self.grams.get(gram)
+                if ids is not None:
+                    ids.discard(entry_id)
+                    if not ids:
+                        del self.grams[gram]
+
+    def search(self, q: str, k: int, deadline: float) -> Tuple[List[dict], bool]:
+        """返回 (结果, 是否因超出时间预算而截断)；排序：完全匹配 > 前缀 > 子串，名称短者优先。"""
+        ranked = {}
+        # 前缀匹配：有序列表上二分
+        i = bisect.bisect_left(self.sorted_names, (q, ""))
+        while i < len(self.sorted_names) and self.sorted_names[i][0].startswith(q):
+            name, entry_id = self.sorted_names[i]
+            rank = (0 if name == q else 1, len(name))
+            if entry_id not in ranked or rank < ranked[entry_id]:
+                ranked[entry_id] = rank
+            i += 1
+            if len(ranked) >= k * 4:
+                break
+        truncated = False
+        if len(ranked) < k:
+            grams = _grams(q) if len(q) > 1 else {q}
+            candidates = None
+            for gram in sorted(grams, key=lambda g: len(self.grams.get(g, ()))):
+                ids = self.grams.get(gram)
+                if not ids:
+                    candidates = set()
+                    break
+                candidates = set(ids) if candidates is None else candidates & ids
+            for n, entry_id in enumerate(candidates or ()):
+                if entry_id in ranked:
+                    continue
+                if n % 256 == 0 and time.perf_counter() > deadline:
+                    truncated = True
+                    break
+                matched = [name for name in self.names[entry_id] if q in name]
+                if matched:
+                    ranked[entry_id] = (2, min(len(name) for name in matched))
+        top = sorted(ranked.items(), key=lambda item: (item[1], item[0]))[:k]
+        return [self.entries[entry_id] for entry_id, _ in top], truncated
+
+
+class SuggestIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._kinds = {kind: _KindIndex() for kind in KINDS}
+        self.loaded_at: Optional[float] = None
+        self._reloading = False
+
+    # ---- 全量加载 ----
+
+    def load(self, db: Session):
+        kinds = {kind: _KindIndex() for kind in KINDS}
+        for row in (
+            db.query(models.Object.id, models.Object.json_data)
+            .filter(models.Object.template_id == constants.WORD_TEMPLATE_ID)
+            .filter(models.Object.review_status.like(f"{constants.REVIEW_STATUS_PASSED_REVIEW}%"))
+        ):
+            _upsert_word(kinds[KIND_WORD], row.id, row.json_data)
+        for row in db.query(models.Template.id, models.Template.name, models.Template.json_schema):
+            _upsert_template(kinds[KIND_TEMPLATE], row.id, row.name, row.json_schema)
+        for row in db.query(models.Organization.id, models.Organization.name):
+            kinds[KIND_ORGANIZATION].upsert(
+                str(row.id), [row.name], {"id": str(row.id), "name": row.name}
+            )
+        with self._lock:
+            self._kinds = kinds
+            self.loaded_at = time.monotonic()
+        logger.info(
+            "[suggest] index loaded: "
+            + ", ".join(f"{kind}={len(index.entries)}" for kind, index in kinds.items())
+        )
+
+    def _reload_in_background(self):
+        with self._lock:
+            if self._reloading:
+                return
+            self._reloading = True
+
+        def _run():
+            db = SessionLocal()
+            try:
+                self.load(db)
+            except Exception as e:
+                logger.warning(f"[suggest] reload failed: {e!r}")
+            finally:
+                db.close()
+                self._reloading = False
+
+        threading.Thread(target=_run, name="suggest-reload", daemon=True).start()
+
+    def ensure_fresh(self, db: Session):
+        """首次使用时同步加载；过期后在后台重建，期间继续使用旧索引。"""
+        if self.loaded_at is None:
+            with self._lock:
+                if self.loaded_at is None:
+                    self.load(db)
+            return
+        if time.monotonic() - self.loaded_at > settings.SUGGEST_REFRESH_SECONDS:
+            self._reload_in_background()
+
+    # ---- 查询 ----
+
+    def suggest(self, q: str, kinds=KINDS, k: int = 10, budget_ms: Optional[float] = None):
+        q = normalize(q)
+        budget_ms = budget_ms or settings.SUGGEST_BUDGET_MS
+        deadline = time.perf_counter() + budget_ms / 1000
+        result, truncated = {}, False
+        with self._lock:
+            for kind in kinds:
+                if kind not in self._kinds:
+                    continue
+                if not q:
+                    result[kind] = []
+                    continue
+                result[kind], cut = self._kinds[kind].search(q, k, deadline)
+                truncated = truncated or cut
+        return result, truncated
+
+    # ---- 增量更新 ----
+
+    def refresh_word(self, db: Session, object_id):
+        if self.loaded_at is None:
+            return
+        try:
+            self._refresh_word(db, object_id)
+        except Exception as e:
+            # 写入已提交，联想索引更新失败只记录，等待定期全量重建
+            logger.warning(f"[suggest] refresh word {object_id} failed: {e!r}")
+
+    def _refresh_word(self, db: Session, object_id):
+        row = (
+            db.query(models.Object.id, models.Object.json_data, models.Object.review_status)
+            .filter(models.Object.id == object_id)
+            .filter(models.Object.template_id == constants.WORD_TEMPLATE_ID)
+            .first()
+        )
+        with self._lock:
+            index = self._kinds[KIND_WORD]
+            if row and (row.review_status or "").startswith(constants.REVIEW_STATUS_PASSED_REVIEW):
+                _upsert_word(index, row.id, row.json_data)
+            else:
+                index.remove(str(object_id))
+
+    def refresh_template(self, db: Session, template_id):
+        if self.loaded_at is None:
+            return
+        try:
+            self._refresh_template(db, template_id)
+        except Exception as e:
+            logger.warning(f"[suggest] refresh template {template_id} failed: {e!r}")
+
+    def _refresh_template(self, db: Session, template_id):
+        row = (
+            db.query(models.Template.id, models.Template.name, models.Template.json_schema)
+            .filter(models.Template.id == template_id)
+            .first()
+        )
+        with self._lock:
+            index = self._kinds[KIND_TEMPLATE]
+            if row:
+                _upsert_template(index, row.id, row.name, row.json_schema)
+            else:
+                index.remove(str(template_id))
+
+    def invalidate_organizations(self):
+        """机构表批量导入 / 删除后触发后台重建。"""
+        if self.loaded_at is not None:
+            self._reload_in_background()
+
+
+def _upsert_word(index: _KindIndex, word_id, json_data):
+    data = json_data if isinstance(json_data, dict) else {}
+    names = [data.get("chinese_name"), data.get("english_name")]
+    names = [n for n in names if isinstance(n, str)]
+    index.upsert(
+        str(word_id),
+        names,
+        {"id": str(word_id), "name": data.get("chinese_name"), "data_type": data.get("data_type")},
+    )
+
+
+def _upsert_template(index: _KindIndex, template_id, name, json_schema):
+    schema = json_schema if isinstance(json_schema, dict) else {}
+    searchable = (
+        str(template_id) not in constants.UNSEARCHABLE_TEMPLATE_ID_SET
+        and str(schema.get("review_status", "")).startswith(constants.REVIEW_STATUS_PASSED_REVIEW)
+        and schema.get("template_type") != "application"
+    )
+    if not searchable:
+        index.remove(str(template_id))
+        return
+    index.upsert(str(template_id), [name], {"id": str(template_id), "name": name})
+
+
+suggest_index = SuggestIndex()
@@ -0,0 +1,312 @@
+"""词汇层级的进程内快照：邻接表 + 每个节点的合并属性（flatten 结果）。
+
+/api/words/children_one、subtree、path、flatten 直接读快照，不再访问数据库。
+词汇创建 / 更新 / 审核 / 删除时由 CRUD 调用 refresh_word 增量更新单个节点，
+另按 TAXONOMY_REFRESH_SECONDS 在后台定期全量重建，兜住绕过 CRUD 的修改；
+因此其它进程（多 worker / 多实例）或直接 SQL 的修改最多延迟 TAXONOMY_REFRESH_SECONDS 秒可见。
+全量重建读取期间发生的增量更新会在替换快照时重放，旧的读取结果不会覆盖较新的节点。
+每次变化 version 加一，接口以 etag 作为 ETag 响应头。
+全量读取与响应构建都不持锁：每个版本是一份只读的 _View，增量更新写时复制出新版本后再切换。
+"""
+import copy
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from common import constants
+from database import models
+from database.base import SessionLocal
+from settings import settings
+
+logger = logging.getLogger("taxonomy")
+
+
+def parent_of(data: dict) -> Optional[str]:
+    """节点的父级 id；兼容旧字段 parent_word_id。"""
+    parent = data.get("super_class_id") or data.get("parent_word_id")
+    return str(parent) if parent else None
+
+
+def _is_root(data: dict) -> bool:
+    # 根节点：object 类型且无父级（JSONB 键缺失视为 NULL，与原 SQL 过滤条件一致）
+    return data.get("data_type") == "object" and (
+        "super_class_id" not in data
+        or data.get("super_class_id") == ""
+        or "parent_word_id" not in data
+    )
+
+
+def _deep_merge(dst: dict, src: dict):
+    for k, v in src.items():
+        if k in dst and isinstance(dst[k], dict) and isinstance(v, dict):
+            _deep_merge(dst[k], v)
+        else:
+            dst[k] = copy.deepcopy(v)
+
+
+def flatten_path(word_id: str, path: list) -> dict:
+    """将祖先链 (叶子 -> 根) 从根到叶依次合并, 返回 {id, ancestors, merged}"""
+    merged: dict = {}
+    ancestors: list[str] = []
+    for node in reversed(path):
+        node_id = node.get("id")
+        if node_id:
+            ancestors.append(node_id)
+        for k, v in node.items():
+            if k == "id":
+                continue
+            if isinstance(v, dict) and isinstance(merged.get(k), dict):
+                _deep_merge(merged[k], v)
+            else:
+                merged[k] = copy.deepcopy(v)
+    return {"id": word_id, "ancestors": ancestors, "merged": merged}
+
+
+class _View:
+    """某一版本的快照：邻接表、合并属性缓存与对应的 etag。
+
+    生效后不再原地修改（写入时复制出新的 _View），读取方拿到引用后无需持锁；
+    合并属性缓存按需填充，同一键并发写入的值相同。
+    """
+
+    def __init__(self, nodes: Dict[str, dict], children: Dict[str, List[str]], merged: Dict[str, dict], etag: str):
+        # id -> {"id", **json_data}
+        self.nodes = nodes
+        self.children_of = children
+        # 合并属性按需计算并缓存，节点或其祖先变化时在新版本中去掉
+        self.merged = merged
+        self.etag = etag
+
+    # ---- 查询（返回值只读） ----
+
+    def get(self, word_id) -> Optional[dict]:
+        return self.nodes.get(str(word_id))
+
+    def children(self, parent_id) -> List[dict]:
+        ids = self.children_of.get(str(parent_id), ())
+        return [self.nodes[i] for i in ids if i in self.nodes]
+
+    def roots(self) -> List[dict]:
+        return [node for node in self.nodes.values() if _is_root(node)]
+
+    def subtree_flat(self, root_id, max_depth: int) -> List[dict]:
+        """root 及其后代（层级 <= max_depth），按层级排序（层序，与原递归 CTE 实现的返回顺序一致，不是 DFS 先序）；
+        同层按父节点顺序、再按创建时间排列；未存 hierarchy_level 的按所在层补齐。"""
+        root = self.get(root_id)
+        if root is None:
+            return []
+        result, seen = [], {root["id"]}
+        queue = deque([(root, 1)])
+        while queue:
+            node, depth = queue.popleft()
+            data = dict(node)
+            data.setdefault("hierarchy_level", depth)
+            result.append(data)
+            if depth >= max_depth:
+                continue
+            for child in self.children(node["id"]):
+                if child["id"] not in seen:
+                    seen.add(child["id"])
+                    queue.append((child, depth + 1))
+        result.sort(key=lambda x: x.get("hierarchy_level", 9999))
+        return result
+
+    def path(self, word_id, max_depth: int) -> List[dict]:
+        """从当前节点到根节点的链（当前在前，根在后），最多 max_depth 个节点。"""
+        path, seen = [], set()
+        node = self.get(word_id)
+        while node is not None and len(path) < max_depth and node["id"] not in seen:
+            seen.add(node["id"])
+            path.append(node)
+            parent = parent_of(node)
+            node = self.nodes.get(parent) if parent else None
+        return path
+
+    def flatten(self, word_id, max_depth: int) -> Optional[dict]:
+        key = str(word_id)
+        flattened = self.merged.get(key)
+        if flattened is None:
+            path = self.path(key, max_depth)
+            if not path:
+                return None
+            flattened = self.merged[key] = flatten_path(key, path)
+        return flattened
+
+
+class TaxonomySnapshot:
+    def __init__(self):
+        # 只保护版本切换与加载 / 增量更新的簿记，不覆盖数据库读取与响应构建
+        self._lock = threading.RLock()
+        # 首次同步加载只执行一次，其它请求等待其完成
+        self._first_load = threading.Lock()
+        self._boot = uuid.uuid4().hex[:8]
+        self.version = 0
+        self._view = _View({}, {}, {}, self._etag(0))
+        self.loaded_at: Optional[float] = None
+        self._reloading = False
+        # 全量加载进行中时记录增量更新 (version, id, 节点或 None)，替换快照时重放
+        self._loads_in_flight = 0
+        self._changes: List[Tuple[int, str, Optional[dict]]] = []
+        # 已生效快照开始读取时的 version；开始更早的加载结果直接丢弃
+        self._loaded_from = -1
+
+    def _etag(self, version: int) -> str:
+        # 带进程启动标识：重启后版本号重新计数也不会与旧 ETag 冲突
+        return f'W/"taxonomy-{self._boot}-{version}"'
+
+    # ---- 全量加载 ----
+
+    def load(self, db: Session):
+        """读取全部词汇（不持锁），再在锁内重放读取期间的增量更新并切换版本。"""
+        with self._lock:
+            started = self.version
+            self._loads_in_flight += 1
+        replayed = 0
+        try:
+            nodes, children = {}, {}
+            rows = (
+                db.query(models.Object.id, models.Object.json_data)
+                .filter(models.Object.template_id == constants.WORD_TEMPLATE_ID)
+                .order_by(models.Object.create_timestamp, models.Object.id)
+            )
+            for row in rows:
+                node = _node(row.id, row.json_data)
+                nodes[node["id"]] = node
+                parent = parent_of(node)
+                if parent:
+                    children.setdefault(parent, []).append(node["id"])
+            with self._lock:
+                if started < self._loaded_from:
+                    logger.info("[taxonomy] stale snapshot load discarded")
+                    return
+                # 读取期间的增量更新可能比本次读到的行更新，按发生顺序重放
+                for version, key, node in self._changes:
+                    if version > started:
+                        _link(nodes, children, key, node)
+                        replayed += 1
+                self._loaded_from = started
+                self.version += 1
+                self._view = _View(nodes, children, {}, self._etag(self.version))
+                self.loaded_at = time.monotonic()
+        finally:
+            with self._lock:
+                self._loads_in_flight -= 1
+                if not self._loads_in_flight:
+                    self._changes = []
+        logger.info(
+            f"[taxonomy] snapshot loaded: words={len(nodes)} replayed={replayed} version={self.version}"
+        )
+
+    def _reload_in_background(self):
+        with self._lock:
+            if self._reloading:
+                return
+            self._reloading = True
+
+        def _run():
+            db = SessionLocal()
+            try:
+                self.load(db)
+            except Exception as e:
+                logger.warning(f"[taxonomy] reload failed: {e!r}")
+            finally:
+                db.close()
+                self._reloading = False
+
+        threading.Thread(target=_run, name="taxonomy-reload", daemon=True).start()
+
+    def ensure_fresh(self, db: Session):
+        """首次使用时同步加载；过期后在后台重建，期间继续使用旧快照。"""
+        if self.loaded_at is None:
+            with self._first_load:
+                if self.loaded_at is None:
+                    self.load(db)
+            return
+        if time.monotonic() - self.loaded_at > settings.TAXONOMY_REFRESH_SECONDS:
+            self._reload_in_background()
+
+    @contextmanager
+    def read(self, db: Session):
+        """取当前版本的快照（数据与 etag 属于同一版本）；构建响应期间不持锁。"""
+        self.ensure_fresh(db)
+        with self._lock:
+            view = self._view
+        yield view
+
+    # ---- 增量更新 ----
+
+    def refresh_word(self, db: Session, object_id):
+        # 首次加载进行中也要记录，否则加载读到的旧行会覆盖这次修改
+        if self.loaded_at is None and not self._loads_in_flight:
+            return
+        try:
+            self._refresh_word(db, object_id)
+        except Exception as e:
+            # 写入已提交，快照更新失败只记录，并安排全量重建
+            logger.warning(f"[taxonomy] refresh word {object_id} failed: {e!r}")
+            self._reload_in_background()
+
+    def _refresh_word(self, db: Session, object_id):
+        row = (
+            db.query(models.Object.id, models.Object.json_data)
+            .filter(models.Object.id == object_id)
+            .filter(models.Object.template_id == constants.WORD_TEMPLATE_ID)
+            .first()
+        )
+        key = str(object_id)
+        node = _node(row.id, row.json_data) if row is not None else None
+        with self._lock:
+            # 写时复制：已交给读取方的旧版本保持不变
+            view = self._view
+            nodes, children = dict(view.nodes), dict(view.children_of)
+            _link(nodes, children, key, node)
+            merged = dict(view.merged)
+            _invalidate_merged(merged, children, key)
+            self.version += 1
+            self._view = _View(nodes, children, merged, self._etag(self.version))
+            if self._loads_in_flight:
+                self._changes.append((self.version, key, node))
+
+
+def _invalidate_merged(merged: Dict[str, dict], children: Dict[str, List[str]], key: str):
+    """去掉 key 及其后代的合并属性缓存。"""
+    queue, seen = deque([key]), set()
+    while queue:
+        current = queue.popleft()
+        if current in seen:
+            continue
+        seen.add(current)
+        merged.pop(current, None)
+        queue.extend(children.get(current, ()))
+
+
+def _link(nodes: Dict[str, dict], children: Dict[str, List[str]], key: str, node: Optional[dict]):
+    """替换（node 为 None 时删除）单个节点并调整其在父节点下的位置。
+
+    只修改传入的两个字典本身；子节点列表整体替换而不原地修改，可与旧版本共享。
+    """
+    old = nodes.pop(key, None)
+    old_parent = parent_of(old) if old else None
+    if old_parent in children and key in children[old_parent]:
+        children[old_parent] = [c for c in children[old_parent] if c != key]
+    if node is not None:
+        nodes[key] = node
+        parent = parent_of(node)
+        if parent:
+            children[parent] = children.get(parent, []) + [key]
+
+
+def _node(word_id, json_data) -> dict:
+    node = {"id": str(word_id)}
+    if isinstance(json_data, dict):
+        node.update(json_data)
+    return node
+
+
+taxonomy = TaxonomySnapshot()
@@ -0,0 +1,42 @@
+"""检索分词：中日韩文字切成相邻二元组（bigram），其它字母 / 数字按整词切分。
+
+文档侧每个 CJK 连续片段额外保留末字单字，使任意单字都是某个词元的首字，
+单字查询可用前缀匹配 (token LIKE '字%') 命中；查询侧只取 bigram。
+"""
+import re
+import unicodedata
+from collections import Counter
+from typing import Dict, Iterable, List
+
+# 假名、CJK 扩展 A、CJK 统一汉字、谚文音节、CJK 兼容汉字
+_CJK_RANGES = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff"
+_RUN = re.compile(f"[{_CJK_RANGES}]+|[^\\W_{_CJK_RANGES}]+")
+_CJK_CHAR = re.compile(f"[{_CJK_RANGES}]")
+
+
+def is_cjk(text: str) -> bool:
+    return bool(_CJK_CHAR.search(text or ""))
+
+
+def tokenize(text: str, for_query: bool = False) -> List[str]:
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    tokens = []
+    for run in _RUN.findall(text):
+        if not is_cjk(run[0]):
+            tokens.append(run)
+        elif len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i : i + 2] for i in range(len(run) - 1))
+            if not for_query:
+                tokens.append(run[-1])
+    return tokens
+
+
+def term_frequencies(texts: Iterable[str]) -> Dict[str, int]:
+    """文档各字段合并后的 {词元: 出现次数}。"""
+    counter = Counter()
+    for text in texts:
+        if isinstance(text, str):
+            counter.update(tokenize(text))
+    return dict(counter)
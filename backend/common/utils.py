@@ -1,20 +1,20 @@
-import datetime, string, random, base58, hashlib, struct
-import time as pytime
+import datetime, string, random
 import warnings, json, asyncio
+import csv, codecs
 from sqlalchemy.orm import Session
 from . import constants
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator
+from typing import Optional
 from database import (
+    pagination,
     word_crud,
     template_crud,
     development_data_crud,
     user_crud,
-    organization_crud,
-    country_crud,
     models,
     schemas,
 )
-from common import status, object_store_service, error
+from common import status, object_store_service, error, compiled_template, mgid_service
 from schema_parser import data_create_schema
 from data_parser import web_submit
 import config
@@ -25,6 +25,15 @@ class ListQuery(BaseModel):
     start: int
     size: int
     status_filter: str
+    # 游标分页：传入上一页返回的 next_cursor 时忽略 start
+    cursor: Optional[str] = None
+
+    @field_validator("cursor")
+    @classmethod
+    def _check_cursor(cls, v):
+        if v:
+            pagination.decode_cursor(v)
+        return v
 
 
 class FilterQuery(BaseModel):
@@ -46,6 +55,14 @@ def is_valid_json(json_str: str):
         return (False, "json schema is invalid")
 
 
+def iter_csv_rows(file):
+    """逐行读取上传的 CSV（utf-8，可带 BOM），产出 (行号, 字段列表)，跳过空行。"""
+    reader = csv.reader(codecs.iterdecode(file, encoding="utf-8-sig"))
+    for fields in reader:
+        if fields:
+            yield reader.line_num, fields
+
+
 def initialize_word_metadata(data: dict, serial_number: int, current_user: str):
     data["serial_number"] = serial_number
     data["author"] = current_user
@@ -75,97 +92,37 @@ def initialize_template_metadata(data: dict, db: Session, current_user: str):
     return data
 
 
-def get_MGID_create_time():
-    return datetime.datetime.now().strftime("%Y%m%d")
-
-
-def get_MGID_organization(db: Session, user: str):
-    user_info = user_crud.get_userinfo_by_name(db=db, name=user)
-    MGID_area = country_crud.get_country_by_name(db=db, name=user_info.country)
-    MGID_organization = organization_crud.get_organization_by_name(
-        db=db, name=user_info.organization
-    )
-    return MGID_area.id + MGID_organization.id
-
-
-def get_MGID_user(db: Session, user: str):
-    user_info = user_crud.get_userinfo_by_name(db=db, name=user)
-    # User模型中没有user_number字段，使用user_name作为替代
-    # 或者可以根据需要生成一个唯一标识符
-    return user_info.user_name if user_info else "UNKNOWN_USER"
-
-def steady_time_ns() -> int:
-    """跨平台高精度单调时钟（纳秒）"""
-    # 优先用 clock_gettime_ns + MONOTONIC_RAW / MONOTONIC
-    clock_id = getattr(pytime, "CLOCK_MONOTONIC_RAW", None)
-    if clock_id is None:
-        clock_id = getattr(pytime, "CLOCK_MONOTONIC", None)
-
-    if hasattr(pytime, "clock_gettime_ns") and clock_id is not None:
-        return pytime.clock_gettime_ns(clock_id)
-
-    # 退化方案：Python 3.7+ 都有
-    if hasattr(pytime, "monotonic_ns"):
-        return pytime.monotonic_ns()
-
-    # 最后兜底（极少数环境）
-    return int(pytime.monotonic() * 1e9)
-
-def get_MGID_random():
-    pytime.sleep(0.001)
-    # t = pytime.clock_gettime_ns(pytime.CLOCK_MONOTONIC_RAW)
-    t = steady_time_ns()
-    t_seed = struct.pack(">Q", t)
-    t_sha256 = hashlib.sha256(t_seed).digest()[:6]  # 6 bytes
-    t_base58 = base58.b58encode(t_sha256)
-    return bytes.decode(t_base58)
+def _MGID_source_type(data: dict):
+    if "source_type" in data:
+        return data["source_type"]
+    return template_source_type(data["data_generate_method"], data["template_type"])
 
 
 def generateMGID(data: dict, cutorm_field: str, current_user: str, db: Session):
     # e.g. MGID.CN10248.1012.S.20210628/0008.aU7iF4p8
     # rule MGID.[orgnization].[user_number].[source_number].[date]/[custom].[random]
-    MGID = ["MGID"]
-    # [orgnization]
-    MGID.append(get_MGID_organization(db, current_user))
-    # [user_number]
-    MGID.append(get_MGID_user(db, current_user))
-    # [source_number]
-    if "source_type" in data:
-        source_type = data["source_type"]
-    else:
-        source_type = template_source_type(
-            data["data_generate_method"], data["template_type"]
-        )
-    if source_type != "":
-        MGID.append(source_type)
-    # [date]
-    MGID.append(get_MGID_create_time())
-    # [custom]
-    MGID[-1] += "/" + str(cutorm_field)
-    # [random]
-    MGID.append(get_MGID_random())
-    return ".".join(MGID)
+    return mgid_service.generate(
+        db, "MGID", current_user, _MGID_source_type(data), cutorm_field
+    )
+
+
+def generateMGID_batch(
+    data: dict, cutorm_field: str, current_user: str, db: Session, count: int
+):
+    """同一用户、同一模板的 count 个 MGID。"""
+    return mgid_service.generate_batch(
+        db, "MGID", current_user, _MGID_source_type(data), cutorm_field, count
+    )
 
 
 def generateAPPT(cutorm_field: str, current_user: str, db: Session):
     # e.g. APPT.CN10248.1012.20210628/0008.aU7iF4p8
     # rule APPT.[orgnization].[user_number].[date]/[custom].[random]
-    APPT = ["APPT"]
-    # [orgnization]
-    APPT.append(get_MGID_organization(db, current_user))
-    # [user_number]
-    APPT.append(get_MGID_user(db, current_user))
-    # [date]
-    APPT.append(get_MGID_create_time())
-    # [custom]
-    APPT[-1] += "/" + str(cutorm_field)
-    # [random]
-    APPT.append(get_MGID_random())
-    return ".".join(APPT)
+    return mgid_service.generate(db, "APPT", current_user, "", cutorm_field)
 
 
 def initialize_data_metadata(
-    data: dict, cutorm_field: str, current_user: str, db: Session
+    data: dict, cutorm_field: str, current_user: str, db: Session, MGID: str = None
 ):
     data["author"] = current_user
     data["create_timestamp"] = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -174,7 +131,8 @@ def initialize_data_metadata(
     # 默认审核状态：未审核（系统内部值使用 waiting_review）
     if not data.get("review_status"):
         data["review_status"] = constants.REVIEW_STATUS_WAITING_REVIEW
-    data["MGID"] = generateMGID(data, cutorm_field, current_user, db)
+    # 批量提交时 MGID 已由 generateMGID_batch 预先分配
+    data["MGID"] = MGID or generateMGID(data, cutorm_field, current_user, db)
     return data
 
 
@@ -221,6 +179,20 @@ def validate_name_type_id_string(form_data: str, db: Session):
     return not db_word is None
 
 
+def check_user_name_password(user_name, password) -> Optional[dict]:
+    """新增用户（/api/user_add/ 与批量导入共用）的用户名 / 密码格式校验，通过返回 None，否则返回错误。"""
+    if not isinstance(user_name, str) or not 0 < len(user_name) <= constants.USER_NAME_MAX_LENGTH:
+        return {"status": status.API_INVALID_USER_NAME, "message": "invalid user name length"}
+    if any(ch.isspace() or not ch.isprintable() for ch in user_name):
+        return {"status": status.API_INVALID_USER_NAME, "message": "user name contains whitespace"}
+    if not isinstance(password, str) or not password:
+        return {"status": status.API_ERR_INVALID_INPUT, "message": "missing password"}
+    # bcrypt 只使用前 72 字节，更长的密码会被静默截断
+    if len(password.encode("utf-8")) > constants.PASSWORD_MAX_BYTES:
+        return {"status": status.API_ERR_INVALID_INPUT, "message": "password too long"}
+    return None
+
+
 def validate_review_status(review_status: str):
     valid_review_status = [
         constants.REVIEW_STATUS_DRAFT,
@@ -473,33 +445,33 @@ def generate_development_json_data(data: schemas.DataCreate, db: Session):
     # json_data["review_status"] = data.review_status
 
     # return (json_data, None, cutorm_field)
-    template = template_crud.get_template(db, data.template_id)
+    template = compiled_template.get(db, data.template_id)
     if not template:
         return None, {"status": 404, "message": "Template not found"}, {}
 
-    schema = template.json_schema or {}
-    word_order = schema.get("word_order", [])
+    json_data, error = build_development_json_data(template, data.json_data)
+    return json_data, error, {}
+
+
+def build_development_json_data(template, post_data):
+    """按已编译模板校验并规范化一条提交，返回 (json_data, error)。"""
     data_content = []
     
-    normalized, errors = web_submit.get_development_data_rec(data.json_data, word_order, data_content)
+    normalized, errors = template.normalize(post_data, data_content)
     if errors:
-        return None, {"status": 422, "message": "invalid payload", "errors": errors}, {}
+        return None, {"status": 422, "message": "invalid payload", "errors": errors}
 
     json_data = {
         "template_name": template.name,
-        "data_generate_method": schema.get("data_generate_method"),
-        "institution": schema.get("institution"),
-        "template_type": schema.get("template_type"),
+        "data_generate_method": template.data_generate_method,
+        "institution": template.institution,
+        "template_type": template.template_type,
         "data_content": data_content,
         "origin_post_data": normalized,  # 写规范化后的（含文件引用），非原始
         "title": normalized.get("title") or template.name,
-        "citation_template": "{}，{}[{}].".format(
-            schema.get("source_standard_number", ""),
-            template.name,
-            template_source_type(schema.get("data_generate_method"), schema.get("template_type")),
-        ),
+        "citation_template": template.citation_template,
     }
-    return json_data, None, {}
+    return json_data, None
 
 
 def concurrency_write(file_name: str, file_data: bytes):
@@ -1,6 +1,7 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import func
-from . import models
+from typing import Optional
+from . import models, pagination, MGID_registry_crud
 
 # NOTE:
 # Previous implementation compared JSONB path expressions directly to a Python string
@@ -9,25 +10,31 @@ from . import models
 # We now extract JSONB field values as text using .astext before comparison.
 
 
-def get_object_list(db: Session, user: str, template_id: str, start: int, size: int):
-    """Return a paginated list of MGID application objects for a user.
+def get_object_list(
+    db: Session,
+    user: str,
+    template_id: str,
+    start: int,
+    size: int,
+    cursor: Optional[str] = None,
+):
+    """Return (objects, next_cursor) of MGID application objects for a user.
 
     If user is falsy (missing header), return an empty list early to avoid
     filtering with a NULL/empty value that would otherwise yield no rows while
     still triggering unnecessary SQL.
     """
     if not user:
-        return []
+        return [], None
 
     q = (
         db.query(models.Object)
         .filter(models.Object.template_id == template_id)
         .filter(models.Object.json_data["MGID_submitter"].astext == user)
-        .order_by(models.Object.json_data["create_timestamp"].astext.desc())
-        .offset(start)
-        .limit(size)
     )
-    return q.all()
+    return pagination.paginate(
+        q, models.Object.create_timestamp, models.Object.id, start, size, cursor
+    )
 
 
 def get_MGID_count(db: Session, user: str, template_id: str):
@@ -42,8 +49,26 @@ def get_MGID_count(db: Session, user: str, template_id: str):
 
 
 def get_MGID(db: Session, MGID: str):
-    return (
+    resolved = MGID_registry_crud.resolve(db, MGID)
+    return resolved[0] if resolved else None
+
+
+def get_object_page(
+    db: Session,
+    user: str,
+    template_id: str,
+    start: int,
+    size: int,
+    cursor: Optional[str] = None,
+):
+    """Same filters as get_object_list, returning the page together with its total."""
+    if not user:
+        return {"data": [], "count": 0, "count_exact": True, "next_cursor": None}
+    q = (
         db.query(models.Object)
-        .filter(models.Object.json_data["MGID"].astext == MGID)
-        .first()
+        .filter(models.Object.template_id == template_id)
+        .filter(models.Object.json_data["MGID_submitter"].astext == user)
+    )
+    return pagination.paginate_with_count(
+        q, models.Object.create_timestamp, models.Object.id, start, size, cursor
     )
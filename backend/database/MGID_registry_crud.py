@@ -0,0 +1,152 @@
+"""MGID 登记表（mgid_registry）的维护与解析。
+
+写入路径在同一事务内调用 register / sync_object / unregister，由调用方统一 commit。
+MGID 已被其它对象登记时抛出 IntegrityError，对象写入随之失败（调用方用 is_MGID_conflict 判断后回滚，
+返回 common.error.DuplicateMGIDError）；其它错误只记日志。
+解析（单个 / 批量）为一条按主键的查询；尚未登记的 MGID 回退到 objects.mgid 唯一索引。
+"""
+import logging
+from typing import Dict, Iterable
+
+from sqlalchemy import case, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from . import models
+from common import constants
+
+logger = logging.getLogger("db.mgid_registry")
+
+KIND_DATA = "data"
+KIND_APPLY = "apply"
+
+# 登记表主键 / objects.mgid 唯一索引
+_MGID_CONSTRAINTS = {"mgid_registry_pkey", "ux_objects_mgid"}
+
+
+def _kind(template_id) -> str:
+    return KIND_APPLY if str(template_id) == constants.MGID_APPLY_TEMPLATE_ID else KIND_DATA
+
+
+def _MGID_of(json_data):
+    if not isinstance(json_data, dict):
+        return None
+    return json_data.get("MGID") or None
+
+
+def _guarded(db: Session, fn, *args):
+    try:
+        with db.begin_nested():
+            fn(db, *args)
+    except IntegrityError:
+        raise
+    except Exception as e:
+        logger.warning(f"[DB] MGID registry update failed: {e!r}")
+
+
+def _register(db: Session, objects):
+    rows = [
+        {
+            "mgid": MGID,
+            "object_id": obj.id,
+            "template_id": obj.template_id,
+            "kind": _kind(obj.template_id),
+        }
+        for obj in objects
+        if (MGID := _MGID_of(obj.json_data)) is not None
+    ]
+    if rows:
+        db.execute(insert(models.MGIDRegistry), rows)
+
+
+def _sync_object(db: Session, object_id, template_id, json_data):
+    registry = models.MGIDRegistry
+    MGID = _MGID_of(json_data)
+    current = db.query(registry.MGID).filter(registry.object_id == object_id).all()
+    if [row.MGID for row in current] == ([MGID] if MGID else []):
+        return
+    db.query(registry).filter(registry.object_id == object_id).delete(synchronize_session=False)
+    if MGID:
+        db.add(
+            registry(MGID=MGID, object_id=object_id, template_id=template_id, kind=_kind(template_id))
+        )
+        db.flush()
+
+
+def _unregister(db: Session, object_id):
+    registry = models.MGIDRegistry
+    db.query(registry).filter(registry.object_id == object_id).delete(synchronize_session=False)
+
+
+def is_MGID_conflict(exc: IntegrityError) -> bool:
+    """IntegrityError 是否由 MGID 重复引起。"""
+    diag = getattr(exc.orig, "diag", None)
+    return getattr(diag, "constraint_name", None) in _MGID_CONSTRAINTS
+
+
+def register(db: Session, objects: Iterable):
+    """登记新建对象（已 flush，带 id）的 MGID，一条多行 INSERT（不提交）。"""
+    _guarded(db, _register, list(objects))
+
+
+def sync_object(db: Session, object_id, template_id, json_data):
+    """对象内容更新后同步其 MGID（不提交）；MGID 未变时只有一次查询。"""
+    _guarded(db, _sync_object, object_id, template_id, json_data)
+
+
+def unregister(db: Session, object_id):
+    _guarded(db, _unregister, object_id)
+
+
+# ---- 解析 ----
+
+
+def resolve_batch(db: Session, MGIDs: Iterable[str]) -> Dict[str, tuple]:
+    """批量解析：返回 {MGID: (Object, kind)}，不存在的 MGID 不出现。"""
+    MGIDs = list(dict.fromkeys(m for m in MGIDs if m))
+    if not MGIDs:
+        return {}
+    registry = models.MGIDRegistry
+    rows = (
+        db.query(registry.MGID, registry.kind, models.Object)
+        .join(models.Object, models.Object.id == registry.object_id)
+        .filter(registry.MGID.in_(MGIDs))
+        .all()
+    )
+    resolved = {MGID: (obj, kind) for MGID, kind, obj in rows}
+    missing = [m for m in MGIDs if m not in resolved]
+    if missing:
+        for obj in db.query(models.Object).filter(models.Object.MGID.in_(missing)):
+            resolved.setdefault(obj.MGID, (obj, _kind(obj.template_id)))
+    return resolved
+
+
+def resolve(db: Session, MGID: str):
+    """返回 (Object, kind)，不存在返回 None。"""
+    return resolve_batch(db, [MGID]).get(MGID)
+
+
+def rebuild(db: Session) -> int:
+    """由 objects.mgid 全量重建登记表（首次部署或数据经 SQL 直接修改后执行），返回登记数。
+
+    历史数据中重复的 MGID 只登记其中一个对象。
+    """
+    registry, obj = models.MGIDRegistry, models.Object
+    db.query(registry).delete(synchronize_session=False)
+    kind = case(
+        (obj.template_id == constants.MGID_APPLY_TEMPLATE_ID, KIND_APPLY), else_=KIND_DATA
+    )
+    result = db.execute(
+        insert(registry)
+        .from_select(
+            ["mgid", "object_id", "template_id", "kind"],
+            select(obj.MGID, obj.id, obj.template_id, kind)
+            .where(obj.MGID.isnot(None), obj.MGID != "")
+            .order_by(obj.create_timestamp, obj.id),
+        )
+        .on_conflict_do_nothing()
+    )
+    db.commit()
+    logger.info(f"[DB] MGID registry rebuilt: rows={result.rowcount}")
+    return result.rowcount
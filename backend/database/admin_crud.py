@@ -1,10 +1,10 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import String, cast, update, func
 from sqlalchemy.dialects.postgresql import JSONB
-from . import models, template_crud
-from common import constants, utils
+from . import models, pagination, template_crud
+from common import cache, constants, suggest_service, taxonomy_service, utils
 import uuid
-from typing import List
+from typing import List, Optional
 import json
 
 
@@ -13,26 +13,23 @@ def admin_words_list(
     word_template_id: str,
     start: int,
     size: int,
+    cursor: Optional[str] = None,
 ):
-    return (
-        db.query(models.Object)
-        .filter(
-            models.Object.template_id == word_template_id,
-            models.Object.json_data["review_status"]
-            != cast(constants.REVIEW_STATUS_DRAFT, JSONB),
-        )
-        .order_by(models.Object.json_data["create_timestamp"].desc())
-        .offset(start)
-        .limit(size)
-        .all()
+    query_cmd = db.query(models.Object).filter(
+        models.Object.template_id == word_template_id,
+        models.Object.review_status
+        != constants.REVIEW_STATUS_DRAFT,
+    )
+    return pagination.paginate(
+        query_cmd, models.Object.create_timestamp, models.Object.id, start, size, cursor
     )
 
 
 def admin_words_count(db: Session, word_template_id: str):
     query_cmd = db.query(models.Object).filter(
         models.Object.template_id == word_template_id,
-        models.Object.json_data["review_status"]
-        != cast(constants.REVIEW_STATUS_DRAFT, JSONB),
+        models.Object.review_status
+        != constants.REVIEW_STATUS_DRAFT,
     )
     return query_cmd.count()
 
@@ -41,28 +38,35 @@ def admin_templates_list(
     db: Session,
     start: int,
     size: int,
+    cursor: Optional[str] = None,
 ):
     query_cmd = db.query(models.Template.id, models.Template.json_schema).filter(
-        models.Template.json_schema["review_status"]
-        != cast(constants.REVIEW_STATUS_DRAFT, JSONB),
+        models.Template.json_schema["review_status"].astext
+        != constants.REVIEW_STATUS_DRAFT,
     )
     for item in constants.EXCLUDETEMPLATES:
         query_cmd = query_cmd.filter(
             cast(models.Template.id, String) != cast(item, String)
         )
-    templates_result = query_cmd.order_by(
-        models.Template.json_schema["create_timestamp"].desc()
-    ).offset(start).limit(size).all()
+    templates_result, next_cursor = pagination.paginate(
+        query_cmd,
+        models.Template.json_schema["create_timestamp"].astext,
+        models.Template.id,
+        start,
+        size,
+        cursor,
+        row_key=template_crud._template_row_key,
+    )
     return [
        {"id": t.id, "json_schema": t.json_schema}
        for t in templates_result
-    ]
+    ], next_cursor
 
 
 def admin_templates_count(db: Session):
     query_cmd = db.query(models.Template.id, models.Template.json_schema).filter(
-        models.Template.json_schema["review_status"]
-        != cast(constants.REVIEW_STATUS_DRAFT, JSONB),
+        models.Template.json_schema["review_status"].astext
+        != constants.REVIEW_STATUS_DRAFT,
     )
     for item in constants.EXCLUDETEMPLATES:
         query_cmd = query_cmd.filter(
@@ -77,23 +81,21 @@ def filter_words_list(
     status_filter: str,
     start: int,
     size: int,
+    cursor: Optional[str] = None,
 ):
     query_cmd = db.query(models.Object).filter(
         models.Object.template_id == word_template_id,
-        cast(models.Object.json_data["review_status"], String).match(status_filter),
+        models.Object.review_status.match(status_filter),
     )
-    return (
-        query_cmd.order_by(models.Object.json_data["create_timestamp"].desc())
-        .offset(start)
-        .limit(size)
-        .all()
+    return pagination.paginate(
+        query_cmd, models.Object.create_timestamp, models.Object.id, start, size, cursor
     )
 
 
 def filter_words_count(db: Session, word_template_id: str, status_filter: str):
     query_cmd = db.query(models.Object).filter(
         models.Object.template_id == word_template_id,
-        cast(models.Object.json_data["review_status"], String).match(status_filter),
+        models.Object.review_status.match(status_filter),
     )
     return query_cmd.count()
 
@@ -103,6 +105,7 @@ def filter_templates_list(
     status_filter: str,
     start: int,
     size: int,
+    cursor: Optional[str] = None,
 ):
     query_cmd = db.query(models.Template.id, models.Template.json_schema).filter(
         cast(models.Template.json_schema["review_status"], String).match(status_filter)
@@ -111,11 +114,19 @@ def filter_templates_list(
         query_cmd = query_cmd.filter(
             cast(models.Template.id, String) != cast(item, String)
         )
-    templates_result = query_cmd.order_by(models.Template.json_schema["create_timestamp"].desc()).offset(start).limit(size).all()
+    templates_result, next_cursor = pagination.paginate(
+        query_cmd,
+        models.Template.json_schema["create_timestamp"].astext,
+        models.Template.id,
+        start,
+        size,
+        cursor,
+        row_key=template_crud._template_row_key,
+    )
     return [
        {"id": t.id, "json_schema": t.json_schema}
        for t in templates_result
-    ]
+    ], next_cursor
 
 
 def filter_templates_count(db: Session, status_filter: str):
@@ -133,18 +144,18 @@ def admin_data_list(
     db: Session,
     start: int,
     size: int,
+    cursor: Optional[str] = None,
 ):
-    return (
+    query_cmd = (
         db.query(models.Object)
         .filter(models.Object.template_id.notin_(constants.EXCLUDETEMPLATES))
         .filter(
-            models.Object.json_data["review_status"]
-            != cast(constants.REVIEW_STATUS_DRAFT, JSONB),
+            models.Object.review_status
+            != constants.REVIEW_STATUS_DRAFT,
         )
-        .order_by(models.Object.json_data["create_timestamp"].desc())
-        .offset(start)
-        .limit(size)
-        .all()
+    )
+    return pagination.paginate(
+        query_cmd, models.Object.create_timestamp, models.Object.id, start, size, cursor
     )
 
 
@@ -153,8 +164,8 @@ def admin_data_count(db: Session):
         db.query(models.Object)
         .filter(models.Object.template_id.notin_(constants.EXCLUDETEMPLATES))
         .filter(
-            models.Object.json_data["review_status"]
-            != cast(constants.REVIEW_STATUS_DRAFT, JSONB),
+            models.Object.review_status
+            != constants.REVIEW_STATUS_DRAFT,
         )
     )
     return query_cmd.count()
@@ -165,19 +176,17 @@ def filter_data_list(
     status_filter: str,
     start: int,
     size: int,
+    cursor: Optional[str] = None,
 ):
     query_cmd = (
         db.query(models.Object)
         .filter(models.Object.template_id.notin_(constants.EXCLUDETEMPLATES))
         .filter(
-            cast(models.Object.json_data["review_status"], String).like(f"{status_filter}%"),
+            models.Object.review_status.like(f"{status_filter}%"),
         )
     )
-    return (
-        query_cmd.order_by(models.Object.json_data["create_timestamp"].desc())
-        .offset(start)
-        .limit(size)
-        .all()
+    return pagination.paginate(
+        query_cmd, models.Object.create_timestamp, models.Object.id, start, size, cursor
     )
 
 
@@ -186,20 +195,18 @@ def filter_data_count(db: Session, status_filter: str):
         db.query(models.Object)
         .filter(models.Object.template_id.notin_(constants.EXCLUDETEMPLATES))
         .filter(
-            cast(models.Object.json_data["review_status"], String).like(f"{status_filter}%"),
+            models.Object.review_status.like(f"{status_filter}%"),
         )
     )
     return query_cmd.count()
 
 
-def get_MGID_list(db: Session, template_id: str, start: int, size: int):
-    return (
-        db.query(models.Object)
-        .filter(models.Object.template_id == template_id)
-        .order_by(models.Object.json_data["create_timestamp"].desc())
-        .offset(start)
-        .limit(size)
-        .all()
+def get_MGID_list(
+    db: Session, template_id: str, start: int, size: int, cursor: Optional[str] = None
+):
+    query_cmd = db.query(models.Object).filter(models.Object.template_id == template_id)
+    return pagination.paginate(
+        query_cmd, models.Object.create_timestamp, models.Object.id, start, size, cursor
     )
 
 
@@ -211,6 +218,91 @@ def get_MGID_count(db: Session, template_id: str):
     )
 
 
+def admin_words_page(
+    db: Session,
+    word_template_id: str,
+    status_filter: str,
+    start: int,
+    size: int,
+    cursor: Optional[str] = None,
+):
+    """列表与总数一次返回，status_filter 为 "all" 时只排除草稿。"""
+    query_cmd = db.query(models.Object).filter(models.Object.template_id == word_template_id)
+    if status_filter == "all":
+        query_cmd = query_cmd.filter(
+            models.Object.review_status != constants.REVIEW_STATUS_DRAFT
+        )
+    else:
+        query_cmd = query_cmd.filter(models.Object.review_status.match(status_filter))
+    return pagination.paginate_with_count(
+        query_cmd, models.Object.create_timestamp, models.Object.id, start, size, cursor
+    )
+
+
+def admin_templates_page(
+    db: Session,
+    status_filter: str,
+    start: int,
+    size: int,
+    cursor: Optional[str] = None,
+):
+    query_cmd = db.query(models.Template)
+    if status_filter == "all":
+        query_cmd = query_cmd.filter(
+            models.Template.json_schema["review_status"].astext
+            != constants.REVIEW_STATUS_DRAFT,
+        )
+    else:
+        query_cmd = query_cmd.filter(
+            cast(models.Template.json_schema["review_status"], String).match(status_filter)
+        )
+    for item in constants.EXCLUDETEMPLATES:
+        query_cmd = query_cmd.filter(
+            cast(models.Template.id, String) != cast(item, String)
+        )
+    page = pagination.paginate_with_count(
+        query_cmd,
+        models.Template.json_schema["create_timestamp"].astext,
+        models.Template.id,
+        start,
+        size,
+        cursor,
+        row_key=template_crud._template_row_key,
+    )
+    page["data"] = [{"id": t.id, "json_schema": t.json_schema} for t in page["data"]]
+    return page
+
+
+def admin_data_page(
+    db: Session,
+    status_filter: str,
+    start: int,
+    size: int,
+    cursor: Optional[str] = None,
+):
+    query_cmd = db.query(models.Object).filter(
+        models.Object.template_id.notin_(constants.EXCLUDETEMPLATES)
+    )
+    if status_filter == "all":
+        query_cmd = query_cmd.filter(
+            models.Object.review_status != constants.REVIEW_STATUS_DRAFT
+        )
+    else:
+        query_cmd = query_cmd.filter(models.Object.review_status.like(f"{status_filter}%"))
+    return pagination.paginate_with_count(
+        query_cmd, models.Object.create_timestamp, models.Object.id, start, size, cursor
+    )
+
+
+def get_MGID_page(
+    db: Session, template_id: str, start: int, size: int, cursor: Optional[str] = None
+):
+    query_cmd = db.query(models.Object).filter(models.Object.template_id == template_id)
+    return pagination.paginate_with_count(
+        query_cmd, models.Object.create_timestamp, models.Object.id, start, size, cursor
+    )
+
+
 def object_review_update(
     db: Session, id: str, reviewer: str, review_status: str, rejected_reason: str
 ):
@@ -233,6 +325,9 @@ def object_review_update(
     data["rejected_reason"] = rejected_reason
     obj.json_data = data
     db.commit()
+    cache.invalidate_object(id)
+    suggest_service.suggest_index.refresh_word(db, id)
+    taxonomy_service.taxonomy.refresh_word(db, id)
 
 
 def template_review_update(
@@ -244,7 +339,7 @@ def template_review_update(
         and review_status == constants.REVIEW_STATUS_PASSED_REVIEW
     ):
         db.query(models.Object).filter(models.Object.template_id == id).filter(
-            cast(models.Object.json_data["review_status"], String).match(
+            models.Object.review_status.match(
                 constants.REVIEW_STATUS_PASSED_REVIEW
             ),
         ).update(
@@ -266,3 +361,5 @@ def template_review_update(
     schema["rejected_reason"] = rejected_reason
     tmpl.json_schema = schema
     db.commit()
+    cache.invalidate_template(id)
+    suggest_service.suggest_index.refresh_template(db, id)
@@ -1,30 +1,17 @@
 from sqlalchemy.orm import Session
-from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy import and_, func
 from . import schemas
-from common import status
-from . import models
+from common import reference_data
+from . import location_import_crud, models
 import uuid
 
 
-def create_country(db: Session, country_list: list[schemas.CountryCreate]):
-
-    list_rows = 0
-    country_object_list = list()
-    insert_stmt = insert(models.Country.__table__).on_conflict_do_nothing()
-    for i, country in enumerate(country_list):
-        try:
-            country_id, country_name = country
-            country_object_list.append({"id": country_id, "name": country_name})
-            list_rows += 1
-        except:
-            continue
-    result = db.execute(insert_stmt, country_object_list)
-    db.commit()
-    count = result.rowcount
-    if count < list_rows:
-        return status.API_INVALID_CSV_ROW
-    return status.API_OK
+def import_country_csv(db: Session, rows) -> dict:
+    """流式导入国家 CSV（每行 id,name），返回导入报告，见 location_import_crud。"""
+    report = location_import_crud.import_locations(db, models.Country.__tablename__, rows)
+    if report["inserted"]:
+        reference_data.reference.refresh_locations(db)
+    return report
 
 
 def is_country_exist(db: Session, country: schemas.CountryCreate):
@@ -59,6 +46,7 @@ def get_country_count(db: Session):
 def delete_country(db: Session, id: uuid.UUID):
     db.query(models.Country).filter(models.Country.id == id).delete()
     db.commit()
+    reference_data.reference.refresh_locations(db)
 
 
 def get_country_by_name(db: Session, name: str):
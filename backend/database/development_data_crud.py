@@ -1,13 +1,18 @@
+import logging
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_, not_, String, cast, JSON, Numeric, func, text
 from sqlalchemy.dialects.postgresql import JSONB
 import uuid, json, datetime
-from . import models
-from common import utils, constants
+from typing import Optional
+from . import models, pagination, search_index_crud, MGID_registry_crud
+from .base import SessionLocal
+from common import cache, compiled_template, error, utils, constants
 from database import template_crud
 import config
 import sqlalchemy
 
+logger = logging.getLogger("db.development_data")
+
 
 def get_dev_data(db: Session, object_id: str):
     try:
@@ -30,8 +35,6 @@ def get_create_development_data(json_data: dict, template_id: str, db: Session):
         # 单独处理citation_count更新，即使失败也不影响对象创建
         try:
             # 创建一个新的会话来更新citation_count，避免影响主事务
-            from sqlalchemy.orm import Session
-            from database.db import SessionLocal
             citation_db = SessionLocal()
             try:
                 template_crud.change_citation_count(db=citation_db, id=template_id)
@@ -43,6 +46,9 @@ def get_create_development_data(json_data: dict, template_id: str, db: Session):
         # 继续创建对象，这是核心功能，不应该因为citation_count更新失败而中断
         db_object = models.Object(template_id=template_id, json_data=json_data)
         db.add(db_object)
+        db.flush()
+        search_index_crud.index_object(db, db_object.id, template_id, json_data)
+        MGID_registry_crud.register(db, [db_object])
         db.commit()
         db.refresh(db_object)
         return db_object
@@ -52,6 +58,34 @@ def get_create_development_data(json_data: dict, template_id: str, db: Session):
         return None
 
 
+def create_development_data_batch(json_data_list: list, template_id: str, db: Session):
+    """批量创建数据对象：多行 INSERT、批量建索引、一次提交；返回新对象 id 列表，失败返回 None。"""
+    try:
+        db_objects = [
+            models.Object(template_id=template_id, json_data=json_data)
+            for json_data in json_data_list
+        ]
+        db.add_all(db_objects)
+        db.flush()
+        search_index_crud.index_new_objects(db, db_objects)
+        MGID_registry_crud.register(db, db_objects)
+        ids = [db_object.id for db_object in db_objects]
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"[DB] batch object creation failed: count={len(json_data_list)} error={e!r}")
+        return None
+
+    # 引用计数增加本批创建的对象数，与逐条创建（每条 +1）的总增量相同，只是合并成一条 UPDATE；
+    # 与逐条创建不同，只在写入成功后更新，失败不影响已创建的对象
+    citation_db = SessionLocal()
+    try:
+        template_crud.change_citation_count(db=citation_db, id=template_id, increment=len(ids))
+    finally:
+        citation_db.close()
+    return ids
+
+
 def get_data_list_by_type(
     post_data: dict,
     template_id: str,
@@ -65,14 +99,14 @@ def get_data_list_by_type(
     object_json_data = development_object.json_data
     init_filter = and_(
         development_object.template_id != constants.WORD_TEMPLATE_ID,
-        object_json_data["template_type"].astext == template_type,
-        object_json_data["review_status"].astext != constants.REVIEW_STATUS_PASSED_REVIEW_WAITING_PUBLISHED,
-        object_json_data["review_status"].astext.like(f"{constants.REVIEW_STATUS_PASSED_REVIEW}%"),
+        development_object.template_type == template_type,
+        development_object.review_status != constants.REVIEW_STATUS_PASSED_REVIEW_WAITING_PUBLISHED,
+        development_object.review_status.like(f"{constants.REVIEW_STATUS_PASSED_REVIEW}%"),
     )
     query_cmd = db.query(development_object).filter(init_filter)
     sample_list = []
     object_orgin_data = object_json_data["origin_post_data"]
-    word_order = template_crud.get_template(db, template_id).json_schema["word_order"]
+    word_order = compiled_template.get(db, template_id).word_order
     search_content_list = []
     for obj in word_order:
         obj_title = obj["title"]
@@ -144,12 +178,13 @@ def get_related_data(
     init_filter = and_(
         development_object.template_id != constants.WORD_TEMPLATE_ID,
         or_(
-            object_json_data["template_type"].astext == "source",
-            object_json_data["template_type"].astext == "derived",
+            development_object.template_type == "source",
+            development_object.template_type == "derived",
         ),
-        object_json_data["origin_post_data"]["关联样品MGID"].contains([sample_MGID]),
-        object_json_data["review_status"].astext != constants.REVIEW_STATUS_PASSED_REVIEW_WAITING_PUBLISHED,
-        object_json_data["review_status"].astext.like(f"{constants.REVIEW_STATUS_PASSED_REVIEW}%"),
+        # 写成对整列的包含查询，才能命中 json_data 上的 GIN 索引
+        object_json_data.contains({"origin_post_data": {"关联样品MGID": [sample_MGID]}}),
+        development_object.review_status != constants.REVIEW_STATUS_PASSED_REVIEW_WAITING_PUBLISHED,
+        development_object.review_status.like(f"{constants.REVIEW_STATUS_PASSED_REVIEW}%"),
     )
     query_cmd = db.query(
         models.Object,
@@ -157,7 +192,7 @@ def get_related_data(
     ).filter(init_filter)
     related_data = {}
     for db_obj in query_cmd.offset(start).limit(size).all():
-        template_name = template_crud.get_template(db, db_obj[1]).name
+        template_name = compiled_template.get(db, db_obj[1]).name
         single_related_data = db_obj[0]
         if template_name in related_data:
             related_data[template_name].append(single_related_data)
@@ -166,22 +201,23 @@ def get_related_data(
     return related_data
 
 
-def get_dev_data_list(db: Session, user: str, start: int, size: int):
-    return (
+def get_dev_data_list(
+    db: Session, user: str, start: int, size: int, cursor: Optional[str] = None
+):
+    query_cmd = (
         db.query(models.Object)
-        .filter(models.Object.json_data["author"].astext == user)
+        .filter(models.Object.author == user)
         .filter(models.Object.template_id.notin_(constants.EXCLUDETEMPLATES))
-        .order_by(models.Object.json_data["create_timestamp"].astext.desc())
-        .limit(size)
-        .offset(start)
-        .all()
+    )
+    return pagination.paginate(
+        query_cmd, models.Object.create_timestamp, models.Object.id, start, size, cursor
     )
 
 
 def get_dev_data_count(db: Session, user: str):
     return (
         db.query(func.count(models.Object.id))
-        .filter(models.Object.json_data["author"].astext == user)
+        .filter(models.Object.author == user)
         .filter(models.Object.template_id.notin_(constants.EXCLUDETEMPLATES))
         .scalar()
     )
@@ -193,36 +229,60 @@ def filter_dev_data_list(
     status_filter: str,
     start: int,
     size: int,
+    cursor: Optional[str] = None,
 ):
-    return (
+    query_cmd = (
         db.query(models.Object)
-        .filter(models.Object.json_data["author"].astext == user)
+        .filter(models.Object.author == user)
         .filter(
-            models.Object.json_data["review_status"].astext.like(f"{status_filter}%")
+            models.Object.review_status.like(f"{status_filter}%")
         )
         .filter(models.Object.template_id.notin_(constants.EXCLUDETEMPLATES))
-        .order_by(models.Object.json_data["create_timestamp"].astext.desc())
-        .limit(size)
-        .offset(start)
-        .all()
+    )
+    return pagination.paginate(
+        query_cmd, models.Object.create_timestamp, models.Object.id, start, size, cursor
     )
 
 
 def filter_dev_data_count(db: Session, user: str, status_filter: str):
     return (
         db.query(func.count(models.Object.id))
-        .filter(models.Object.json_data["author"].astext == user)
+        .filter(models.Object.author == user)
         .filter(
-            models.Object.json_data["review_status"].astext.like(f"{status_filter}%")
+            models.Object.review_status.like(f"{status_filter}%")
         )
         .filter(models.Object.template_id.notin_(constants.EXCLUDETEMPLATES))
         .scalar()
     )
 
 
+def get_dev_data_page(
+    db: Session,
+    user: str,
+    status_filter: str,
+    start: int,
+    size: int,
+    cursor: Optional[str] = None,
+):
+    """列表与总数一次返回，status_filter 为 "all" 时不按状态过滤。"""
+    query_cmd = (
+        db.query(models.Object)
+        .filter(models.Object.author == user)
+        .filter(models.Object.template_id.notin_(constants.EXCLUDETEMPLATES))
+    )
+    if status_filter != "all":
+        query_cmd = query_cmd.filter(models.Object.review_status.like(f"{status_filter}%"))
+    return pagination.paginate_with_count(
+        query_cmd, models.Object.create_timestamp, models.Object.id, start, size, cursor
+    )
+
+
 def delete_dev_data(db: Session, id: uuid.UUID):
     db.query(models.Object).filter(models.Object.id == id).delete()
+    search_index_crud.remove_document(db, id, search_index_crud.DOC_DATA)
+    MGID_registry_crud.unregister(db, id)
     db.commit()
+    cache.invalidate_object(id)
 
 
 def deprecate_dev_data(db: Session, id: uuid.UUID):
@@ -237,15 +297,26 @@ def deprecate_dev_data(db: Session, id: uuid.UUID):
         synchronize_session="fetch",
     )
     db.commit()
+    cache.invalidate_object(id)
 
 
 def update_development_data(
     json_data: dict, template_id: str, db: Session, object_id: str
 ):
-    db.query(models.Object).filter(models.Object.id == object_id).update(
-        {models.Object.json_data: json_data}
-    )
-    db.commit()
+    """MGID 与其它对象重复时回滚并抛出 error.DuplicateMGIDError。"""
+    try:
+        db.query(models.Object).filter(models.Object.id == object_id).update(
+            {models.Object.json_data: json_data}
+        )
+        search_index_crud.index_object(db, object_id, template_id, json_data)
+        MGID_registry_crud.sync_object(db, object_id, template_id, json_data)
+        db.commit()
+    except sqlalchemy.exc.IntegrityError as e:
+        db.rollback()
+        if MGID_registry_crud.is_MGID_conflict(e):
+            raise error.DuplicateMGIDError(json_data.get("MGID"))
+        raise
+    cache.invalidate_object(object_id)
 
 
 def get_development_data_author_with_id(db: Session, object_id: str):
@@ -277,3 +348,4 @@ def change_review_state(db: Session, id: str, review_status: str):
         synchronize_session="fetch",
     )
     db.commit()
+    cache.invalidate_object(id)
@@ -0,0 +1,101 @@
+"""国家 / 机构 CSV 流式导入。
+
+上传文件逐行解析，经 COPY 写入事务内的临时表，再用一条 INSERT ... SELECT ... ON CONFLICT DO NOTHING
+合并到目标表；内存占用与文件行数无关。报告给出新增 / 重复（id 或名称已存在，含文件内重复）/
+格式错误的行数，以及前 LOCATION_IMPORT_REPORT_LINES 个重复 / 错误行号。
+"""
+import logging
+from typing import Iterable, List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from settings import settings
+from . import models
+
+logger = logging.getLogger("db.location_import")
+
+STAGING_TABLE = "location_import_staging"
+TABLES = {models.Country.__tablename__, models.Organization.__tablename__}
+
+
+def _copy_rows(db: Session, rows: Iterable[Tuple[int, List[str]]], report: dict) -> int:
+    """合法行 COPY 进临时表，格式错误的行只计数；返回写入的行数。"""
+    limit = settings.LOCATION_IMPORT_REPORT_LINES
+    valid = 0
+    with db.connection().connection.cursor() as cursor:
+        with cursor.copy(f"COPY {STAGING_TABLE} (line, id, name) FROM STDIN") as copy:
+            for line, fields in rows:
+                fields = [field.strip() for field in fields]
+                if len(fields) != 2 or not all(fields):
+                    report["invalid"] += 1
+                    if len(report["invalid_lines"]) < limit:
+                        report["invalid_lines"].append(line)
+                    continue
+                copy.write_row((line, fields[0], fields[1]))
+                valid += 1
+    return valid
+
+
+def _merge(db: Session, table: str):
+    # 按行号顺序插入：同一 (id, name) 的首行算新增，其余行及与已有数据冲突的行算重复
+    return db.execute(
+        text(
+            f"""
+            WITH inserted AS (
+                INSERT INTO {table} (id, name)
+                SELECT id, name FROM {STAGING_TABLE} ORDER BY line
+                ON CONFLICT DO NOTHING
+                RETURNING id, name
+            ), kept AS (
+                SELECT min(s.line) AS line
+                FROM {STAGING_TABLE} s JOIN inserted USING (id, name)
+                GROUP BY s.id, s.name
+            )
+            SELECT
+                (SELECT count(*) FROM inserted) AS inserted,
+                ARRAY(
+                    SELECT s.line FROM {STAGING_TABLE} s LEFT JOIN kept k ON k.line = s.line
+                    WHERE k.line IS NULL ORDER BY s.line LIMIT :limit
+                ) AS duplicate_lines
+            """
+        ),
+        {"limit": settings.LOCATION_IMPORT_REPORT_LINES},
+    ).one()
+
+
+def import_locations(db: Session, table: str, rows: Iterable[Tuple[int, List[str]]]) -> dict:
+    """rows 为 (行号, 字段列表)；整个导入在一个事务内完成，出错回滚后抛出原异常。"""
+    if table not in TABLES:
+        raise ValueError(f"unsupported table: {table!r}")
+    report = {
+        "total": 0,
+        "inserted": 0,
+        "duplicate": 0,
+        "invalid": 0,
+        "duplicate_lines": [],
+        "invalid_lines": [],
+    }
+    try:
+        db.execute(
+            text(
+                f"CREATE TEMP TABLE {STAGING_TABLE} (line integer, id text, name text) ON COMMIT DROP"
+            )
+        )
+        valid = _copy_rows(db, rows, report)
+        if valid:
+            db.execute(text(f"ANALYZE {STAGING_TABLE}"))
+            result = _merge(db, table)
+            report["inserted"] = result.inserted
+            report["duplicate"] = valid - result.inserted
+            report["duplicate_lines"] = list(result.duplicate_lines)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    report["total"] = valid + report["invalid"]
+    logger.info(
+        f"[DB] {table} import: total={report['total']} inserted={report['inserted']} "
+        f"duplicate={report['duplicate']} invalid={report['invalid']}"
+    )
+    return report
@@ -0,0 +1,345 @@
+"""数据库结构的在线维护（生成列、索引等）。
+
+表结构本身仍由部署脚本创建；这里只负责 models 中声明的附加结构。
+所有操作均可重复执行，通过 migrate_db.py 在启动服务进程之前单独执行；
+服务进程启动时只做只读检查（check_schema），不执行 DDL。
+"""
+import logging
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateIndex, CreateColumn
+
+from .base import Base, engine as default_engine
+from . import models
+from common import constants
+from settings import settings
+
+logger = logging.getLogger("db.migrate")
+
+MANAGED_TABLES = (models.Object.__table__, models.Template.__table__)
+
+# 由本服务创建并维护的表（部署脚本不包含），缺失时整表创建
+OWNED_TABLES = (
+    models.SearchPosting.__table__,
+    models.MaintenanceState.__table__,
+    models.WordClosure.__table__,
+    models.MGIDRegistry.__table__,
+)
+
+# 已被新定义取代的索引，补建完成后删除
+OBSOLETE_INDEXES = (
+    "ix_objects_template_created",
+    "ix_objects_author_created",
+    "ix_objects_author_status",
+    "ix_objects_created_non_draft",
+    "ix_objects_mgid_submitter_created",
+    "ix_objects_mgid",
+    # 排序键补上 id 以支持游标分页
+    "ix_objects_template_create_ts",
+    "ix_objects_author_create_ts",
+    "ix_objects_create_ts_non_draft",
+    "ix_objects_mgid_submitter_create_ts",
+    "ix_templates_author_created",
+    "ix_templates_created",
+    # 改为唯一索引 ux_objects_mgid
+    "ix_objects_mgid_col",
+)
+
+
+def _parse_timestamp_function_sql() -> str:
+    """create_timestamp 以 "%Y-%m-%d %H:%M:%S" 本地时间字符串存储。
+
+    生成列要求表达式 IMMUTABLE，而 to_timestamp 依赖会话时区，这里固定按
+    DB_TIMESTAMP_TZ 解释；格式不合法时返回 NULL，避免写入失败。
+    """
+    tz = settings.DB_TIMESTAMP_TZ.replace("'", "")
+    return f"""
+        CREATE OR REPLACE FUNCTION mgsdb_parse_timestamp(raw text) RETURNS timestamptz
+        LANGUAGE plpgsql IMMUTABLE PARALLEL SAFE AS $fn$
+        BEGIN
+            RETURN to_timestamp(raw, 'YYYY-MM-DD HH24:MI:SS')::timestamp AT TIME ZONE '{tz}';
+        EXCEPTION WHEN others THEN
+            RETURN NULL;
+        END
+        $fn$
+    """
+
+
+def ensure_tables(engine=None) -> list:
+    """创建 OWNED_TABLES 中缺失的表（连同其索引），返回本次新建的表名。"""
+    engine = engine or default_engine
+    with engine.begin() as conn:
+        existing = set(inspect(conn).get_table_names())
+        missing = [t for t in OWNED_TABLES if t.name not in existing]
+        if missing:
+            Base.metadata.create_all(conn, tables=missing)
+            logger.info(f"[DB] created tables {[t.name for t in missing]}")
+    return [t.name for t in missing]
+
+
+def rebuild_search_index() -> dict:
+    """全量重建 search_postings，返回各类型文档数。"""
+    from .base import SessionLocal
+    from . import search_index_crud
+
+    db = SessionLocal()
+    try:
+        return search_index_crud.rebuild(db)
+    finally:
+        db.close()
+
+
+def rebuild_word_closure() -> int:
+    """由词汇父级字段全量重建 word_closure，返回行数。"""
+    from .base import SessionLocal
+    from . import word_closure_crud
+
+    db = SessionLocal()
+    try:
+        return word_closure_crud.rebuild(db)
+    finally:
+        db.close()
+
+
+def rebuild_MGID_registry() -> int:
+    """由 objects.mgid 全量重建 mgid_registry，返回登记数。"""
+    from .base import SessionLocal
+    from . import MGID_registry_crud
+
+    db = SessionLocal()
+    try:
+        return MGID_registry_crud.rebuild(db)
+    finally:
+        db.close()
+
+
+def ensure_generated_columns(engine=None) -> list:
+    """补齐 models.Object 上的生成列，返回本次新增的列名。
+
+    新增 STORED 生成列会重写整张表（持有排它锁），因此只在缺列时执行，
+    且所有缺失列合并为一条 ALTER TABLE，只重写一次。
+    """
+    engine = engine or default_engine
+    table = models.Object.__table__
+    computed = [c for c in table.c if c.computed is not None]
+    with engine.begin() as conn:
+        conn.execute(text(_parse_timestamp_function_sql()))
+        existing = {
+            r[0]
+            for r in conn.execute(
+                text(
+                    "SELECT column_name FROM information_schema.columns WHERE table_name = :t"
+                ),
+                {"t": table.name},
+            )
+        }
+        missing = [c for c in computed if c.name not in existing]
+        if missing:
+            clauses = ", ".join(
+                f"ADD COLUMN IF NOT EXISTS {CreateColumn(c).compile(conn)}" for c in missing
+            )
+            logger.info(f"[DB] adding generated columns {[c.name for c in missing]} (table rewrite)")
+            conn.execute(text(f"ALTER TABLE {table.name} {clauses}"))
+            conn.execute(text(f"ANALYZE {table.name}"))
+    return [c.name for c in missing]
+
+
+def check_schema(engine=None) -> list:
+    """只读检查：返回缺失的生成列 / 表（如 "objects.mgid"、"word_closure"），为空表示结构就绪。"""
+    engine = engine or default_engine
+    table = models.Object.__table__
+    with engine.connect() as conn:
+        tables = set(inspect(conn).get_table_names())
+        columns = {
+            r[0]
+            for r in conn.execute(
+                text("SELECT column_name FROM information_schema.columns WHERE table_name = :t"),
+                {"t": table.name},
+            )
+        }
+    missing = [f"{table.name}.{c.name}" for c in table.c if c.computed is not None and c.name not in columns]
+    missing += [t.name for t in OWNED_TABLES if t.name not in tables]
+    return missing
+
+
+def backfill_tables(created_tables) -> dict:
+    """新建的表立即回填（在 migrate_db.py 中、服务启动前执行），返回各表的回填结果。"""
+    rebuilds = {
+        models.SearchPosting.__tablename__: rebuild_search_index,
+        # 标记表新建时倒排索引未确认回填完成（可能由旧版本后台回填），重建一次
+        models.MaintenanceState.__tablename__: rebuild_search_index,
+        models.WordClosure.__tablename__: rebuild_word_closure,
+        models.MGIDRegistry.__tablename__: rebuild_MGID_registry,
+    }
+    done, results = set(), {}
+    for name in created_tables:
+        rebuild = rebuilds.get(name)
+        if rebuild is not None and rebuild not in done:
+            done.add(rebuild)
+            results[name] = rebuild()
+    return results
+
+
+def run_all(engine=None) -> dict:
+    """migrate_db.py all：生成列 -> 本服务的表（新建的表立即回填）-> 索引。
+
+    多个实例同时执行时由 advisory lock 串行，后到者等待后各步骤均为空操作。
+    """
+    engine = engine or default_engine
+    with engine.connect() as lock_conn:
+        lock_conn = lock_conn.execution_options(isolation_level="AUTOCOMMIT")
+        lock_conn.execute(text("SELECT pg_advisory_lock(hashtext('mgsdb_migrate'))"))
+        try:
+            added = ensure_generated_columns(engine)
+            created = ensure_tables(engine)
+            backfilled = backfill_tables(created)
+            result = ensure_indexes(engine)
+        finally:
+            lock_conn.execute(text("SELECT pg_advisory_unlock(hashtext('mgsdb_migrate'))"))
+    return {"columns": added, "tables": created, "backfilled": backfilled, **result}
+
+
+def _invalid_index_names(conn) -> set:
+    """CONCURRENTLY 建索引中途失败会留下 INVALID 索引，IF NOT EXISTS 会跳过它，需要先删掉。"""
+    rows = conn.execute(
+        text(
+            """
+            SELECT c.relname
+            FROM pg_index i
+            JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE NOT i.indisvalid
+            """
+        )
+    ).fetchall()
+    return {r[0] for r in rows}
+
+
+# 索引依赖的扩展；需要 CREATE 权限，失败时相关索引会随之失败并记录
+EXTENSIONS = ("pg_trgm",)
+
+
+def ensure_extensions(conn) -> None:
+    for name in EXTENSIONS:
+        try:
+            conn.execute(text(f"CREATE EXTENSION IF NOT EXISTS {name}"))
+        except Exception as e:
+            logger.warning(f"[DB] create extension {name} failed: {e!r}")
+
+
+def ensure_indexes(engine=None) -> dict:
+    """按 models 中的声明补建索引（CREATE INDEX CONCURRENTLY IF NOT EXISTS）。
+
+    返回 {"indexes": [...已确认存在...], "failed": [...]}，单个失败不影响其它索引。
+    """
+    engine = engine or default_engine
+    ok, failed = [], []
+    with engine.connect() as conn:
+        # CONCURRENTLY 不能在事务块内执行
+        conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+        ensure_extensions(conn)
+        invalid = _invalid_index_names(conn)
+        for table in MANAGED_TABLES:
+            for index in sorted(table.indexes, key=lambda i: i.name):
+                try:
+                    if index.name in invalid:
+                        logger.warning(f"[DB] dropping invalid index {index.name}")
+                        conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{index.name}"'))
+                    conn.execute(CreateIndex(index, if_not_exists=True))
+                    ok.append(index.name)
+                except Exception as e:
+                    logger.warning(f"[DB] create index {index.name} failed: {e!r}")
+                    failed.append(index.name)
+        if not failed:
+            for name in OBSOLETE_INDEXES:
+                conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"'))
+    logger.info(f"[DB] indexes ok={len(ok)} failed={failed}")
+    return {"indexes": ok, "failed": failed}
+
+
+# 与各列表接口同形的代表性查询，用于在大表上核对执行计划是否走索引
+EXPLAIN_SAMPLES = {
+    "my_words_list": (
+        """
+        SELECT id FROM objects
+        WHERE template_id = :word_template_id AND author = :user
+        ORDER BY create_timestamp DESC, id DESC LIMIT 20
+        """
+    ),
+    "dev_data_list": (
+        """
+        SELECT id FROM objects
+        WHERE author = :user AND template_id NOT IN :exclude
+        ORDER BY create_timestamp DESC, id DESC LIMIT 20
+        """
+    ),
+    "dev_data_filter_count": (
+        """
+        SELECT count(id) FROM objects
+        WHERE author = :user AND review_status LIKE 'waiting_review%'
+          AND template_id NOT IN :exclude
+        """
+    ),
+    "admin_data_list": (
+        """
+        SELECT id FROM objects
+        WHERE template_id NOT IN :exclude AND review_status <> 'draft'
+        ORDER BY create_timestamp DESC, id DESC LIMIT 20 OFFSET 1000
+        """
+    ),
+    "my_MGID_list": (
+        """
+        SELECT id FROM objects
+        WHERE template_id = :mgid_template_id AND (json_data ->> 'MGID_submitter') = :user
+        ORDER BY create_timestamp DESC, id DESC LIMIT 20
+        """
+    ),
+    "admin_data_list_cursor": (
+        """
+        SELECT id FROM objects
+        WHERE template_id NOT IN :exclude AND review_status <> 'draft'
+          AND (create_timestamp, id) < (now(), 'ffffffff-ffff-ffff-ffff-ffffffffffff'::uuid)
+        ORDER BY create_timestamp DESC, id DESC LIMIT 20
+        """
+    ),
+    "search_word_substring": (
+        """
+        SELECT id FROM objects
+        WHERE template_id = :word_template_id AND search_name LIKE '%' || lower(:user) || '%'
+          AND review_status LIKE 'passed_review%'
+        ORDER BY create_timestamp DESC, id DESC LIMIT 20
+        """
+    ),
+    "get_MGID": "SELECT id FROM objects WHERE mgid = :mgid LIMIT 1",
+    "templates_list": (
+        """
+        SELECT id FROM templates
+        WHERE (json_schema ->> 'author') = :user
+        ORDER BY (json_schema ->> 'create_timestamp') DESC, id DESC LIMIT 20
+        """
+    ),
+}
+
+
+def explain_samples(user: str, mgid: str = "", analyze: bool = False, engine=None) -> dict:
+    """对 EXPLAIN_SAMPLES 逐条执行 EXPLAIN，返回 {名称: 计划文本}。"""
+    from sqlalchemy import bindparam
+
+    engine = engine or default_engine
+    params = {
+        "user": user,
+        "mgid": mgid,
+        "word_template_id": constants.WORD_TEMPLATE_ID,
+        "mgid_template_id": constants.MGID_APPLY_TEMPLATE_ID,
+        "exclude": list(constants.EXCLUDETEMPLATES),
+    }
+    prefix = "EXPLAIN (ANALYZE, BUFFERS) " if analyze else "EXPLAIN "
+    plans = {}
+    with engine.connect() as conn:
+        for name, sql in EXPLAIN_SAMPLES.items():
+            stmt = text(prefix + sql)
+            if ":exclude" in sql:
+                stmt = stmt.bindparams(bindparam("exclude", expanding=True))
+            used = {k: v for k, v in params.items() if f":{k}" in sql}
+            rows = conn.execute(stmt, used).fetchall()
+            plans[name] = "\n".join(r[0] for r in rows)
+        conn.rollback()
+    return plans
@@ -1,8 +1,9 @@
-from sqlalchemy import Column, String, JSON, Numeric
+from sqlalchemy import Column, String, JSON, Numeric, Integer, Index, Computed, DateTime, text
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 import uuid
 
 from .base import Base
+from common import constants
 
 
 class Template(Base):
@@ -12,6 +13,32 @@ class Template(Base):
     name = Column(String)
     json_schema = Column(JSONB)
 
+    # 与 template_crud / admin_crud 中的过滤、排序表达式一一对应（排序键含 id，
+    # 供 database.pagination 游标分页使用），
+    # 由 database.migrate.ensure_indexes 以 CONCURRENTLY 方式补建
+    __table_args__ = (
+        Index(
+            "ix_templates_author_created_id",
+            text("(json_schema ->> 'author')"),
+            text("(json_schema ->> 'create_timestamp') DESC"),
+            text("id DESC"),
+            postgresql_concurrently=True,
+        ),
+        Index(
+            "ix_templates_created_id",
+            text("(json_schema ->> 'create_timestamp') DESC"),
+            text("id DESC"),
+            postgresql_concurrently=True,
+        ),
+        # 模板名称检索（pg_trgm）
+        Index(
+            "ix_templates_name_trgm",
+            text("lower(name) gin_trgm_ops"),
+            postgresql_using="gin",
+            postgresql_concurrently=True,
+        ),
+    )
+
 
 class Object(Base):
     __tablename__ = "objects"
@@ -20,6 +47,178 @@ class Object(Base):
     template_id = Column(UUID(as_uuid=True))
     json_data = Column(JSONB)
 
+    # 由 json_data 派生的只读生成列（STORED），查询直接过滤 / 排序这些列，
+    # 写入仍只写 json_data。建列语句见 database.migrate.ensure_generated_columns
+    review_status = Column(String, Computed("json_data ->> 'review_status'", persisted=True))
+    author = Column(String, Computed("json_data ->> 'author'", persisted=True))
+    create_timestamp = Column(
+        DateTime(timezone=True),
+        Computed(
+            "mgsdb_parse_timestamp(json_data ->> 'create_timestamp')", persisted=True
+        ),
+    )
+    MGID = Column("mgid", String, Computed("json_data ->> 'MGID'", persisted=True))
+    template_type = Column(String, Computed("json_data ->> 'template_type'", persisted=True))
+    # 检索结果按单位分面统计
+    institution = Column(String, Computed("json_data ->> 'institution'", persisted=True))
+    # 搜索用的归一化文本（小写）；词汇名的中英文以换行分隔，避免跨字段误匹配
+    search_name = Column(
+        String,
+        Computed(
+            "lower(coalesce(json_data ->> 'chinese_name', '') || chr(10)"
+            " || coalesce(json_data ->> 'english_name', ''))",
+            persisted=True,
+        ),
+    )
+    search_title = Column(String, Computed("lower(json_data ->> 'title')", persisted=True))
+
+    __table_args__ = (
+        # 词汇 / MGID 列表：template_id 等值 + 按 (创建时间, id) 倒序
+        Index(
+            "ix_objects_template_create_ts_id",
+            "template_id",
+            text("create_timestamp DESC"),
+            text("id DESC"),
+            postgresql_concurrently=True,
+        ),
+        # 我的词汇 / 我的数据：author 等值 + 按创建时间倒序
+        Index(
+            "ix_objects_author_create_ts_id",
+            "author",
+            text("create_timestamp DESC"),
+            text("id DESC"),
+            postgresql_concurrently=True,
+        ),
+        # 按状态筛选：author 等值 + review_status 前缀匹配 (LIKE 'xxx%')
+        Index(
+            "ix_objects_author_review_status",
+            "author",
+            text("review_status text_pattern_ops"),
+            postgresql_concurrently=True,
+        ),
+        # 管理端数据列表：排除草稿后按创建时间倒序
+        Index(
+            "ix_objects_create_ts_id_non_draft",
+            text("create_timestamp DESC"),
+            text("id DESC"),
+            postgresql_where=text(f"review_status <> '{constants.REVIEW_STATUS_DRAFT}'"),
+            postgresql_concurrently=True,
+        ),
+        # 样品 / 关联数据检索：template_type + review_status
+        Index(
+            "ix_objects_template_type_status",
+            "template_type",
+            "review_status",
+            postgresql_concurrently=True,
+        ),
+        # 我的 MGID 申请：仅覆盖 MGID 申请模板
+        Index(
+            "ix_objects_mgid_submitter_create_ts_id",
+            text("(json_data ->> 'MGID_submitter')"),
+            text("create_timestamp DESC"),
+            text("id DESC"),
+            postgresql_where=text(
+                f"template_id = '{constants.MGID_APPLY_TEMPLATE_ID}'"
+            ),
+            postgresql_concurrently=True,
+        ),
+        # MGID 解析；唯一约束保证生成的标识符库内不重复
+        Index(
+            "ux_objects_mgid",
+            "mgid",
+            unique=True,
+            postgresql_where=text("mgid IS NOT NULL"),
+            postgresql_concurrently=True,
+        ),
+        # /api/unauth/search/ 子串 / 相似度检索（pg_trgm）
+        Index(
+            "ix_objects_search_name_trgm",
+            text("search_name gin_trgm_ops"),
+            postgresql_using="gin",
+            postgresql_concurrently=True,
+        ),
+        Index(
+            "ix_objects_search_title_trgm",
+            text("search_title gin_trgm_ops"),
+            postgresql_using="gin",
+            postgresql_where=text("search_title IS NOT NULL"),
+            postgresql_concurrently=True,
+        ),
+        Index(
+            "ix_objects_mgid_trgm",
+            text("lower(mgid) gin_trgm_ops"),
+            postgresql_using="gin",
+            postgresql_where=text("mgid IS NOT NULL"),
+            postgresql_concurrently=True,
+        ),
+        # 包含查询 (@>)，如关联样品检索
+        Index(
+            "ix_objects_json_data_gin",
+            "json_data",
+            postgresql_using="gin",
+            postgresql_ops={"json_data": "jsonb_path_ops"},
+            postgresql_concurrently=True,
+        ),
+    )
+
+
+class SearchPosting(Base):
+    """CJK bigram 倒排索引：词元 -> 文档（词汇 / 模板 / 数据），由 search_index_crud 维护。"""
+
+    __tablename__ = "search_postings"
+
+    doc_type = Column(String, primary_key=True)
+    token = Column(String, primary_key=True)
+    doc_id = Column(UUID(as_uuid=True), primary_key=True)
+    tf = Column(Integer)
+
+    # 表由 database.migrate.ensure_tables 创建，索引随建表一起创建
+    __table_args__ = (
+        # 单字查询：token 前缀匹配
+        Index("ix_search_postings_token_prefix", "doc_type", text("token text_pattern_ops")),
+        # 文档重建 / 删除时按文档清理
+        Index("ix_search_postings_doc", "doc_type", "doc_id"),
+    )
+
+
+class MaintenanceState(Base):
+    """全量维护任务的完成标记（如 search_index：倒排索引已回填），由对应的 rebuild 在同一事务内写入。"""
+
+    __tablename__ = "maintenance_state"
+
+    name = Column(String, primary_key=True)
+    completed_at = Column(DateTime(timezone=True), nullable=False)
+
+
+class WordClosure(Base):
+    """词汇层级闭包表：每对 (祖先, 后代) 一行，depth 为相差层数（自身一行，depth=0），
+    由 word_closure_crud 随词汇创建 / 更新 / 删除维护。"""
+
+    __tablename__ = "word_closure"
+
+    ancestor_id = Column(UUID(as_uuid=True), primary_key=True)
+    descendant_id = Column(UUID(as_uuid=True), primary_key=True)
+    depth = Column(Integer, nullable=False)
+
+    # 表由 database.migrate.ensure_tables 创建，索引随建表一起创建；
+    # 子树 / 子节点走主键 (ancestor_id, descendant_id)，祖先链 / 层级走此索引
+    __table_args__ = (Index("ix_word_closure_descendant", "descendant_id", "depth"),)
+
+
+class MGIDRegistry(Base):
+    """MGID 登记表：MGID -> 对象 id / 模板 / 类别（data 数据、apply 外部申请），
+    由 MGID_registry_crud 随对象创建 / 更新 / 删除维护；主键保证 MGID 不重复。"""
+
+    __tablename__ = "mgid_registry"
+
+    MGID = Column("mgid", String, primary_key=True)
+    object_id = Column(UUID(as_uuid=True), nullable=False)
+    template_id = Column(UUID(as_uuid=True))
+    kind = Column(String, nullable=False)
+
+    # 表由 database.migrate.ensure_tables 创建；对象更新 / 删除时按 object_id 查找
+    __table_args__ = (Index("ix_mgid_registry_object", "object_id"),)
+
 
 class Country(Base):
     __tablename__ = "country"
@@ -50,6 +249,8 @@ class User(Base):
     country = Column(String)
     user_type = Column(String)
     organization = Column(String)
+    user_number = Column(String)
+    display_name = Column(String)
 
 
 class MultipartUploadSession(Base):
@@ -1,34 +1,18 @@
 from sqlalchemy.orm import Session
-from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy import or_, func
 from . import schemas
-from common import status
-from . import models
+from common import reference_data, suggest_service
+from . import location_import_crud, models
 import uuid
 
 
-def create_organization(
-    db: Session, organization_list: list[schemas.OrganizationCreate]
-):
-
-    list_rows = 0
-    organization_object_list = list()
-    insert_stmt = insert(models.Organization.__table__).on_conflict_do_nothing()
-    for i, organization in enumerate(organization_list):
-        try:
-            organization_id, organization_name = organization
-            organization_object_list.append(
-                {"id": organization_id, "name": organization_name}
-            )
-            list_rows += 1
-        except:
-            continue
-    result = db.execute(insert_stmt, organization_object_list)
-    db.commit()
-    count = result.rowcount
-    if count < list_rows:
-        return status.API_INVALID_CSV_ROW
-    return status.API_OK
+def import_organization_csv(db: Session, rows) -> dict:
+    """流式导入机构 CSV（每行 id,name），返回导入报告，见 location_import_crud。"""
+    report = location_import_crud.import_locations(db, models.Organization.__tablename__, rows)
+    if report["inserted"]:
+        reference_data.reference.refresh_locations(db)
+        suggest_service.suggest_index.invalidate_organizations()
+    return report
 
 
 def is_organization_exist(db: Session, organization: schemas.OrganizationCreate):
@@ -71,6 +55,8 @@ def get_organization_count(db: Session):
 def delete_organization(db: Session, id: uuid.UUID):
     db.query(models.Organization).filter(models.Organization.id == id).delete()
     db.commit()
+    reference_data.reference.refresh_locations(db)
+    suggest_service.suggest_index.invalidate_organizations()
 
 
 def get_organization_by_name(db: Session, name: str):
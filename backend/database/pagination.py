@@ -0,0 +1,184 @@
+"""列表分页：offset/limit 与基于 (create_timestamp, id) 的游标分页。
+
+两种模式共用同一排序 (create_timestamp DESC, id DESC)，因此第一页可以用
+start/size 取，之后用返回的 next_cursor 继续翻页；游标模式下第 N 页
+与第一页代价相同，不再随 offset 线性增长。
+
+paginate_with_count 在同一次请求中同时给出总数：小结果集用窗口函数精确计数，
+大结果集用规划器估算值并短时缓存，避免每次翻页都 COUNT(*) 全扫描。
+"""
+import base64
+import datetime
+import json
+import logging
+import uuid
+from typing import Any, Callable, Optional, Tuple
+
+from sqlalchemy import and_, func, or_, tuple_
+
+from common import cache
+from settings import settings
+
+logger = logging.getLogger("db.pagination")
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(ts: Any, row_id: Any) -> str:
+    if isinstance(ts, datetime.datetime):
+        payload = {"k": "dt", "t": ts.isoformat()}
+    else:
+        payload = {"k": "s", "t": ts}
+    payload["id"] = str(row_id)
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, uuid.UUID]:
+    """解析游标，返回 (ts, id)；格式不对抛 InvalidCursor。"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        ts = payload["t"]
+        if ts is not None and payload.get("k") == "dt":
+            ts = datetime.datetime.fromisoformat(ts)
+        return ts, uuid.UUID(payload["id"])
+    except Exception:
+        raise InvalidCursor("invalid cursor")
+
+
+def _after(ts_col, id_col, ts, row_id):
+    """排序 (ts DESC NULLS FIRST, id DESC) 下位于游标之后的行。"""
+    if ts is None:
+        return or_(and_(ts_col.is_(None), id_col < row_id), ts_col.isnot(None))
+    # 行值比较可直接作为 (ts DESC, id DESC) 索引的范围条件
+    return tuple_(ts_col, id_col) < tuple_(ts, row_id)
+
+
+def paginate(
+    query,
+    ts_col,
+    id_col,
+    start: int,
+    size: int,
+    cursor: Optional[str] = None,
+    row_key: Optional[Callable[[Any], Tuple[Any, Any]]] = None,
+):
+    """对已带过滤条件的 query 分页，返回 (rows, next_cursor)。
+
+    传入 cursor 时忽略 start；row_key 从结果行取出 (ts, id)，
+    默认按 ORM 对象的 create_timestamp / id 属性读取。
+    """
+    query = query.order_by(ts_col.desc().nulls_first(), id_col.desc())
+    if cursor:
+        ts, row_id = decode_cursor(cursor)
+        query = query.filter(_after(ts_col, id_col, ts, row_id))
+    else:
+        query = query.offset(start)
+    rows = query.limit(size).all()
+    next_cursor = None
+    if rows and len(rows) >= size:
+        key = row_key or (lambda r: (r.create_timestamp, r.id))
+        next_cursor = encode_cursor(*key(rows[-1]))
+    return rows, next_cursor
+
+
+# 计数缓存：语句及参数 -> (count, 是否精确)；满时按 LRU 淘汰
+_count_cache = cache.get_cache(
+    "list_count", settings.LIST_COUNT_CACHE_SIZE, settings.LIST_COUNT_CACHE_TTL
+)
+
+
+def _compiled(query):
+    stmt = query.order_by(None).statement
+    dialect = query.session.get_bind().dialect
+    return stmt.compile(dialect=dialect, compile_kwargs={"render_postcompile": True})
+
+
+def _count_cache_key(compiled) -> str:
+    return f"{compiled.string}|{sorted((k, repr(v)) for k, v in compiled.params.items())}"
+
+
+def _cached_count(key: str):
+    return _count_cache.get(key)
+
+
+def _store_count(key: str, count: int, exact: bool):
+    _count_cache.set(key, (count, exact))
+
+
+def clear_count_cache():
+    _count_cache.clear()
+
+
+def estimate_count(query, compiled=None) -> Optional[int]:
+    """取规划器对 query 结果行数的估算（EXPLAIN，不执行查询），失败返回 None。"""
+    compiled = compiled if compiled is not None else _compiled(query)
+    session = query.session
+    try:
+        # SAVEPOINT 内执行：EXPLAIN 出错时只回滚到保存点，调用方事务仍可继续查询
+        with session.begin_nested():
+            plan = (
+                session.connection()
+                .exec_driver_sql("EXPLAIN (FORMAT JSON) " + compiled.string, compiled.params)
+                .scalar()
+            )
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+    except Exception as e:
+        logger.warning(f"[DB] count estimate failed: {e!r}")
+        return None
+
+
+def paginate_with_count(
+    query,
+    ts_col,
+    id_col,
+    start: int,
+    size: int,
+    cursor: Optional[str] = None,
+    row_key: Optional[Callable[[Any], Tuple[Any, Any]]] = None,
+) -> dict:
+    """分页并附带总数，返回 {"data", "count", "count_exact", "next_cursor"}。
+
+    query 须为单实体查询（如 db.query(models.Object)）。估算行数不超过
+    LIST_EXACT_COUNT_THRESHOLD 时精确计数：offset 模式下随本页数据以
+    count(*) OVER () 一并取回；超过阈值时返回估算值，count_exact 为 False。
+    非精确结果按 LIST_COUNT_CACHE_TTL 缓存。
+    """
+    compiled = _compiled(query)
+    key = _count_cache_key(compiled)
+    cached = _cached_count(key)
+    if cached is None:
+        estimate = estimate_count(query, compiled)
+        if estimate is not None and estimate > settings.LIST_EXACT_COUNT_THRESHOLD:
+            cached = (estimate, False)
+            _store_count(key, estimate, False)
+
+    if cached is not None:
+        rows, next_cursor = paginate(query, ts_col, id_col, start, size, cursor, row_key)
+        count, exact = cached
+    elif cursor:
+        rows, next_cursor = paginate(query, ts_col, id_col, start, size, cursor, row_key)
+        count, exact = query.order_by(None).count(), True
+    else:
+        windowed = query.add_columns(func.count().over().label("total_count"))
+        result, next_cursor = paginate(
+            windowed,
+            ts_col,
+            id_col,
+            start,
+            size,
+            row_key=(lambda r: (row_key or (lambda o: (o.create_timestamp, o.id)))(r[0])),
+        )
+        rows = [r[0] for r in result]
+        if result:
+            count = result[0].total_count
+        else:
+            # offset 越过末尾时窗口函数没有行可带回
+            count = query.order_by(None).count()
+        exact = True
+    return {"data": rows, "count": count, "count_exact": exact, "next_cursor": next_cursor}
@@ -4,7 +4,7 @@ try:
 except Exception:
     ConfigDict = None  # type: ignore
 import uuid
-from typing import List
+from typing import Any, Dict, List, Optional
 
 
 class TemplateCreate(BaseModel):
@@ -52,6 +52,12 @@ class Query(BaseModel):
     queryType: List[str]
     start: int
     size: int
+    # 各结果列表的游标，键为 wordResultList / templateResultList / ...
+    cursors: Optional[Dict[str, str]] = None
+    # substring（默认，子串匹配）| fuzzy（相似度匹配）| bigram（倒排索引）
+    mode: str = "substring"
+    # 是否同时返回各结果列表的分面计数（template_type / review_status / institution / template_id）
+    facets: bool = False
 
 
 class DataCreate(BaseModel):
@@ -60,6 +66,12 @@ class DataCreate(BaseModel):
     review_status: str
 
 
+class DataBulkCreate(BaseModel):
+    template_id: str
+    # 每条为 json_data 字符串（同 DataCreate.json_data）或已解析的对象
+    records: List[Any]
+
+
 class SampleDataQuery(BaseModel):
     template_id: str
     template_name: str
@@ -89,17 +101,26 @@ class MGIDApplyCreate(BaseModel):
     json_data: str
 
 
+class MGIDResolveQuery(BaseModel):
+    MGIDs: List[str]
+
+
 class SearchWordsQuery(BaseModel):
     author: str | None = None
     review_status_prefix: str | None = None
     name_contains: str | None = None
     start: int = 0
     size: int = 20
+    cursor: str | None = None
 
 
 class UserAdd(BaseModel):
     user_json_data: str
 
+class UserBulkImport(BaseModel):
+    # 每行字段同 UserAdd.user_json_data：user_name / display_name / password / country / organization / user_type
+    users: List[Dict[str, Any]]
+
 class User(BaseModel):
     user_name: str
     display_name: str
@@ -1,95 +1,358 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from sqlalchemy.orm import Session
-from sqlalchemy import String, cast, not_
-from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy import func, literal, select, text, tuple_
 from common import constants, utils
-from . import models, schemas
+from typing import Dict, Optional
+from . import models, schemas, pagination, search_index_crud, template_crud
+from .base import SessionLocal
+from settings import settings
 
+logger = logging.getLogger("db.search")
 
-def get_search_list(db: Session, query: str, queryType, start: int, size: int):
-    resultList = {
-        "wordResultList": [],
-        "templateResultList": [],
-        "dataResultList": [],
-        "MGIDResultList": [],
+# substring：子串匹配（忽略大小写），走 pg_trgm GIN 索引，按创建时间倒序，支持游标
+# fuzzy：pg_trgm 词相似度匹配，按相似度排序，仅支持 start/size
+# bigram：search_postings 倒排索引（适合中文），按命中次数排序，仅支持 start/size；
+#         MGID 不建倒排索引，仍按 substring 检索
+SEARCH_MODES = ("substring", "fuzzy", "bigram")
+
+
+def _like_pattern(query: str) -> str:
+    escaped = query.lower().replace("!", "!!").replace("%", "!%").replace("_", "!_")
+    return f"%{escaped}%"
+
+
+def _text_match(col, query: str, mode: str):
+    if mode == "fuzzy":
+        # query <% col：query 与 col 中某一片段足够相似（pg_trgm.word_similarity_threshold）
+        return literal(query.lower()).op("<%")(col)
+    return col.like(_like_pattern(query), escape="!")
+
+
+# queryType -> 结果列表名
+RESULT_KEYS = {
+    "word": "wordResultList",
+    "templete": "templateResultList",
+    "studydata": "dataResultList",
+    "MGID": "MGIDResultList",
+}
+
+# queryType -> search_postings 文档类型；MGID 不建倒排索引
+DOC_TYPES = {
+    "word": search_index_crud.DOC_WORD,
+    "templete": search_index_crud.DOC_TEMPLATE,
+    "studydata": search_index_crud.DOC_DATA,
+}
+
+
+def _empty_result():
+    result = {key: [] for key in RESULT_KEYS.values()}
+    result["nextCursors"] = {}
+    # 超时 / 失败而结果为空的列表名（仅并发检索时出现）
+    result["timedOut"] = []
+    return result
+
+
+def _base_query(db: Session, item: str):
+    """各类型检索范围（审核状态等），不含检索词条件。"""
+    passed_review = f"{constants.REVIEW_STATUS_PASSED_REVIEW}%"
+    if item == "word":
+        return (
+            db.query(models.Object)
+            .filter(models.Object.template_id == constants.WORD_TEMPLATE_ID)
+            .filter(models.Object.review_status.like(passed_review))
+        )
+    if item == "templete":
+        return (
+            db.query(models.Template)
+            .filter(models.Template.json_schema["review_status"].astext.like(passed_review))
+            .filter(models.Template.id.notin_(constants.EXCLUDETEMPLATES))
+        )
+    if item == "studydata":
+        return (
+            db.query(models.Object)
+            .filter(
+                models.Object.review_status
+                != constants.REVIEW_STATUS_PASSED_REVIEW_WAITING_PUBLISHED
+            )
+            .filter(models.Object.review_status.like(passed_review))
+        )
+    return db.query(models.Object).filter(
+        models.Object.template_id == constants.MGID_APPLY_TEMPLATE_ID
+    )
+
+
+def _text_col(item: str):
+    if item == "word":
+        return models.Object.search_name
+    if item == "templete":
+        return func.lower(models.Template.name)
+    if item == "studydata":
+        return models.Object.search_title
+    return func.lower(models.Object.MGID)
+
+
+def _id_col(item: str):
+    return models.Template.id if item == "templete" else models.Object.id
+
+
+def _item_mode(db: Session, item: str, mode: str) -> str:
+    # 没有倒排索引的类型、或倒排索引尚未回填完成时，bigram 模式仍按子串检索
+    if mode == "bigram" and (item not in DOC_TYPES or not search_index_crud.is_populated(db)):
+        return "substring"
+    return mode
+
+
+def _matched(db: Session, item: str, query: str, mode: str):
+    """带检索条件的 query 及排序用的相关度列；bigram 模式下检索词无可用词元时返回 (None, None)。"""
+    query_cmd = _base_query(db, item)
+    if mode == "bigram":
+        matched = search_index_crud.match_subquery(db, DOC_TYPES[item], query)
+        if matched is None:
+            return None, None
+        return query_cmd.join(matched, matched.c.doc_id == _id_col(item)), matched.c.score
+    col = _text_col(item)
+    return query_cmd.filter(_text_match(col, query, mode)), col
+
+
+def search_type(
+    db: Session,
+    item: str,
+    query: str,
+    start: int,
+    size: int,
+    cursor: Optional[str] = None,
+    mode: str = "substring",
+):
+    """单一类型的检索，返回 (rows, next_cursor)。"""
+    if item not in RESULT_KEYS:
+        return [], None
+    mode = _item_mode(db, item, mode)
+    query_cmd, rank_col = _matched(db, item, query, mode)
+    if query_cmd is None:
+        return [], None
+    id_col = _id_col(item)
+    if mode == "bigram":
+        order = (rank_col.desc(), id_col.desc())
+    elif mode == "fuzzy":
+        order = (func.word_similarity(query.lower(), rank_col).desc(), id_col.desc())
+    elif item == "templete":
+        return pagination.paginate(
+            query_cmd,
+            models.Template.json_schema["create_timestamp"].astext,
+            id_col,
+            start,
+            size,
+            cursor,
+            row_key=template_crud._template_row_key,
+        )
+    else:
+        return pagination.paginate(
+            query_cmd, models.Object.create_timestamp, id_col, start, size, cursor
+        )
+    # 按相关度排序的模式只支持 start/size
+    return query_cmd.order_by(*order).offset(start).limit(size).all(), None
+
+
+def _facet_columns(item: str) -> dict:
+    if item == "templete":
+        schema = models.Template.json_schema
+        return {
+            "template_type": schema["template_type"].astext,
+            "review_status": schema["review_status"].astext,
+            "institution": schema["institution"].astext,
+        }
+    return {
+        "template_type": models.Object.template_type,
+        "review_status": models.Object.review_status,
+        "institution": models.Object.institution,
+        "template_id": models.Object.template_id,
     }
+
+
+def facet_counts(db: Session, item: str, query: str, mode: str = "substring") -> dict:
+    """统计该类型全部命中结果的分面取值，返回 {分面: [{"value", "count"}, ...]}。
+
+    所有分面用一条 GROUPING SETS 查询取回；每个分面按数量取前 SEARCH_FACET_LIMIT 个，
+    取值为空的不计。
+    """
+    columns = _facet_columns(item)
+    facets = {name: [] for name in columns}
+    mode = _item_mode(db, item, mode)
+    query_cmd, _ = _matched(db, item, query, mode)
+    if query_cmd is None:
+        return facets
+    matched = query_cmd.with_entities(
+        *(col.label(name) for name, col in columns.items())
+    ).subquery()
+    cols = [matched.c[name] for name in columns]
+    rows = db.execute(
+        select(*cols, func.count().label("count")).group_by(
+            func.grouping_sets(*(tuple_(c) for c in cols))
+        )
+    ).all()
+    # 每行只有所在分组集的列有值，其余列为 NULL
+    for row in rows:
+        for name, value in zip(columns, row[:-1]):
+            if value is not None:
+                facets[name].append({"value": value, "count": row.count})
+                break
+    for name in facets:
+        facets[name].sort(key=lambda f: (-f["count"], str(f["value"])))
+        del facets[name][settings.SEARCH_FACET_LIMIT :]
+    return facets
+
+
+def get_search_list(
+    db: Session,
+    query: str,
+    queryType,
+    start: int,
+    size: int,
+    cursors: Optional[Dict[str, str]] = None,
+    mode: str = "substring",
+    facets: bool = False,
+):
+    """在同一会话内依次检索各类型。
+
+    cursors 以结果列表名为键（如 "wordResultList"），下一页游标在 nextCursors 中返回；
+    facets 为真时另在 facets 中按结果列表名返回分面计数（见 facet_counts）。
+    """
+    cursors = cursors or {}
+    resultList = _empty_result()
+    if facets:
+        resultList["facets"] = {}
     if query == "":
         return resultList
     for item in queryType:
-        if item == "word":
-            query_cmd = (
-                db.query(models.Object)
-                .filter(
-                    cast(models.Object.template_id, String)
-                    == cast(constants.WORD_TEMPLATE_ID, String)
-                )
-                .filter(
-                    cast(models.Object.json_data["chinese_name"], String).like(
-                        "%" + query + "%"
-                    )
-                    | cast(models.Object.json_data["english_name"], String).like(
-                        "%" + query + "%"
-                    ),
-                )
-                .filter(
-                    cast(models.Object.json_data["review_status"], String).match(
-                        cast(constants.REVIEW_STATUS_PASSED_REVIEW, String)
-                    )
-                )
-            )
-            resultList["wordResultList"] = query_cmd.offset(start).limit(size).all()
+        key = RESULT_KEYS.get(item)
+        if key is None:
             continue
-        if item == "templete":
-            query_cmd = (
-                db.query(models.Template)
-                .filter(cast(models.Template.name, String).like("%" + query + "%"))
-                .filter(
-                    cast(models.Template.json_schema["review_status"], String).match(
-                        cast(constants.REVIEW_STATUS_PASSED_REVIEW, String)
-                    )
-                )
-            )
-            for item in constants.EXCLUDETEMPLATES:
-                query_cmd = query_cmd.filter(
-                    cast(models.Template.id, String) != cast(item, String)
-                )
-            resultList["templateResultList"] = query_cmd.offset(start).limit(size).all()
-            continue
-        if item == "studydata":
-            query_cmd = (
-                db.query(models.Object)
-                .filter(
-                    cast(models.Object.json_data["title"], String).like(
-                        "%" + query + "%"
-                    )
-                )
-                .filter(
-                    not_(
-                        cast(models.Object.json_data["review_status"], String).match(
-                            constants.REVIEW_STATUS_PASSED_REVIEW_WAITING_PUBLISHED
-                        )
-                    )
-                )
-                .filter(
-                    cast(models.Object.json_data["review_status"], String).match(
-                        cast(constants.REVIEW_STATUS_PASSED_REVIEW, String)
-                    )
-                )
-            )
-            resultList["dataResultList"] = query_cmd.offset(start).limit(size).all()
+        resultList[key], next_cursor = search_type(
+            db, item, query, start, size, cursors.get(key), mode
+        )
+        resultList["nextCursors"][key] = next_cursor
+        if facets:
+            resultList["facets"][key] = facet_counts(db, item, query, mode)
+    return resultList
+
+
+# 每个在途类型占用一个连接池连接：线程数不超过连接池容量的一半，给请求自身的会话留出余量
+SEARCH_WORKERS = max(
+    1,
+    min(settings.SEARCH_PARALLEL_WORKERS, (settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW) // 2),
+)
+_search_executor = ThreadPoolExecutor(max_workers=SEARCH_WORKERS, thread_name_prefix="search")
+
+# 并发检索统计，见 /api/admin/search_stats
+_stats_lock = threading.Lock()
+_stats = {"requests": 0, "partial": 0, "timed_out_types": 0, "serial_fallbacks": 0}
+
+
+def _count(**increments):
+    with _stats_lock:
+        for name, n in increments.items():
+            _stats[name] += n
+
+
+def stats() -> dict:
+    with _stats_lock:
+        return {"workers": SEARCH_WORKERS, **_stats}
+
+
+def _search_type_isolated(item, query, start, size, cursor, mode, timeout_ms, facets=False):
+    """在独立的连接池会话中检索，返回 (rows, next_cursor, facets)；
+    statement_timeout 保证超时的查询会在库侧被取消。"""
+    db = SessionLocal()
+    try:
+        db.execute(text(f"SET LOCAL statement_timeout = {int(timeout_ms)}"))
+        rows, next_cursor = search_type(db, item, query, start, size, cursor, mode)
+        facet = facet_counts(db, item, query, mode) if facets else None
+        # 先与会话分离：rollback 会使会话内对象过期、close 后无法再加载，调用方读到的将是空对象
+        db.expunge_all()
+        return rows, next_cursor, facet
+    finally:
+        db.rollback()
+        db.close()
+
+
+class _SearchTask:
+    """记录任务实际开始执行的时间：超时从开始执行算起，排队时间不计入。"""
+
+    def __init__(self, args):
+        self.args = args
+        self.started = None
+
+    def run(self):
+        self.started = time.monotonic()
+        return _search_type_isolated(*self.args)
+
+
+def get_search_list_parallel(
+    query: str,
+    queryType,
+    start: int,
+    size: int,
+    cursors: Optional[Dict[str, str]] = None,
+    mode: str = "substring",
+    timeout_ms: Optional[int] = None,
+    facets: bool = False,
+):
+    """各类型在各自的连接上并发检索，全部完成或超时后返回。
+
+    每个类型的超时从其开始执行时计算；到时仍在排队的类型改为在当前线程串行执行。
+    超时或出错的类型结果为空，并列入 timedOut（部分结果，计入 search_stats）。
+    """
+    cursors = cursors or {}
+    timeout_ms = timeout_ms or settings.SEARCH_TYPE_TIMEOUT_MS
+    resultList = _empty_result()
+    if facets:
+        resultList["facets"] = {}
+    if query == "":
+        return resultList
+    timeout = timeout_ms / 1000
+    tasks = {}
+    for item in dict.fromkeys(queryType):
+        key = RESULT_KEYS.get(item)
+        if key is None:
             continue
-        if item == "MGID":
-            query_cmd = (
-                db.query(models.Object)
-                .filter(
-                    cast(models.Object.template_id, String)
-                    == cast(constants.MGID_APPLY_TEMPLATE_ID, String),
-                )
-                .filter(
-                    cast(models.Object.json_data["MGID"], String).like(
-                        "%" + query + "%"
-                    )
-                )
-            )
-            resultList["MGIDResultList"] = query_cmd.offset(start).limit(size).all()
+        task = _SearchTask(
+            (item, query, start, size, cursors.get(key), mode, timeout_ms, facets)
+        )
+        tasks[_search_executor.submit(task.run)] = (key, task)
+    wait(tasks, timeout=timeout)
+    # 到时仍在排队（线程池忙）的类型先全部撤下，改为在当前线程串行执行：只增加延迟、不丢结果
+    queued = {future for future in tasks if not future.done() and future.cancel()}
+    for future, (key, task) in tasks.items():
+        try:
+            if future in queued:
+                resultList[key], next_cursor, facet = _search_type_isolated(*task.args)
+            else:
+                if not future.done():
+                    # 已在执行：等到其自身的截止时间（库侧 statement_timeout 同样从开始计时）
+                    started = task.started or time.monotonic()
+                    wait([future], timeout=max(0.0, started + timeout - time.monotonic()) + 0.05)
+                if not future.done():
+                    resultList["timedOut"].append(key)
+                    continue
+                resultList[key], next_cursor, facet = future.result()
+        except pagination.InvalidCursor:
+            raise
+        except Exception as e:
+            logger.warning(f"[search] {key} failed: {e!r}")
+            resultList["timedOut"].append(key)
             continue
+        resultList["nextCursors"][key] = next_cursor
+        if facets:
+            resultList["facets"][key] = facet
+    _count(
+        requests=1,
+        partial=1 if resultList["timedOut"] else 0,
+        timed_out_types=len(resultList["timedOut"]),
+        serial_fallbacks=len(queued),
+    )
+    if resultList["timedOut"]:
+        logger.warning(f"[search] partial result, timed out: {resultList['timedOut']}")
     return resultList
@@ -0,0 +1,203 @@
+"""词汇 / 模板 / 数据的 CJK bigram 倒排索引维护与检索。
+
+写入路径（创建、更新、删除）在同一事务内调用 index_* / remove_*，
+检索时对各查询词元的倒排列表取交集，按命中词元的出现次数排序。
+全量回填（rebuild）完成前 is_populated 为 False，调用方回退到 ILIKE / 子串检索。
+"""
+import logging
+import time
+from typing import Optional
+
+from sqlalchemy import Integer, distinct, func, literal, select, union_all
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from . import models
+from common import constants, tokenizer
+
+logger = logging.getLogger("db.search_index")
+
+DOC_WORD = "word"
+DOC_TEMPLATE = "template"
+DOC_DATA = "data"
+
+# maintenance_state 中的完成标记名；未回填时至多每 _RECHECK_SECONDS 秒复查一次
+STATE_NAME = "search_index"
+_RECHECK_SECONDS = 30
+_populated = False
+_checked_at = 0.0
+
+# 不作为“数据”建索引的模板（词汇单独建索引，MGID 申请不参与名称检索）
+_NON_DATA_TEMPLATES = {constants.WORD_TEMPLATE_ID, constants.MGID_APPLY_TEMPLATE_ID}
+
+
+def _object_document(template_id, json_data):
+    """返回 (doc_type, 文本字段列表)，不需要建索引时返回 None。"""
+    if not isinstance(json_data, dict):
+        return None
+    if str(template_id) == constants.WORD_TEMPLATE_ID:
+        return DOC_WORD, [json_data.get("chinese_name"), json_data.get("english_name")]
+    if str(template_id) in _NON_DATA_TEMPLATES:
+        return None
+    return DOC_DATA, [json_data.get("title")]
+
+
+def _replace_postings(db: Session, doc_type: str, doc_id, texts, replace: bool = True):
+    if replace:
+        db.query(models.SearchPosting).filter(
+            models.SearchPosting.doc_type == doc_type,
+            models.SearchPosting.doc_id == doc_id,
+        ).delete(synchronize_session=False)
+    frequencies = tokenizer.term_frequencies(texts)
+    if frequencies:
+        db.bulk_insert_mappings(
+            models.SearchPosting,
+            [
+                {"doc_type": doc_type, "token": token, "doc_id": doc_id, "tf": tf}
+                for token, tf in frequencies.items()
+            ],
+        )
+
+
+def _guarded(db: Session, fn, *args):
+    """在 SAVEPOINT 内维护索引：索引失败只记日志，不影响调用方的写入。"""
+    try:
+        with db.begin_nested():
+            fn(db, *args)
+    except Exception as e:
+        logger.warning(f"[DB] search index update failed: {e!r}")
+
+
+def _index_object(db: Session, object_id, template_id, json_data):
+    document = _object_document(template_id, json_data)
+    if document is not None:
+        _replace_postings(db, document[0], object_id, document[1])
+
+
+def _remove_document(db: Session, doc_id, doc_type: Optional[str]):
+    query_cmd = db.query(models.SearchPosting).filter(models.SearchPosting.doc_id == doc_id)
+    if doc_type:
+        query_cmd = query_cmd.filter(models.SearchPosting.doc_type == doc_type)
+    query_cmd.delete(synchronize_session=False)
+
+
+def index_object(db: Session, object_id, template_id, json_data):
+    """重建单个对象的索引（不提交，由调用方统一 commit）。"""
+    _guarded(db, _index_object, object_id, template_id, json_data)
+
+
+def _index_new_objects(db: Session, objects):
+    mappings = []
+    for obj in objects:
+        document = _object_document(obj.template_id, obj.json_data)
+        if document is None:
+            continue
+        doc_type, texts = document
+        mappings.extend(
+            {"doc_type": doc_type, "token": token, "doc_id": obj.id, "tf": tf}
+            for token, tf in tokenizer.term_frequencies(texts).items()
+        )
+    if mappings:
+        db.bulk_insert_mappings(models.SearchPosting, mappings)
+
+
+def index_new_objects(db: Session, objects):
+    """为一批新建对象建索引：无旧倒排需删除，全部词元一次写入（不提交）。"""
+    _guarded(db, _index_new_objects, objects)
+
+
+def index_template(db: Session, template_id, name: Optional[str]):
+    _guarded(db, _replace_postings, DOC_TEMPLATE, template_id, [name])
+
+
+def remove_document(db: Session, doc_id, doc_type: Optional[str] = None):
+    _guarded(db, _remove_document, doc_id, doc_type)
+
+
+def is_populated(db: Session) -> bool:
+    """倒排索引是否已完成全量回填；结果为 True 后在进程内缓存。"""
+    global _populated, _checked_at
+    if _populated:
+        return True
+    now = time.monotonic()
+    if now - _checked_at < _RECHECK_SECONDS:
+        return False
+    _checked_at = now
+    try:
+        # SAVEPOINT 内查询：标记表尚未创建时不影响调用方事务
+        with db.begin_nested():
+            _populated = db.get(models.MaintenanceState, STATE_NAME) is not None
+    except Exception as e:
+        logger.warning(f"[DB] search index state check failed: {e!r}")
+        return False
+    return _populated
+
+
+def match_subquery(db: Session, doc_type: str, query: str):
+    """命中全部查询词元的文档：子查询列 (doc_id, score)，score 为各词元命中次数之和。
+
+    每个词元单独取倒排列表后 UNION ALL（各自走索引），同一条倒排同时命中两个词元
+    （如单字前缀与以该字开头的 bigram）时按两个词元分别计数。
+    查询不含可用词元时返回 None。
+    """
+    terms = list(dict.fromkeys(tokenizer.tokenize(query, for_query=True)))
+    if not terms:
+        return None
+    posting = models.SearchPosting
+    branches = [
+        select(posting.doc_id, posting.tf, literal(i, Integer).label("term_no")).where(
+            posting.doc_type == doc_type,
+            posting.token.like(f"{t}%") if len(t) == 1 and tokenizer.is_cjk(t) else posting.token == t,
+        )
+        for i, t in enumerate(terms)
+    ]
+    hits = union_all(*branches).subquery("hits")
+    return (
+        db.query(hits.c.doc_id.label("doc_id"), func.sum(hits.c.tf).label("score"))
+        .group_by(hits.c.doc_id)
+        .having(func.count(distinct(hits.c.term_no)) == len(terms))
+        .subquery()
+    )
+
+
+def _batches(db: Session, columns, id_col, batch_size: int):
+    last_id = None
+    while True:
+        query_cmd = db.query(*columns).order_by(id_col)
+        if last_id is not None:
+            query_cmd = query_cmd.filter(id_col > last_id)
+        rows = query_cmd.limit(batch_size).all()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1].id
+
+
+def rebuild(db: Session, batch_size: int = 500) -> dict:
+    """全量重建倒排索引（首次部署或分词规则变化后执行），返回各类型文档数。"""
+    db.query(models.SearchPosting).delete(synchronize_session=False)
+    counts = {DOC_WORD: 0, DOC_TEMPLATE: 0, DOC_DATA: 0}
+    object_columns = (models.Object.id, models.Object.template_id, models.Object.json_data)
+    for rows in _batches(db, object_columns, models.Object.id, batch_size):
+        for row in rows:
+            document = _object_document(row.template_id, row.json_data)
+            if document is None:
+                continue
+            _replace_postings(db, document[0], row.id, document[1], replace=False)
+            counts[document[0]] += 1
+        db.flush()
+    template_columns = (models.Template.id, models.Template.name)
+    for rows in _batches(db, template_columns, models.Template.id, batch_size):
+        for row in rows:
+            _replace_postings(db, DOC_TEMPLATE, row.id, [row.name], replace=False)
+            counts[DOC_TEMPLATE] += 1
+        db.flush()
+    # 完成标记与倒排数据同一事务提交
+    db.execute(
+        insert(models.MaintenanceState)
+        .values(name=STATE_NAME, completed_at=func.now())
+        .on_conflict_do_update(index_elements=["name"], set_={"completed_at": func.now()})
+    )
+    db.commit()
+    logger.info(f"[DB] search index rebuilt: {counts}")
+    return counts
@@ -1,25 +1,130 @@
+"""流水号（用户编号、词汇编号等）分配。
+
+默认从 PostgreSQL 序列 serial_number_<type>_seq 取号：nextval 不加行锁、不需要提交，
+并发创建互不阻塞；事务回滚时号码不回收，因此可能出现空号。
+SERIAL_NUMBER_GAPLESS_TYPES 中列出的类型仍使用 serial_number 表计数：在调用方事务内
+UPDATE ... RETURNING，随调用方提交 / 回滚，号码连续，但并发分配按行锁排队。
+序列在各类型首次使用时创建，并与 serial_number 表的当前值对齐；两种方式切换后需重启所有进程。
+"""
+import logging
+import re
+import threading
+from typing import List
+
+from sqlalchemy import text
 from sqlalchemy.orm import Session
-from sqlalchemy import String
-from . import models
 
+from settings import settings
 
-def get_serial_number(db: Session, type: str):
-    row = (
-        db.query(models.SerialNumber.current_number)
-        .with_for_update()
-        .filter(models.SerialNumber.type == type)
-        .first()
-    )
-    if not row:
-        # 初始化
-        db.add(models.SerialNumber(type=type, current_number=0))
-        db.commit()
-        current = 0
-    else:
-        current = int(row[0])
-    new_value = current + 1
-    db.query(models.SerialNumber).filter(models.SerialNumber.type == type).update(
-        {models.SerialNumber.current_number: new_value}
+logger = logging.getLogger("db.serial_number")
+
+_TYPE_RE = re.compile(r"^[a-z][a-z0-9_]*$")
+# 已完成初始化的 (方式, 类型)：方式为 "sequence" / "gapless"，两种方式各自初始化一次
+_ready = set()
+_ready_lock = threading.Lock()
+
+
+def _sequence_name(type: str) -> str:
+    if not _TYPE_RE.match(type):
+        raise ValueError(f"invalid serial number type: {type!r}")
+    return f"serial_number_{type}_seq"
+
+
+def _is_gapless(type: str) -> bool:
+    return type in {t.strip() for t in settings.SERIAL_NUMBER_GAPLESS_TYPES.split(",")}
+
+
+def _ensure_sequence(db: Session, type: str) -> str:
+    """每个进程每种类型执行一次：建序列，并保证不低于 serial_number 表中已分配的值。"""
+    name = _sequence_name(type)
+    key = ("sequence", type)
+    if key in _ready:
+        return name
+    with _ready_lock:
+        if key in _ready:
+            return name
+        # 独立连接 + advisory lock：不影响调用方事务，多个进程同时初始化时串行
+        with db.get_bind().begin() as conn:
+            conn.execute(text("SELECT pg_advisory_xact_lock(hashtext(:n))"), {"n": name})
+            conn.execute(text(f'CREATE SEQUENCE IF NOT EXISTS "{name}" MINVALUE 1'))
+            conn.execute(
+                text(
+                    f"""
+                    SELECT setval(:n, c.current_number::bigint)
+                    FROM serial_number c, "{name}" s
+                    WHERE c.type = :t
+                      AND c.current_number > CASE WHEN s.is_called THEN s.last_value ELSE 0 END
+                    """
+                ),
+                {"n": name, "t": type},
+            )
+        _ready.add(key)
+        logger.info(f"[DB] serial number sequence ready: {name}")
+    return name
+
+
+def _allocate_sequence(db: Session, type: str, count: int) -> List[int]:
+    name = _ensure_sequence(db, type)
+    rows = db.execute(
+        text("SELECT nextval(:n) FROM generate_series(1, :c)"), {"n": name, "c": count}
     )
-    db.commit()
-    return new_value
+    return sorted(int(row[0]) for row in rows)
+
+
+def _sync_counter(db: Session, type: str):
+    """每个进程每种类型执行一次：序列方式分配过的号码计入表中的当前值，切换为连续编号后不重号。"""
+    key = ("gapless", type)
+    if key in _ready:
+        return
+    with _ready_lock:
+        if key in _ready:
+            return
+        name = _sequence_name(type)
+        # 独立连接提交：调用方事务回滚也不会撤销对齐，标记为已完成后不再重复执行
+        with db.get_bind().begin() as conn:
+            if conn.execute(text("SELECT to_regclass(:n)"), {"n": name}).scalar() is not None:
+                conn.execute(
+                    text(
+                        f"""
+                        INSERT INTO serial_number (type, current_number)
+                        SELECT :t, CASE WHEN s.is_called THEN s.last_value ELSE 0 END FROM "{name}" s
+                        ON CONFLICT (type) DO UPDATE
+                        SET current_number = GREATEST(serial_number.current_number, EXCLUDED.current_number)
+                        """
+                    ),
+                    {"t": type},
+                )
+        _ready.add(key)
+
+
+def _allocate_gapless(db: Session, type: str, count: int) -> List[int]:
+    _sync_counter(db, type)
+    row = db.execute(
+        text(
+            "INSERT INTO serial_number (type, current_number) VALUES (:t, :c) "
+            "ON CONFLICT (type) DO UPDATE "
+            "SET current_number = serial_number.current_number + EXCLUDED.current_number "
+            "RETURNING current_number"
+        ),
+        {"t": type, "c": count},
+    ).first()
+    last = int(row[0])
+    return list(range(last - count + 1, last + 1))
+
+
+def allocate(db: Session, type: str, count: int = 1) -> List[int]:
+    """分配 count 个递增的流水号。
+
+    连续编号类型的计数在调用方事务内更新、由调用方提交（回滚则号码退回）；
+    行锁一直持有到调用方提交，调用方应把 bcrypt 等耗时操作放在分配之前。
+    序列方式无需提交。
+    """
+    if count < 1:
+        return []
+    if _is_gapless(type):
+        return _allocate_gapless(db, type, count)
+    return _allocate_sequence(db, type, count)
+
+
+def get_serial_number(db: Session, type: str):
+    return allocate(db, type)[0]
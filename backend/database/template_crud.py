@@ -1,8 +1,10 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_, JSON, cast, update, String, func
 import json
-from . import models, serialnumber_crud
-from common import utils, constants
+from typing import Optional
+from . import models, pagination, search_index_crud, serialnumber_crud
+from common import cache, suggest_service, utils, constants, tokenizer
+from settings import settings
 import uuid
 import sqlalchemy
 
@@ -22,6 +24,8 @@ def get_create_template(db: Session, template_name: str, json_schema: dict):
     try:
         db_template = models.Template(name=template_name, json_schema=json_schema)
         db.add(db_template)
+        db.flush()
+        search_index_crud.index_template(db, db_template.id, template_name)
         db.commit()
         db.refresh(db_template)
         return db_template
@@ -34,7 +38,10 @@ def update_template(db: Session, template_name: str, id: str, json_schema: dict)
     db.query(models.Template).filter(models.Template.id == id).update(
         {models.Template.name: template_name, models.Template.json_schema: json_schema}
     )
+    search_index_crud.index_template(db, id, template_name)
     db.commit()
+    cache.invalidate_template(id)
+    suggest_service.suggest_index.refresh_template(db, id)
 
 
 def is_template_exist(db: Session, db_template: models.Template, id: str):
@@ -58,17 +65,29 @@ def is_template_exist(db: Session, db_template: models.Template, id: str):
     return is_exist != None
 
 
-def get_templates_list(db: Session, user: str, start: int, size: int):
-    templates_list = (
-        db.query(models.Template.id, models.Template.json_schema)
-        .filter(models.Template.json_schema["author"].astext == user)
-        .order_by(models.Template.json_schema["create_timestamp"].astext.desc())
-        .slice(start, start + size)
-    ).all()
+def _template_row_key(t):
+    return t.json_schema.get("create_timestamp"), t.id
+
+
+def get_templates_list(
+    db: Session, user: str, start: int, size: int, cursor: Optional[str] = None
+):
+    query_cmd = db.query(models.Template.id, models.Template.json_schema).filter(
+        models.Template.json_schema["author"].astext == user
+    )
+    templates_list, next_cursor = pagination.paginate(
+        query_cmd,
+        models.Template.json_schema["create_timestamp"].astext,
+        models.Template.id,
+        start,
+        size,
+        cursor,
+        row_key=_template_row_key,
+    )
     return [
         {"id": t.id, "json_schema": t.json_schema}
         for t in templates_list
-        ]
+        ], next_cursor
 
 
 def get_templates_count(db: Session, user: str):
@@ -86,20 +105,23 @@ def filter_templates_list(
     status_filter: str,
     start: int,
     size: int,
+    cursor: Optional[str] = None,
 ):
-    templates_list = (
-        db.query(models.Template.id, models.Template.json_schema)
-        .filter(
-            and_(
-                models.Template.json_schema["author"].astext == user,
-                models.Template.json_schema["review_status"].astext.like(f"%{status_filter}%"),
-            )
+    query_cmd = db.query(models.Template.id, models.Template.json_schema).filter(
+        and_(
+            models.Template.json_schema["author"].astext == user,
+            models.Template.json_schema["review_status"].astext.like(f"%{status_filter}%"),
         )
-        .order_by(models.Template.json_schema["create_timestamp"].astext.desc())
-        .slice(start, start + size)
-        .all()
     )
-    return templates_list
+    return pagination.paginate(
+        query_cmd,
+        models.Template.json_schema["create_timestamp"].astext,
+        models.Template.id,
+        start,
+        size,
+        cursor,
+        row_key=_template_row_key,
+    )
 
 
 def filter_templates_count(db: Session, user: str, status_filter: str):
@@ -116,11 +138,43 @@ def filter_templates_count(db: Session, user: str, status_filter: str):
     return templates_count
 
 
+def get_templates_page(
+    db: Session,
+    user: str,
+    status_filter: str,
+    start: int,
+    size: int,
+    cursor: Optional[str] = None,
+):
+    """列表与总数一次返回，status_filter 为 "all" 时不按状态过滤。"""
+    query_cmd = db.query(models.Template).filter(
+        models.Template.json_schema["author"].astext == user
+    )
+    if status_filter != "all":
+        query_cmd = query_cmd.filter(
+            models.Template.json_schema["review_status"].astext.like(f"%{status_filter}%")
+        )
+    page = pagination.paginate_with_count(
+        query_cmd,
+        models.Template.json_schema["create_timestamp"].astext,
+        models.Template.id,
+        start,
+        size,
+        cursor,
+        row_key=_template_row_key,
+    )
+    page["data"] = [{"id": t.id, "json_schema": t.json_schema} for t in page["data"]]
+    return page
+
+
 def delete_template(db: Session, id: uuid.UUID):
     db.query(models.Template).filter(
         models.Template.id.notin_(constants.EXCLUDETEMPLATES)
     ).filter(models.Template.id == id).delete()
+    search_index_crud.remove_document(db, id, search_index_crud.DOC_TEMPLATE)
     db.commit()
+    cache.invalidate_template(id)
+    suggest_service.suggest_index.refresh_template(db, id)
 
 
 def change_review_state(db: Session, id: str, review_status: str):
@@ -135,9 +189,11 @@ def change_review_state(db: Session, id: str, review_status: str):
         synchronize_session="fetch",
     )
     db.commit()
+    cache.invalidate_template(id)
+    suggest_service.suggest_index.refresh_template(db, id)
 
 
-def change_citation_count(db: Session, id: str):
+def change_citation_count(db: Session, id: str, increment: int = 1):
     try:
         # 先检查模板是否存在
         template = db.query(models.Template).filter(models.Template.id == id).first()
@@ -157,7 +213,7 @@ def change_citation_count(db: Session, id: str):
                 models.Template.json_schema: func.jsonb_set(
                     models.Template.json_schema,
                     "{citation_count}",
-                    json.dumps(citation_count + 1),
+                    json.dumps(citation_count + increment),
                 )
             },
             synchronize_session="fetch",
@@ -171,7 +227,7 @@ def change_citation_count(db: Session, id: str):
 
 
 def get_template_list_with_begin(db: Session, begin_word: str):
-    db_template_list = (
+    query_cmd = (
         db.query(models.Template.name, models.Template.id)
         .filter(models.Template.id.notin_(constants.UNSEARCHABLE_TEMPLATE_ID_SET))
         .filter(
@@ -179,11 +235,24 @@ def get_template_list_with_begin(db: Session, begin_word: str):
                 f"{constants.REVIEW_STATUS_PASSED_REVIEW}%"
             )
         )
-        .filter(
-            models.Template.json_schema["template_type"].astext != "application",
-            cast(models.Template.name, String).like(f"%{begin_word}%"),
+        .filter(models.Template.json_schema["template_type"].astext != "application")
+    )
+    matched = None
+    # 倒排索引回填完成前仍走 LIKE
+    if (
+        settings.SEARCH_BIGRAM_INDEX
+        and tokenizer.is_cjk(begin_word)
+        and search_index_crud.is_populated(db)
+    ):
+        matched = search_index_crud.match_subquery(db, search_index_crud.DOC_TEMPLATE, begin_word)
+    if matched is not None:
+        # 中文走倒排索引，按命中次数排序
+        query_cmd = query_cmd.join(matched, matched.c.doc_id == models.Template.id).order_by(
+            matched.c.score.desc(), models.Template.id
         )
-    ).all()
+    else:
+        query_cmd = query_cmd.filter(cast(models.Template.name, String).like(f"%{begin_word}%"))
+    db_template_list = query_cmd.all()
     template_list = []
     for i in range(len(db_template_list)):
         db_template = {}
@@ -272,3 +341,5 @@ def deprecate_template(db: Session, id: uuid.UUID):
         synchronize_session="fetch",
     )
     db.commit()
+    cache.invalidate_template(id)
+    suggest_service.suggest_index.refresh_template(db, id)
@@ -1,16 +1,42 @@
-from common import constants
+from common import cache, constants, reference_data
 from sqlalchemy.orm import Session
 from sqlalchemy import or_
+from typing import Iterable, List
+import logging
 from . import models
 
+logger = logging.getLogger("db.user")
+
 
 def add_user(db: Session, db_user: models.User):
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
+    reference_data.reference.refresh_user(db, db_user.user_name)
     return db_user
 
 
+def add_users_batch(db: Session, users: List[models.User]) -> bool:
+    """一个事务内写入全部用户；任一行失败整体回滚并返回 False。"""
+    try:
+        db.add_all(users)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"[DB] bulk add users failed: {e!r}")
+        return False
+    reference_data.reference.invalidate_users()
+    return True
+
+
+def get_existing_user_names(db: Session, names: Iterable[str]) -> set:
+    names = list(set(names))
+    if not names:
+        return set()
+    rows = db.query(models.User.user_name).filter(models.User.user_name.in_(names))
+    return {r.user_name for r in rows}
+
+
 def get_user_list(db: Session, start: int, size: int):
     return db.query(models.User).offset(start).limit(size).all()
 
@@ -22,17 +48,24 @@ def get_user_count(db: Session):
 def get_user_organization(db: Session, name: str):
     if not name:
         return None
-    result = (
-        db.query(models.User.organization)
-        .filter(models.User.user_name == name)
-        .first()
-    )
-    return result[0] if result else None
+    profile = reference_data.reference.user(db, name)
+    return profile.organization if profile else None
 
 
 def delete_user(db: Session, id: str):
     db.query(models.User).filter(models.User.user_number == id).delete()
     db.commit()
+    cache.invalidate_user()
+    reference_data.reference.invalidate_users()
+
+
+def set_user_type(db: Session, name: str, user_type: str):
+    db.query(models.User).filter(models.User.user_name == name).update(
+        {models.User.user_type: user_type}
+    )
+    db.commit()
+    cache.invalidate_user(name)
+    reference_data.reference.refresh_user(db, name)
 
 
 def is_user_admin(db: Session, name: str):
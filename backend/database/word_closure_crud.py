@@ -0,0 +1,167 @@
+"""词汇层级（super_class_id / 旧字段 parent_word_id）的闭包表维护与查询。
+
+word_closure 保存每个词汇与其全部祖先的对应关系，层级与循环检测都是一条按索引查询，
+与树的深度 / 宽度无关；子树 / 祖先链由 common.taxonomy_service 的进程内快照提供。
+写入路径在同一事务内调用 sync_object / remove_word，由调用方统一 commit。
+"""
+import logging
+import uuid
+from typing import Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session, aliased
+
+from . import models
+from common import constants
+
+logger = logging.getLogger("db.word_closure")
+
+_COLUMNS = ["ancestor_id", "descendant_id", "depth"]
+
+
+def _uuid(value) -> Optional[uuid.UUID]:
+    if isinstance(value, uuid.UUID):
+        return value
+    try:
+        return uuid.UUID(str(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def parent_id(json_data) -> Optional[uuid.UUID]:
+    """词汇的父级 id；兼容旧字段 parent_word_id。"""
+    if not isinstance(json_data, dict):
+        return None
+    return _uuid(json_data.get("super_class_id") or json_data.get("parent_word_id") or None)
+
+
+def _guarded(db: Session, fn, *args):
+    """在 SAVEPOINT 内维护闭包表：失败只记日志，不影响调用方的写入。"""
+    try:
+        with db.begin_nested():
+            fn(db, *args)
+    except Exception as e:
+        logger.warning(f"[DB] word closure update failed: {e!r}")
+
+
+def _ensure_node(db: Session, node: uuid.UUID):
+    db.execute(
+        insert(models.WordClosure)
+        .values(ancestor_id=node, descendant_id=node, depth=0)
+        .on_conflict_do_nothing()
+    )
+
+
+def _set_parent(db: Session, node: uuid.UUID, parent: Optional[uuid.UUID]):
+    closure = models.WordClosure
+    subtree = select(closure.descendant_id).where(closure.ancestor_id == node)
+    # 子树（含自身）与原祖先断开，子树内部关系保留
+    db.query(closure).filter(
+        closure.descendant_id.in_(subtree), closure.ancestor_id.notin_(subtree)
+    ).delete(synchronize_session=False)
+    _ensure_node(db, node)
+    if parent is None:
+        return
+    if _is_ancestor(db, node, parent):
+        logger.warning(f"[DB] word closure: {parent} is under {node}, parent link skipped")
+        return
+    _ensure_node(db, parent)
+    above, below = aliased(closure), aliased(closure)
+    db.execute(
+        insert(closure)
+        .from_select(
+            _COLUMNS,
+            select(above.ancestor_id, below.descendant_id, above.depth + below.depth + 1)
+            .where(above.descendant_id == parent)
+            .where(below.ancestor_id == node),
+        )
+        .on_conflict_do_nothing()
+    )
+
+
+def _remove_word(db: Session, node: uuid.UUID):
+    closure = models.WordClosure
+    subtree = select(closure.descendant_id).where(closure.ancestor_id == node)
+    ancestors = select(closure.ancestor_id).where(closure.descendant_id == node)
+    # 删除自身及其与子树的关系；子节点各自成为新的根，与原 json_data 中悬空的父级一致
+    db.query(closure).filter(
+        closure.descendant_id.in_(subtree), closure.ancestor_id.in_(ancestors)
+    ).delete(synchronize_session=False)
+
+
+def sync_object(db: Session, object_id, template_id, json_data):
+    """对象为词汇时按其父级更新闭包表（不提交）。"""
+    if str(template_id) != constants.WORD_TEMPLATE_ID:
+        return
+    node = _uuid(object_id)
+    if node is not None:
+        _guarded(db, _set_parent, node, parent_id(json_data))
+
+
+def remove_word(db: Session, object_id):
+    node = _uuid(object_id)
+    if node is not None:
+        _guarded(db, _remove_word, node)
+
+
+# ---- 查询 ----
+
+
+def _is_ancestor(db: Session, ancestor: uuid.UUID, node: uuid.UUID) -> bool:
+    closure = models.WordClosure
+    return db.query(
+        db.query(closure)
+        .filter(closure.ancestor_id == ancestor, closure.descendant_id == node)
+        .exists()
+    ).scalar()
+
+
+def is_ancestor(db: Session, ancestor_id, node_id) -> bool:
+    """ancestor_id 是否为 node_id 自身或其祖先。"""
+    ancestor, node = _uuid(ancestor_id), _uuid(node_id)
+    if ancestor is None or node is None:
+        return False
+    return _is_ancestor(db, ancestor, node)
+
+
+def level(db: Session, word_id) -> int:
+    """词汇所在层级（根为 1）；不在闭包表中返回 0。"""
+    node = _uuid(word_id)
+    if node is None:
+        return 0
+    closure = models.WordClosure
+    return (
+        db.query(func.count()).select_from(closure).filter(closure.descendant_id == node).scalar()
+    )
+
+
+def rebuild(db: Session, batch_size: int = 1000) -> int:
+    """由词汇 json_data 全量重建闭包表（首次部署或数据经 SQL 直接修改后执行），返回行数。"""
+    rows = db.query(
+        models.Object.id,
+        models.Object.json_data["super_class_id"].astext,
+        models.Object.json_data["parent_word_id"].astext,
+    ).filter(models.Object.template_id == constants.WORD_TEMPLATE_ID)
+    parents = {row[0]: _uuid(row[1] or row[2] or None) for row in rows}
+    db.query(models.WordClosure).delete(synchronize_session=False)
+    mappings = []
+    total = 0
+    for node in parents:
+        current, depth, seen = node, 0, set()
+        # 沿父链向上；父级缺失或出现循环时停止
+        while current is not None and current not in seen:
+            seen.add(current)
+            mappings.append({"ancestor_id": current, "descendant_id": node, "depth": depth})
+            parent = parents[current]
+            current = parent if parent in parents else None
+            depth += 1
+        if len(mappings) >= batch_size:
+            db.bulk_insert_mappings(models.WordClosure, mappings)
+            total += len(mappings)
+            mappings = []
+    db.bulk_insert_mappings(models.WordClosure, mappings)
+    total += len(mappings)
+    db.commit()
+    logger.info(f"[DB] word closure rebuilt: words={len(parents)} rows={total}")
+    return total
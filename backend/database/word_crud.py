@@ -1,7 +1,8 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_, JSON, cast, String, func, text
-from . import models
-from common import constants
+from . import models, pagination, search_index_crud, word_closure_crud, MGID_registry_crud
+from common import cache, constants, error, suggest_service, taxonomy_service, tokenizer
+from settings import settings
 import uuid, json
 from typing import List, Dict, Any, Optional
 import sqlalchemy
@@ -20,35 +21,80 @@ def get_objects(db: Session, skip: int = 0, limit: int = 100):
     return db.query(models.Object).offset(skip).limit(limit).all()
 
 
+def get_objects_by_ids(db: Session, object_ids) -> Dict[uuid.UUID, Any]:
+    """按 id 批量取对象 (id, template_id, json_data)，一次 IN 查询；返回 {id: 行}"""
+    object_ids = list(object_ids)
+    if not object_ids:
+        return {}
+    rows = (
+        db.query(models.Object.id, models.Object.template_id, models.Object.json_data)
+        .filter(models.Object.id.in_(object_ids))
+        .all()
+    )
+    return {row.id: row for row in rows}
+
+
 def create_object(db: Session, db_object: models.Object):
-    db.add(db_object)
-    db.commit()
+    """MGID 与已有对象重复时回滚并抛出 error.DuplicateMGIDError。"""
+    try:
+        db.add(db_object)
+        db.flush()
+        search_index_crud.index_object(db, db_object.id, db_object.template_id, db_object.json_data)
+        word_closure_crud.sync_object(db, db_object.id, db_object.template_id, db_object.json_data)
+        MGID_registry_crud.register(db, [db_object])
+        db.commit()
+    except sqlalchemy.exc.IntegrityError as e:
+        db.rollback()
+        if MGID_registry_crud.is_MGID_conflict(e):
+            raise error.DuplicateMGIDError(db_object.json_data.get("MGID"))
+        raise
     db.refresh(db_object)
+    if str(db_object.template_id) == constants.WORD_TEMPLATE_ID:
+        taxonomy_service.taxonomy.refresh_word(db, db_object.id)
     return db_object
 
 
 def update_object(db: Session, json_data: JSON, object_id: str):
-    db.query(models.Object).filter(models.Object.id == object_id).update(
-        {models.Object.json_data: json_data}
-    )
-    db.commit()
+    """MGID 与其它对象重复时回滚并抛出 error.DuplicateMGIDError。"""
+    try:
+        db.query(models.Object).filter(models.Object.id == object_id).update(
+            {models.Object.json_data: json_data}
+        )
+        template_id = (
+            db.query(models.Object.template_id).filter(models.Object.id == object_id).scalar()
+        )
+        search_index_crud.index_object(db, object_id, template_id, json_data)
+        word_closure_crud.sync_object(db, object_id, template_id, json_data)
+        MGID_registry_crud.sync_object(db, object_id, template_id, json_data)
+        db.commit()
+    except sqlalchemy.exc.IntegrityError as e:
+        db.rollback()
+        if MGID_registry_crud.is_MGID_conflict(e):
+            raise error.DuplicateMGIDError(json_data.get("MGID"))
+        raise
+    cache.invalidate_object(object_id)
+    suggest_service.suggest_index.refresh_word(db, object_id)
+    taxonomy_service.taxonomy.refresh_word(db, object_id)
 
 
 def get_my_words_list(
-    db: Session, user: str, word_template_id: str, start: int, size: int
+    db: Session,
+    user: str,
+    word_template_id: str,
+    start: int,
+    size: int,
+    cursor: Optional[str] = None,
 ):
     if not user:
-        return []
-    words_list = (
+        return [], None
+    query_cmd = (
         db.query(models.Object)
         .filter(models.Object.template_id == constants.WORD_TEMPLATE_ID)
-        .filter(models.Object.json_data["author"].astext == user)
-        .order_by(models.Object.json_data["create_timestamp"].astext.desc())
-        .offset(start)
-        .limit(size)
-        .all()
+        .filter(models.Object.author == user)
+    )
+    return pagination.paginate(
+        query_cmd, models.Object.create_timestamp, models.Object.id, start, size, cursor
     )
-    return words_list
 
 
 def get_words_count(db: Session, user: str, word_template_id: str):
@@ -58,7 +104,7 @@ def get_words_count(db: Session, user: str, word_template_id: str):
     words_count = (
         db.query(func.count(models.Object.id))
         .filter(models.Object.template_id == constants.WORD_TEMPLATE_ID)
-        .filter(models.Object.json_data["author"].astext == user)
+        .filter(models.Object.author == user)
         .scalar()
     )
     return words_count
@@ -71,20 +117,19 @@ def filter_words_list(
     status_filter: str,
     start: int,
     size: int,
+    cursor: Optional[str] = None,
 ):
     if not user:
-        return []
-    words_filter_list = (
+        return [], None
+    query_cmd = (
         db.query(models.Object)
         .filter(models.Object.template_id == constants.WORD_TEMPLATE_ID)
-        .filter(models.Object.json_data["author"].astext == user)
-        .filter(models.Object.json_data["review_status"].astext.like(f"{status_filter}%"))
-        .order_by(models.Object.json_data["create_timestamp"].astext.desc())
-        .offset(start)
-        .limit(size)
-        .all()
+        .filter(models.Object.author == user)
+        .filter(models.Object.review_status.like(f"{status_filter}%"))
+    )
+    return pagination.paginate(
+        query_cmd, models.Object.create_timestamp, models.Object.id, start, size, cursor
     )
-    return words_filter_list
 
 
 def filter_words_count(
@@ -95,13 +140,36 @@ def filter_words_count(
     words_filter_count = (
         db.query(func.count(models.Object.id))
         .filter(models.Object.template_id == constants.WORD_TEMPLATE_ID)
-        .filter(models.Object.json_data["author"].astext == user)
-        .filter(models.Object.json_data["review_status"].astext.like(f"{status_filter}%"))
+        .filter(models.Object.author == user)
+        .filter(models.Object.review_status.like(f"{status_filter}%"))
         .scalar()
     )
     return words_filter_count
 
 
+def get_my_words_page(
+    db: Session,
+    user: str,
+    status_filter: str,
+    start: int,
+    size: int,
+    cursor: Optional[str] = None,
+):
+    """列表与总数一次返回，status_filter 为 "all" 时不按状态过滤。"""
+    if not user:
+        return {"data": [], "count": 0, "count_exact": True, "next_cursor": None}
+    query_cmd = (
+        db.query(models.Object)
+        .filter(models.Object.template_id == constants.WORD_TEMPLATE_ID)
+        .filter(models.Object.author == user)
+    )
+    if status_filter != "all":
+        query_cmd = query_cmd.filter(models.Object.review_status.like(f"{status_filter}%"))
+    return pagination.paginate_with_count(
+        query_cmd, models.Object.create_timestamp, models.Object.id, start, size, cursor
+    )
+
+
 def is_word_exist(db: Session, db_object: models.Object, word_id: str = ""):
     # 安全获取名称字段，缺失则不判定为重复
     chinese_name = db_object.json_data.get("chinese_name")
@@ -133,17 +201,33 @@ def is_word_exist(db: Session, db_object: models.Object, word_id: str = ""):
 
 
 def get_word_list_with_begin(db: Session, begin_word: str):
-    db_word_list = (
+    query_cmd = (
         db.query(
             models.Object.json_data["chinese_name"].astext,
             models.Object.json_data["data_type"].astext,
             models.Object.id,
         )
         .filter(models.Object.template_id == constants.WORD_TEMPLATE_ID)
-        .filter(models.Object.json_data["review_status"].astext.like(f"{constants.REVIEW_STATUS_PASSED_REVIEW}%"))
-        .filter(models.Object.json_data["chinese_name"].astext.ilike(f"%{begin_word}%"))
-        .all()
+        .filter(models.Object.review_status.like(f"{constants.REVIEW_STATUS_PASSED_REVIEW}%"))
     )
+    matched = None
+    # 倒排索引回填完成前仍走 ILIKE
+    if (
+        settings.SEARCH_BIGRAM_INDEX
+        and tokenizer.is_cjk(begin_word)
+        and search_index_crud.is_populated(db)
+    ):
+        matched = search_index_crud.match_subquery(db, search_index_crud.DOC_WORD, begin_word)
+    if matched is not None:
+        # 中文走倒排索引，按命中次数排序
+        query_cmd = query_cmd.join(matched, matched.c.doc_id == models.Object.id).order_by(
+            matched.c.score.desc(), models.Object.id
+        )
+    else:
+        query_cmd = query_cmd.filter(
+            models.Object.json_data["chinese_name"].astext.ilike(f"%{begin_word}%")
+        )
+    db_word_list = query_cmd.all()
     word_list = []
     for i in range(len(db_word_list)):
         db_word = {}
@@ -178,7 +262,13 @@ def get_word_options(db: Session, word_id: str):
 
 def delete_word(db: Session, id: uuid.UUID):
     db.query(models.Object).filter(models.Object.id == id).delete()
+    search_index_crud.remove_document(db, id, search_index_crud.DOC_WORD)
+    word_closure_crud.remove_word(db, id)
+    MGID_registry_crud.unregister(db, id)
     db.commit()
+    cache.invalidate_object(id)
+    suggest_service.suggest_index.refresh_word(db, id)
+    taxonomy_service.taxonomy.refresh_word(db, id)
 
 
 def change_review_state(db: Session, id: uuid.UUID, review_status: str):
@@ -189,6 +279,10 @@ def change_review_state(db: Session, id: uuid.UUID, review_status: str):
     )
     db.execute(sql_cmd)
     db.commit()
+    # 提交后再失效缓存 / 更新内存索引：避免并发读者在提交前把旧值重新写回缓存
+    cache.invalidate_object(id)
+    suggest_service.suggest_index.refresh_word(db, id)
+    taxonomy_service.taxonomy.refresh_word(db, id)
 
 
 def get_objects_serial_number_with_id(db: Session, object_id: str):
@@ -209,138 +303,6 @@ def get_objects_author_with_id(db: Session, object_id: str):
     )
 
 
-def get_children(db: Session, parent_id: str):
-    """返回直接子节点 objects 列表"""
-    # 兼容：super_class_id 新字段，老数据可能还在 parent_word_id
-    return (
-        db.query(models.Object)
-        .filter(models.Object.template_id == constants.WORD_TEMPLATE_ID)
-        .filter(
-            or_(
-                models.Object.json_data["super_class_id"].astext == parent_id,
-                models.Object.json_data["parent_word_id"].astext == parent_id,
-            )
-        )
-        .all()
-    )
-
-
-def build_subtree(db: Session, root_id: str, max_depth: int = 5) -> Dict[str, Any]:
-    """递归构建 root_id 下的子树 (包含 root) 深度不超过 max_depth"""
-    root_obj = get_object(db, root_id)
-    if root_obj is None:
-        return {}
-
-    def _serialize(obj):
-        return {"id": str(obj.id), **obj.json_data}
-
-    def _dfs(node_obj, depth):
-        data = _serialize(node_obj)
-        if depth >= max_depth:
-            data["children"] = []
-            return data
-        childs = get_children(db, str(node_obj.id))
-        data["children"] = [_dfs(c, depth + 1) for c in childs]
-        return data
-
-    return _dfs(root_obj, 1)
-
-
-def build_subtree_flat(db: Session, root_id: str, max_depth: int = 5):
-    """返回扁平列表，每个元素包含 id, hierarchy_level, super_class_id (若有)"""
-    root_obj = get_object(db, root_id)
-    if root_obj is None:
-        return []
-
-    result = []
-
-    def _serialize(obj):
-        data = {"id": str(obj.id)}
-        data.update(obj.json_data)
-        return data
-
-    def _dfs(obj, depth):
-        if depth > max_depth:
-            return
-        data = _serialize(obj)
-        # 如果没存 hierarchy_level 则补齐（根可能没有）
-        if "hierarchy_level" not in data:
-            data["hierarchy_level"] = depth
-        result.append(data)
-        if depth == max_depth:
-            return
-        for c in get_children(db, str(obj.id)):
-            _dfs(c, depth + 1)
-
-    _dfs(root_obj, 1)
-    return result
-
-
-def get_root_objects(db: Session):
-    """获取无父级的 object 类型词汇"""
-    return (
-        db.query(models.Object)
-        .filter(models.Object.template_id == constants.WORD_TEMPLATE_ID)
-        .filter(models.Object.json_data["data_type"].astext == "object")
-        .filter(
-            or_(
-                models.Object.json_data["super_class_id"].is_(None),
-                models.Object.json_data["super_class_id"].astext == "",
-                models.Object.json_data["parent_word_id"].is_(None),
-            )
-        )
-        .all()
-    )
-
-
-def get_path_to_root(db: Session, word_id: str, max_depth: int = 5):
-    """返回从当前节点到根节点的链（当前在前，根在后）"""
-    path = []
-    current = get_object(db, word_id)
-    depth = 0
-    while current and depth < max_depth:
-        item = {"id": str(current.id)}
-        item.update(current.json_data)
-        path.append(item)
-        parent_id = current.json_data.get("super_class_id") or current.json_data.get("parent_word_id")
-        if not parent_id:
-            break
-        current = get_object(db, parent_id)
-        depth += 1
-    return path
-
-
-# === (B) CTE based subtree flat retrieval ===
-def build_subtree_cte_flat(db: Session, root_id: str, max_depth: int = 5):
-    """使用递归 CTE 一次性取回子树扁平数据 (id, json_data, depth)."""
-    sql = text(
-        """
-        WITH RECURSIVE tree AS (
-            SELECT id, json_data, 1 AS depth
-            FROM objects
-            WHERE id = :root_id
-            UNION ALL
-            SELECT o.id, o.json_data, tree.depth + 1
-            FROM objects o
-            JOIN tree ON (o.json_data ->> 'super_class_id') = tree.id::text
-            WHERE tree.depth < :max_depth
-        )
-        SELECT id, json_data, depth FROM tree;
-        """
-    )
-    rows = db.execute(sql, {"root_id": root_id, "max_depth": max_depth}).fetchall()
-    result = []
-    for r in rows:
-        jd = dict(r.json_data)
-        if "hierarchy_level" not in jd:
-            jd["hierarchy_level"] = r.depth
-        jd["id"] = str(r.id)
-        result.append(jd)
-    # 按层级排序
-    result.sort(key=lambda x: x.get("hierarchy_level", 9999))
-    return result
-
-
 # === (C) generic search ===
 def search_words(
     db: Session,
@@ -349,12 +311,13 @@ def search_words(
     name_contains: Optional[str],
     start: int,
     size: int,
+    cursor: Optional[str] = None,
 ):
     q = db.query(models.Object).filter(models.Object.template_id == constants.WORD_TEMPLATE_ID)
     if author:
-        q = q.filter(models.Object.json_data["author"].astext == author)
+        q = q.filter(models.Object.author == author)
     if review_status_prefix:
-        q = q.filter(models.Object.json_data["review_status"].astext.like(f"{review_status_prefix}%"))
+        q = q.filter(models.Object.review_status.like(f"{review_status_prefix}%"))
     if name_contains:
         pattern = f"%{name_contains}%"
         q = q.filter(
@@ -364,10 +327,7 @@ def search_words(
             )
         )
     total = q.count()
-    items = (
-        q.order_by(models.Object.json_data["create_timestamp"].astext.desc())
-        .offset(start)
-        .limit(size)
-        .all()
+    items, next_cursor = pagination.paginate(
+        q, models.Object.create_timestamp, models.Object.id, start, size, cursor
     )
-    return total, items
+    return total, items, next_cursor
@@ -0,0 +1,5 @@
+#!/bin/sh
+# 在启动 API 进程前执行一次迁移（DB_AUTO_MIGRATE=1 时）；迁移失败则不启动服务
+set -e
+python migrate_db.py auto
+exec "$@"
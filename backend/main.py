@@ -3,8 +3,11 @@ from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
 from settings import settings
 from database.base import engine
+from database import migrate
+from database.base import SessionLocal
+from common import reference_data, suggest_service, taxonomy_service
 from sqlalchemy import text
-import logging, re
+import logging, re, threading
 from api import (
     word,
     template,
@@ -18,7 +21,7 @@ from api import (
 )
 import uvicorn
 
-# 配置全局日志，确保能打印到文件
+# 配置全局日志（控制台）
 logger = logging.getLogger("mgsdb")
 logger.setLevel(logging.INFO)
 
@@ -30,17 +33,8 @@ if not logger.handlers:
     console_formatter = logging.Formatter("[%(asctime)s] %(levelname)s %(name)s: %(message)s")
     console_handler.setFormatter(console_formatter)
     logger.addHandler(console_handler)
-    
-    # 创建文件处理器，确保日志可以打印
-    try:
-        file_handler = logging.FileHandler('backend.log', encoding='utf-8')
-        file_handler.setLevel(logging.INFO)
-        file_formatter = logging.Formatter("[%(asctime)s] %(levelname)s %(name)s: %(message)s")
-        file_handler.setFormatter(file_formatter)
-        logger.addHandler(file_handler)
-        print("全局日志文件处理器初始化成功")
-    except Exception as e:
-        print(f"无法创建全局日志文件: {e}，将仅使用控制台输出")
+
+# 文件日志由根记录器写入 LOG_DIR/backend.log（见 settings.configure_logging），mgsdb.* 经传播一并写入
 
 # 获取启动日志记录器
 logger = logging.getLogger("mgsdb.startup")
@@ -93,10 +87,50 @@ def _attempt_simple_connection():
 
 
 
+def _start_background_warmup():
+    # 预热输入联想索引 / 词汇层级快照，避免首个请求同步加载
+    def _run():
+        db = SessionLocal()
+        try:
+            suggest_service.suggest_index.ensure_fresh(db)
+            taxonomy_service.taxonomy.ensure_fresh(db)
+        except Exception as e:
+            logger.warning(f"[DB] in-memory index warm-up failed (non-fatal): {e!r}")
+        finally:
+            db.close()
+
+    threading.Thread(target=_run, name="db-warmup", daemon=True).start()
+
+
+def _check_schema():
+    """只读检查生成列 / 新表是否就绪；服务进程不执行 DDL，缺失时提示先运行 migrate_db.py。"""
+    try:
+        missing = migrate.check_schema()
+    except Exception as e:
+        logger.warning(f"[DB] schema check failed (non-fatal): {e!r}")
+        return
+    if missing:
+        logger.error(
+            f"[DB] schema is out of date, missing={missing}; "
+            "run `python migrate_db.py all` before starting the API workers"
+        )
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # 先做一次简单连接测试
-    _attempt_simple_connection()
+    connected = _attempt_simple_connection()
+    if connected:
+        _check_schema()
+        # 国家 / 机构 / 用户资料很小，启动时同步加载，MGID 生成与注册校验不再查库
+        db = SessionLocal()
+        try:
+            reference_data.reference.ensure_fresh(db)
+        except Exception as e:
+            logger.warning(f"[DB] reference data warm-up failed (non-fatal): {e!r}")
+        finally:
+            db.close()
+        _start_background_warmup()
     yield
     # TODO: 清理资源 (连接池 / 临时文件 等)
 app = FastAPI(title=settings.APP_NAME, lifespan=lifespan)
@@ -133,6 +167,10 @@ def health_db():
     try:
         with engine.connect() as conn:
             conn.execute(text("SELECT 1"))
+        missing = migrate.check_schema()
+        if missing:
+            # 结构未迁移：先执行 python migrate_db.py all
+            return {"status": "schema_outdated", "missing": missing}
         return {"status": "ok"}
     except UnicodeDecodeError as ue:
         return {"status": "unicode_error", "detail": str(ue)}
@@ -0,0 +1,100 @@
+"""Database maintenance command (generated columns, tables, indexes).
+
+Usage (example):
+  APP_ENV=prod python migrate_db.py all
+  APP_ENV=prod python migrate_db.py auto
+  APP_ENV=prod python migrate_db.py columns
+  APP_ENV=prod python migrate_db.py indexes
+  APP_ENV=prod python migrate_db.py search-index
+  APP_ENV=prod python migrate_db.py word-closure
+  APP_ENV=prod python migrate_db.py mgid-registry
+  APP_ENV=prod python migrate_db.py explain <user_name> [MGID] [--analyze]
+
+Run it once per deploy, before starting (or restarting) the API workers; the
+workers never change the schema themselves and only log the missing pieces.
+
+`all` runs `columns` (plus backfilling newly created tables) then `indexes`,
+serialized across hosts by an advisory lock.
+`auto` runs `all` when DB_AUTO_MIGRATE=1 and does nothing otherwise (for
+container entrypoints, see docker-entrypoint.sh).
+`columns` adds the generated columns of `objects` (rewrites the table once,
+run it in a maintenance window on large tables) and creates the tables owned
+by the backend (e.g. `search_postings`, `word_closure`, `mgid_registry`) when missing.
+`indexes` creates every index declared in database/models.py with
+CREATE INDEX CONCURRENTLY IF NOT EXISTS (safe on a live database).
+`search-index` rebuilds the CJK bigram inverted index (`search_postings`)
+from all words, templates and data.
+`word-closure` rebuilds the word hierarchy closure table (`word_closure`)
+from the `super_class_id` / `parent_word_id` of every word.
+`mgid-registry` rebuilds the MGID registry (`mgid_registry`) from `objects.mgid`.
+`explain` prints the plans of the list-endpoint query shapes so index usage
+can be checked on a production-sized table.
+Return codes:
+  0 success
+  1 invalid args
+  3 some steps failed
+"""
+import sys
+from database import migrate
+from settings import settings
+
+
+def main(argv: list) -> int:
+    if not argv or argv[0] not in {"all", "auto", "columns", "indexes", "search-index", "word-closure", "mgid-registry", "explain"}:
+        print(__doc__)
+        return 1
+    if argv[0] == "auto" and not settings.DB_AUTO_MIGRATE:
+        print("[SKIP] DB_AUTO_MIGRATE=0")
+        return 0
+    if argv[0] in {"all", "auto"}:
+        result = migrate.run_all()
+        print(f"[OK] generated columns added={result['columns']}")
+        print(f"[OK] tables created={result['tables']} backfilled={result['backfilled']}")
+        for name in result["indexes"]:
+            print(f"[OK] {name}")
+        for name in result["failed"]:
+            print(f"[ERR] {name}")
+        return 3 if result["failed"] else 0
+    if argv[0] == "columns":
+        added = migrate.ensure_generated_columns()
+        print(f"[OK] generated columns added={added}")
+        created = migrate.ensure_tables()
+        print(f"[OK] tables created={created}")
+        backfilled = migrate.backfill_tables(created)
+        print(f"[OK] backfilled={backfilled}")
+        return 0
+    if argv[0] == "indexes":
+        result = migrate.ensure_indexes()
+        for name in result["indexes"]:
+            print(f"[OK] {name}")
+        for name in result["failed"]:
+            print(f"[ERR] {name}")
+        return 3 if result["failed"] else 0
+    if argv[0] == "search-index":
+        counts = migrate.rebuild_search_index()
+        print(f"[OK] search index rebuilt {counts}")
+        return 0
+    if argv[0] == "word-closure":
+        rows = migrate.rebuild_word_closure()
+        print(f"[OK] word closure rebuilt rows={rows}")
+        return 0
+    if argv[0] == "mgid-registry":
+        rows = migrate.rebuild_MGID_registry()
+        print(f"[OK] MGID registry rebuilt rows={rows}")
+        return 0
+    args = [a for a in argv[1:] if not a.startswith("--")]
+    if not args:
+        print("Usage: python migrate_db.py explain <user_name> [MGID] [--analyze]")
+        return 1
+    plans = migrate.explain_samples(
+        user=args[0],
+        mgid=args[1] if len(args) > 1 else "",
+        analyze="--analyze" in argv,
+    )
+    for name, plan in plans.items():
+        print(f"== {name}\n{plan}\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
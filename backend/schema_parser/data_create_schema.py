@@ -1,14 +1,70 @@
 import json
+import uuid
 from database import word_crud, template_crud
 from common import constants, utils
 from sqlalchemy.orm import Session
 
 
+# 表单中的词汇以 "名称:类型:id" 字符串引用。先收集整棵表单树引用的词汇 id，
+# 一次 IN 查询取回（words: {id: 行}），再在内存中生成 schema / word_order / data_type_map
+
+
+def _as_uuid(value):
+    try:
+        return uuid.UUID(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _word_id(name_type_id):
+    """"名称:类型:id" 中的 id，格式不对返回 None"""
+    if not isinstance(name_type_id, str) or ":" not in name_type_id:
+        return None
+    return _as_uuid(name_type_id.split(":")[-1])
+
+
+def collect_word_ids(form_data, out: set) -> set:
+    if isinstance(form_data, dict):
+        for key, value in form_data.items():
+            if key.startswith("single_level") and isinstance(value, str):
+                word_id = _word_id(value)
+                if word_id is not None:
+                    out.add(word_id)
+            else:
+                collect_word_ids(value, out)
+    elif isinstance(form_data, list):
+        for item in form_data:
+            collect_word_ids(item, out)
+    return out
+
+
+def _word_json(words: dict, id: str):
+    # 与 word_crud.get_word_unit / get_word_options 一致：只取词汇模板下的对象
+    row = words.get(_as_uuid(id))
+    if row is None or str(row.template_id) != constants.WORD_TEMPLATE_ID:
+        return None
+    return row.json_data if isinstance(row.json_data, dict) else {}
+
+
+def _word_unit(words: dict, id: str):
+    data = _word_json(words, id)
+    unit = data.get("unit") if data is not None else None
+    # 对应 json_data ->> 'unit'
+    if unit is None or isinstance(unit, str):
+        return unit
+    return json.dumps(unit, ensure_ascii=False)
+
+
+def _word_options(words: dict, id: str):
+    data = _word_json(words, id)
+    return [] if data is None else data.get("options")
+
+
 def generate_data_create_single_word_schema(
     name: str,
     data_type: str,
     id: str,
-    db: Session,
+    words: dict,
     word_order_out: list,
     word_name_data_type_map_out: dict,
 ):
@@ -20,7 +76,7 @@ def generate_data_create_single_word_schema(
     }
     if data_type == "number_range":
         single_word_schema["type"] = "object"
-        range_unit = word_crud.get_word_unit(word_id=id, db=db)
+        range_unit = _word_unit(words, id)
         range_start_schema = {"title": " "}
         range_start_schema["type"] = "number"
         range_start_schema["description"] = "~"
@@ -37,7 +93,7 @@ def generate_data_create_single_word_schema(
     elif data_type == "string" or data_type == "MGID":
         single_word_schema["type"] = "string"
     elif data_type == "number":
-        unit = word_crud.get_word_unit(word_id=id, db=db)
+        unit = _word_unit(words, id)
         single_word_schema["type"] = "number"
         single_word_schema["description"] = unit
         word_name_data_type_map_out[name]["unit"] = unit
@@ -48,7 +104,7 @@ def generate_data_create_single_word_schema(
         single_word_schema["type"] = "string"
         single_word_schema["format"] = "date"
     else:
-        db_options = json.loads(word_crud.get_word_options(word_id=id, db=db))
+        db_options = _word_options(words, id)
         single_word_schema["type"] = "array"
         single_word_schema["uniqueItems"] = True
         single_word_schema["items"] = {"type": "string", "enum": db_options}
@@ -59,7 +115,7 @@ def generate_data_create_single_word_schema(
 def generate_data_create_array_schema(
     array_data: str,
     level: int,
-    db: Session,
+    words: dict,
     word_order_out: list,
     invalid_word_out: list,
     word_name_data_type_map_out: dict,
@@ -78,7 +134,7 @@ def generate_data_create_array_schema(
     array_schema["items"], required = generate_data_create_schema_rec(
         array_data["array_items_level" + str(level)],
         level + 1,
-        db,
+        words,
         next_level_word_order,
         invalid_word_out,
         word_name_data_type_map_out,
@@ -96,7 +152,7 @@ def generate_data_create_array_schema(
 def generate_data_create_list_schema(
     list_data: str,
     level: int,
-    db: Session,
+    words: dict,
     word_order_out: list,
     invalid_word_out: list,
     word_name_data_type_map_out: dict,
@@ -107,7 +163,7 @@ def generate_data_create_list_schema(
     list_schema["items"], required = generate_data_create_schema_rec(
         list_data["list_items_level" + str(level)],
         level + 1,
-        db,
+        words,
         next_level_word_order,
         invalid_word_out,
         word_name_data_type_map_out,
@@ -125,7 +181,7 @@ def generate_data_create_list_schema(
 def generate_data_create_object_schema(
     object_data: str,
     level: int,
-    db: Session,
+    words: dict,
     word_order_out: list,
     invalid_word_out: list,
     word_name_data_type_map_out: dict,
@@ -141,7 +197,7 @@ def generate_data_create_object_schema(
         (object_schema_next, required) = generate_data_create_schema_rec(
             obj,
             level + 1,
-            db,
+            words,
             next_level_word_order,
             invalid_word_out,
             word_name_data_type_map_out,
@@ -162,7 +218,7 @@ def generate_data_create_object_schema(
 def generate_data_create_schema_rec(
     form_data: dict,
     level: int,
-    db: Session,
+    words: dict,
     word_order_out: list,
     invalid_word_out: list,
     word_name_data_type_map_out: dict,
@@ -171,7 +227,7 @@ def generate_data_create_schema_rec(
     required = False
     if level == constants.TEMPLATE_RECURSIVE_LAYER or form_data[type_level] == "single":
         single_level = "single_level" + str(level)
-        if not utils.validate_name_type_id_string(form_data[single_level], db):
+        if _word_id(form_data[single_level]) not in words:
             invalid_word_out.append(form_data[single_level])
             return {"title": form_data[single_level]}, required
         name_data_tpye_dict = utils.split_name_type_id_string(form_data[single_level])
@@ -180,7 +236,7 @@ def generate_data_create_schema_rec(
             name_data_tpye_dict["name"],
             name_data_tpye_dict["type"],
             name_data_tpye_dict["id"],
-            db,
+            words,
             word_order_out,
             word_name_data_type_map_out,
         )
@@ -194,7 +250,7 @@ def generate_data_create_schema_rec(
         template_schema = generate_data_create_array_schema(
             form_data,
             level,
-            db,
+            words,
             word_order_out,
             invalid_word_out,
             word_name_data_type_map_out,
@@ -209,7 +265,7 @@ def generate_data_create_schema_rec(
         template_schema = generate_data_create_list_schema(
             form_data,
             level,
-            db,
+            words,
             word_order_out,
             invalid_word_out,
             word_name_data_type_map_out,
@@ -224,7 +280,7 @@ def generate_data_create_schema_rec(
         template_schema = generate_data_create_object_schema(
             form_data,
             level,
-            db,
+            words,
             word_order_out,
             invalid_word_out,
             word_name_data_type_map_out,
@@ -257,9 +313,10 @@ def generate_data_create_schema(form_data: dict, template_type: str, db: Session
             "invalid_word": invalid_word,
             "data_type_map": word_name_data_type_map,
         }
+    words = word_crud.get_objects_by_ids(db, collect_word_ids(form_data["level0"], set()))
     for i, obj in enumerate(form_data["level0"]):
         template_schema_next, required_next = generate_data_create_schema_rec(
-            obj, 0, db, word_order, invalid_word, word_name_data_type_map
+            obj, 0, words, word_order, invalid_word, word_name_data_type_map
         )
         template_schema["properties"][
             template_schema_next["title"]
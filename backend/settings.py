@@ -14,6 +14,14 @@ class Settings(BaseSettings):
     SECRET_KEY: str = os.getenv("SECRET_KEY", "change_me_in_env")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", str(60 * 24)))
     REFRESH_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("REFRESH_TOKEN_EXPIRE_MINUTES", str(60 * 24 * 14)))
+    # 密码哈希（bcrypt，进程内）线程数、最多排队任务数（超出返回 503）与 cost
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", "4"))
+    PASSWORD_HASH_MAX_PENDING: int = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
+    PASSWORD_HASH_ROUNDS: int = int(os.getenv("PASSWORD_HASH_ROUNDS", "12"))
+    # 认证用户缓存时间（秒）；角色变更 / 删除用户时即时失效
+    AUTH_USER_CACHE_TTL: int = int(os.getenv("AUTH_USER_CACHE_TTL", "60"))
+    # 访问令牌中的角色 / 机构 / 国家声明在签发后多少秒内可直接信任（不查库）；0 表示不使用声明
+    AUTH_TOKEN_CLAIMS_MAX_AGE: int = int(os.getenv("AUTH_TOKEN_CLAIMS_MAX_AGE", "900"))
 
     AUTH_COOKIE_DOMAIN: Optional[str] = None
     AUTH_COOKIE_PATH: str = "/"
@@ -29,6 +37,48 @@ class Settings(BaseSettings):
     DB_POOL_TIMEOUT: int = int(os.getenv("DB_POOL_TIMEOUT", "30"))
     DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # 30m
     DB_ECHO: bool = os.getenv("DB_ECHO", "0") == "1"
+    # 为 1 时 `migrate_db.py auto`（容器入口 / systemd ExecStartPre）在启动服务前执行迁移；服务进程自身从不执行 DDL
+    DB_AUTO_MIGRATE: bool = os.getenv("DB_AUTO_MIGRATE", "0") == "1"
+    # json_data.create_timestamp 为服务器本地时间字符串，生成列按此时区解释
+    DB_TIMESTAMP_TZ: str = os.getenv("DB_TIMESTAMP_TZ", "Asia/Shanghai")
+    # 列表总数：估算行数超过阈值时返回规划器估算值（并缓存 TTL 秒），否则精确计数
+    LIST_EXACT_COUNT_THRESHOLD: int = int(os.getenv("LIST_EXACT_COUNT_THRESHOLD", "10000"))
+    LIST_COUNT_CACHE_TTL: int = int(os.getenv("LIST_COUNT_CACHE_TTL", "60"))
+    LIST_COUNT_CACHE_SIZE: int = int(os.getenv("LIST_COUNT_CACHE_SIZE", "1024"))
+    # 含中文的名称联想 / 检索走 search_postings 倒排索引（bigram）
+    SEARCH_BIGRAM_INDEX: bool = os.getenv("SEARCH_BIGRAM_INDEX", "1") == "1"
+    # 统一检索各类型并发执行（每类型占用一个连接池连接），单类型超时后返回部分结果
+    SEARCH_PARALLEL: bool = os.getenv("SEARCH_PARALLEL", "1") == "1"
+    # 线程数另受连接池容量限制：不超过 (DB_POOL_SIZE + DB_MAX_OVERFLOW) / 2
+    SEARCH_PARALLEL_WORKERS: int = int(os.getenv("SEARCH_PARALLEL_WORKERS", "4"))
+    SEARCH_TYPE_TIMEOUT_MS: int = int(os.getenv("SEARCH_TYPE_TIMEOUT_MS", "3000"))
+    # 检索分面计数：每个分面最多返回的取值数
+    SEARCH_FACET_LIMIT: int = int(os.getenv("SEARCH_FACET_LIMIT", "20"))
+    # 公开只读接口（检索 / MGID 解析 / 模板 / 词汇详情）的进程内响应缓存
+    RESPONSE_CACHE_TTL: int = int(os.getenv("RESPONSE_CACHE_TTL", "30"))
+    RESPONSE_CACHE_SIZE: int = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+    # 数据提交路径的模板编译结果缓存（模板变更时即时失效，TTL 兜住其它进程的修改）
+    COMPILED_TEMPLATE_CACHE_SIZE: int = int(os.getenv("COMPILED_TEMPLATE_CACHE_SIZE", "256"))
+    COMPILED_TEMPLATE_CACHE_TTL: int = int(os.getenv("COMPILED_TEMPLATE_CACHE_TTL", "300"))
+    # 国家 / 机构 / 用户资料内存缓存的全量重建间隔（秒）；本进程内的修改即时生效
+    REFERENCE_DATA_REFRESH_SECONDS: int = int(os.getenv("REFERENCE_DATA_REFRESH_SECONDS", "600"))
+    # 需要连续编号（不留空号）的流水号类型，逗号分隔，如 "user"；其余类型从 PostgreSQL 序列取号
+    SERIAL_NUMBER_GAPLESS_TYPES: str = os.getenv("SERIAL_NUMBER_GAPLESS_TYPES", "")
+    # 批量解析 MGID（/api/get_MGID_batch）单次最多个数
+    MGID_RESOLVE_MAX_BATCH: int = int(os.getenv("MGID_RESOLVE_MAX_BATCH", "500"))
+    # 批量提交数据（/api/development_data/bulk_submit）单次最多记录数
+    BULK_SUBMIT_MAX_RECORDS: int = int(os.getenv("BULK_SUBMIT_MAX_RECORDS", "1000"))
+    # 国家 / 机构 CSV 导入报告中最多列出的重复 / 格式错误行号数
+    LOCATION_IMPORT_REPORT_LINES: int = int(os.getenv("LOCATION_IMPORT_REPORT_LINES", "100"))
+    # 批量导入用户（/api/admin/users/bulk_import）单次最多行数
+    USER_IMPORT_MAX_ROWS: int = int(os.getenv("USER_IMPORT_MAX_ROWS", "2000"))
+    # 输入联想：单次请求的时间预算（毫秒）与内存索引全量重建间隔（秒）
+    SUGGEST_BUDGET_MS: int = int(os.getenv("SUGGEST_BUDGET_MS", "30"))
+    SUGGEST_REFRESH_SECONDS: int = int(os.getenv("SUGGEST_REFRESH_SECONDS", "600"))
+    # 词汇层级快照的全量重建间隔（秒）；本进程内的词汇写入会即时增量更新
+    TAXONOMY_REFRESH_SECONDS: int = int(os.getenv("TAXONOMY_REFRESH_SECONDS", "300"))
+    # 日志文件目录（backend.log、upload_logs.log）；目录不可写时只输出到控制台
+    LOG_DIR: str = os.getenv("LOG_DIR", "/var/log/unikorn")
 
     # MinIO (object storage) configuration (optional)
     MINIO_ENDPOINT: Optional[str] = os.getenv("MINIO_ENDPOINT")
@@ -159,10 +209,9 @@ def configure_logging():
     level = logging.INFO if settings.APP_ENV == "prod" else logging.DEBUG
     root = logging.getLogger()
     if not root.handlers:
-        log_dir = os.getenv("LOG_DIR", "/var/log/unikorn")
         try:
-            os.makedirs(log_dir, exist_ok=True)
-            handler = RotatingFileHandler(os.path.join(log_dir, "backend.log"), maxBytes=5*1024*1024, backupCount=3, encoding="utf-8")
+            os.makedirs(settings.LOG_DIR, exist_ok=True)
+            handler = RotatingFileHandler(os.path.join(settings.LOG_DIR, "backend.log"), maxBytes=5*1024*1024, backupCount=3, encoding="utf-8")
         except Exception:
             handler = logging.StreamHandler()
         fmt = logging.Formatter("[%(asctime)s] %(levelname)s %(name)s: %(message)s")
@@ -0,0 +1,6 @@
+import os
+import tempfile
+
+# settings 与 api.development_data 导入时在 LOG_DIR 下创建 backend.log / upload_logs.log；
+# 必须在导入任何后端模块之前设置，测试日志写到临时目录而不是源码树或 /var/log
+os.environ["LOG_DIR"] = tempfile.mkdtemp(prefix="mgsdb-test-logs-")
@@ -0,0 +1,105 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api import user as user_api
+from common import auth, cache, db
+from database import user_crud
+
+
+def _user(**overrides):
+    fields = dict(
+        user_name="alice",
+        user_type="admin",
+        organization="上海交通大学",
+        country="中国",
+        display_name="Alice Zhang",
+    )
+    fields.update(overrides)
+    return SimpleNamespace(**fields)
+
+
+@pytest.fixture(autouse=True)
+def _clean_auth_cache(monkeypatch):
+    monkeypatch.setattr(cache, "_user_revoked_at", {})
+    cache.auth_user_cache.clear()
+    yield
+    cache.auth_user_cache.clear()
+
+
+@pytest.fixture
+def no_db(monkeypatch):
+    def _fail(*args, **kwargs):
+        raise AssertionError("claim path must not query the users table")
+
+    monkeypatch.setattr(user_crud, "get_userinfo_by_name", _fail)
+
+
+def _payload(user, issued_at):
+    return {"sub": user.user_name, "iat": issued_at, **auth.user_claims(user)}
+
+
+def test_user_claims_include_display_name():
+    assert auth.user_claims(_user()) == {
+        "role": "admin",
+        "org": "上海交通大学",
+        "country": "中国",
+        "name": "Alice Zhang",
+    }
+
+
+def test_principal_from_fresh_claims(no_db):
+    principal = auth.load_principal(None, "alice", _payload(_user(), time.time()))
+    assert principal == auth.CurrentUser(
+        user_name="alice",
+        user_type="admin",
+        organization="上海交通大学",
+        country="中国",
+        display_name="Alice Zhang",
+    )
+    # 结果进入缓存，下一次不再解析令牌
+    assert cache.auth_user_cache.get("alice") == principal
+
+
+def test_stale_or_incomplete_claims_fall_back_to_db(monkeypatch):
+    calls = []
+
+    def _lookup(db, name):
+        calls.append(name)
+        return _user(user_type="user", display_name="From DB")
+
+    monkeypatch.setattr(user_crud, "get_userinfo_by_name", _lookup)
+    old = time.time() - auth.settings.AUTH_TOKEN_CLAIMS_MAX_AGE - 5
+    assert auth.load_principal(None, "alice", _payload(_user(), old)).user_type == "user"
+
+    cache.auth_user_cache.clear()
+    payload = _payload(_user(), time.time())
+    del payload["name"]  # 加入 name 声明之前签发的令牌
+    assert auth.load_principal(None, "alice", payload).display_name == "From DB"
+    assert calls == ["alice", "alice"]
+
+
+def test_revoked_claims_are_not_trusted(monkeypatch):
+    payload = _payload(_user(), time.time() - 1)
+    cache.invalidate_user("alice")
+    monkeypatch.setattr(user_crud, "get_userinfo_by_name", lambda db, name: None)
+    assert auth.load_principal(None, "alice", payload) is None
+
+
+def test_userinfo_through_claim_path(no_db):
+    app = FastAPI()
+    app.include_router(user_api.router)
+    app.dependency_overrides[db.get_db] = lambda: None
+    token = auth.create_access_token({"sub": "alice", **auth.user_claims(_user())})
+
+    response = TestClient(app).get("/api/userinfo/", headers={"Authorization": f"Bearer {token}"})
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "username": "alice",
+        "display_name": "Alice Zhang",
+        "user_type": "admin",
+    }
@@ -0,0 +1,106 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from common import cache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache, "time", SimpleNamespace(monotonic=clock, time=time.time))
+    return clock
+
+
+def test_entries_expire_after_ttl(clock):
+    c = cache.TTLCache("t", maxsize=10, ttl=30)
+    c.set("a", 1)
+    clock.now += 29.9
+    assert c.get("a") == 1
+    clock.now += 0.2
+    assert c.get("a") is None
+    assert c.get("a", "default") == "default"
+    assert c.stats()["size"] == 0
+    assert (c.hits, c.misses) == (1, 2)
+
+
+def test_set_refreshes_expiry(clock):
+    c = cache.TTLCache("t", maxsize=10, ttl=30)
+    c.set("a", 1)
+    clock.now += 20
+    c.set("a", 2)
+    clock.now += 20
+    assert c.get("a") == 2
+
+
+def test_lru_eviction(clock):
+    c = cache.TTLCache("t", maxsize=2, ttl=30)
+    c.set("a", 1)
+    c.set("b", 2)
+    c.get("a")  # a 变为最近使用
+    c.set("c", 3)
+    assert c.get("b") is None
+    assert (c.get("a"), c.get("c")) == (1, 3)
+    assert c.evictions == 1
+
+
+def test_invalidate_key_and_tag(clock):
+    c = cache.TTLCache("t", maxsize=10, ttl=30)
+    c.set("m1", "x", tags=["obj-1", "tpl-1"])
+    c.set("m2", "y", tags=["obj-2", "tpl-1"])
+    c.set("m3", "z", tags=["obj-3"])
+
+    c.invalidate_tag("obj-1")
+    assert c.get("m1") is None and c.get("m2") == "y"
+
+    c.invalidate_tag("tpl-1")
+    assert c.get("m2") is None and c.get("m3") == "z"
+
+    c.invalidate("m3")
+    c.invalidate("missing")
+    assert c.get("m3") is None
+    assert c.invalidations == 3
+    # 标签索引随条目清理，不残留
+    assert c._tags == {}
+
+
+def test_clear(clock):
+    c = cache.TTLCache("t", maxsize=10, ttl=30)
+    c.set("a", 1, tags=["x"])
+    c.set("b", 2)
+    c.clear()
+    assert c.stats()["size"] == 0
+    assert c.invalidations == 2
+    c.invalidate_tag("x")  # 清空后按旧标签失效不报错
+
+
+def test_invalidate_object_scopes(clock):
+    cache.word_cache.set("w1", {"w": 1})
+    cache.word_cache.set("w2", {"w": 2})
+    cache.MGID_cache.set("MG-1", {"m": 1}, tags=["w1"])
+    cache.search_cache.set("q", {"s": 1})
+
+    cache.invalidate_object("w1")
+
+    assert cache.word_cache.get("w1") is None
+    assert cache.word_cache.get("w2") == {"w": 2}
+    assert cache.MGID_cache.get("MG-1") is None
+    assert cache.search_cache.get("q") is None
+    cache.word_cache.clear()
+
+
+def test_get_cache_shares_instances(monkeypatch):
+    monkeypatch.setattr(cache, "_registry", dict(cache._registry))
+    assert cache.get_cache("word") is cache.word_cache
+    created = cache.get_cache("test-new", 5, 1.5)
+    assert cache.get_cache("test-new") is created
+    assert (created.maxsize, created.ttl) == (5, 1.5)
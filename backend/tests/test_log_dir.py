@@ -0,0 +1,33 @@
+import logging
+import os
+from pathlib import Path
+
+import api.development_data  # noqa: F401  导入时创建 upload_logs.log
+from settings import settings
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def _file_handler_paths():
+    # 只看本项目的日志文件（pytest 自身也会挂 FileHandler）
+    loggers = [logging.getLogger(), logging.getLogger("api.development_data")]
+    return [
+        Path(handler.baseFilename)
+        for logger in loggers
+        for handler in logger.handlers
+        if isinstance(handler, logging.FileHandler)
+        and Path(handler.baseFilename).name in ("backend.log", "upload_logs.log")
+    ]
+
+
+def test_file_handlers_write_under_log_dir():
+    assert settings.LOG_DIR == os.environ["LOG_DIR"]
+    paths = _file_handler_paths()
+    # 根记录器已有处理器（如 pytest 的）时 configure_logging 不再添加 backend.log
+    assert "upload_logs.log" in {p.name for p in paths}
+    for path in paths:
+        assert path.parent == Path(settings.LOG_DIR)
+
+
+def test_no_log_files_in_source_tree():
+    assert not list(BACKEND_DIR.glob("*.log"))
@@ -0,0 +1,94 @@
+import datetime
+import uuid
+
+import pytest
+from sqlalchemy import Column, DateTime, String, Uuid, create_engine
+from sqlalchemy.orm import Session, declarative_base
+
+from database import pagination
+
+Base = declarative_base()
+
+
+class Row(Base):
+    __tablename__ = "rows"
+
+    id = Column(Uuid, primary_key=True)
+    create_timestamp = Column(DateTime(timezone=True), nullable=True)
+    label = Column(String)
+
+
+@pytest.mark.parametrize(
+    "ts",
+    [
+        datetime.datetime(2024, 5, 1, 8, 30, 15, 123456, tzinfo=datetime.timezone.utc),
+        datetime.datetime(2024, 5, 1, 16, 30, tzinfo=datetime.timezone(datetime.timedelta(hours=8))),
+        "2024-05-01 08:30:15",
+        None,
+    ],
+)
+def test_cursor_round_trip(ts):
+    row_id = uuid.uuid4()
+    cursor = pagination.encode_cursor(ts, row_id)
+    assert "=" not in cursor  # URL 安全、去掉填充
+    assert pagination.decode_cursor(cursor) == (ts, row_id)
+
+
+@pytest.mark.parametrize("cursor", ["", "not-a-cursor", "eyJ0IjoxfQ", "eyJ0IjoxLCJpZCI6Im5vIn0"])
+def test_invalid_cursor(cursor):
+    with pytest.raises(pagination.InvalidCursor):
+        pagination.decode_cursor(cursor)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+
+
+def _ordered(rows):
+    # (create_timestamp DESC NULLS FIRST, id DESC)
+    return sorted(
+        rows,
+        key=lambda r: (r.create_timestamp is None, r.create_timestamp or datetime.datetime.min, r.id),
+        reverse=True,
+    )
+
+
+def test_cursor_pages_break_ties_on_id(db):
+    base = datetime.datetime(2024, 1, 1)
+    rows = []
+    # 大量相同时间戳（含 NULL），逐页翻完不重不漏
+    for i in range(23):
+        ts = None if i % 5 == 0 else base + datetime.timedelta(minutes=i % 3)
+        rows.append(Row(id=uuid.uuid4(), create_timestamp=ts, label=str(i)))
+    db.add_all(rows)
+    db.commit()
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        page, cursor = pagination.paginate(
+            db.query(Row), Row.create_timestamp, Row.id, 0, 4, cursor
+        )
+        seen.extend(page)
+        pages += 1
+        if cursor is None:
+            break
+
+    assert [r.id for r in seen] == [r.id for r in _ordered(rows)]
+    assert pages == 6
+
+
+def test_offset_first_page_continues_with_cursor(db):
+    ts = datetime.datetime(2024, 1, 1)
+    rows = [Row(id=uuid.uuid4(), create_timestamp=ts, label=str(i)) for i in range(6)]
+    db.add_all(rows)
+    db.commit()
+
+    first, cursor = pagination.paginate(db.query(Row), Row.create_timestamp, Row.id, 0, 3)
+    rest, last_cursor = pagination.paginate(db.query(Row), Row.create_timestamp, Row.id, 0, 3, cursor)
+    assert [r.id for r in first + rest] == [r.id for r in _ordered(rows)]
+    # 恰好满页时仍给出游标，下一页为空
+    assert pagination.paginate(db.query(Row), Row.create_timestamp, Row.id, 0, 3, last_cursor) == ([], None)
@@ -0,0 +1,49 @@
+import threading
+import time
+
+import bcrypt
+
+from common import constants, utils
+from common.password_hasher import PasswordHasher
+from settings import settings
+
+
+def test_bcrypt_releases_the_gil_at_configured_cost():
+    # 后台线程按配置的 cost 计算 bcrypt，主线程持续计数：若 bcrypt 持有 GIL，主线程会停顿整个哈希时长
+    salt = bcrypt.gensalt(settings.PASSWORD_HASH_ROUNDS)
+    started = time.perf_counter()
+    bcrypt.hashpw(b"warm-up", salt)
+    hash_seconds = time.perf_counter() - started
+
+    done = threading.Event()
+    worker = threading.Thread(target=lambda: (bcrypt.hashpw(b"password", salt), done.set()))
+    # 从 start() 之前开始计时：持有 GIL 时主线程会卡在 start() 里，停顿体现在第一段或最后一段间隔
+    longest_gap, last = 0.0, time.perf_counter()
+    worker.start()
+    while not done.is_set():
+        now = time.perf_counter()
+        longest_gap, last = max(longest_gap, now - last), now
+    longest_gap = max(longest_gap, time.perf_counter() - last)
+    worker.join()
+
+    assert longest_gap < hash_seconds / 2, (longest_gap, hash_seconds)
+
+
+def test_hasher_round_trip_and_stats():
+    hasher = PasswordHasher(workers=2, max_pending=8, rounds=4)
+    hashes = hasher.hash_many([f"pw{i}" for i in range(10)], chunk_size=3)
+    assert len(hashes) == 10
+    assert hasher.verify("pw3", hashes[3])
+    assert not hasher.verify("pw3", hashes[4])
+    assert not hasher.verify("pw3", "not-a-bcrypt-hash")
+    stats = hasher.stats()
+    assert stats["rejected"] == 0 and stats["queue_depth"] == 0
+
+
+def test_user_name_and_password_format():
+    assert utils.check_user_name_password("alice", "secret") is None
+    assert utils.check_user_name_password("", "secret")["status"] == utils.status.API_INVALID_USER_NAME
+    assert utils.check_user_name_password("al ice", "secret")["status"] == utils.status.API_INVALID_USER_NAME
+    too_long = "密" * (constants.PASSWORD_MAX_BYTES // 3 + 1)
+    assert utils.check_user_name_password("alice", too_long)["message"] == "password too long"
+    assert utils.check_user_name_password("alice", "")["message"] == "missing password"
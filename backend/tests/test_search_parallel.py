@@ -0,0 +1,73 @@
+import uuid
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import Column, String, Uuid, create_engine, event
+from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from database import search_crud
+
+Base = declarative_base()
+
+
+class Hit(Base):
+    __tablename__ = "hits"
+
+    id = Column(Uuid, primary_key=True)
+    kind = Column(String)
+    title = Column(String)
+
+
+@pytest.fixture
+def sessions(monkeypatch):
+    # 检索线程共用同一个 SQLite 内存库
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+
+    @event.listens_for(engine, "before_cursor_execute", retval=True)
+    def _skip_pg_settings(conn, cursor, statement, parameters, context, executemany):
+        # SQLite 没有 statement_timeout
+        if statement.startswith("SET LOCAL"):
+            return "SELECT 1", ()
+        return statement, parameters
+
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine, autoflush=False)
+    with factory() as db:
+        db.add_all(
+            [
+                Hit(id=uuid.uuid4(), kind="word", title="铝合金"),
+                Hit(id=uuid.uuid4(), kind="templete", title="铝合金拉伸模板"),
+            ]
+        )
+        db.commit()
+
+    def search_type(db, item, query, start, size, cursor=None, mode="substring"):
+        rows = db.query(Hit).filter(Hit.kind == item, Hit.title.contains(query)).all()
+        return rows, None
+
+    monkeypatch.setattr(search_crud, "SessionLocal", factory)
+    monkeypatch.setattr(search_crud, "search_type", search_type)
+    return factory
+
+
+def test_parallel_hits_survive_session_close(sessions):
+    result = search_crud.get_search_list_parallel(
+        query="铝合金", queryType=["word", "templete"], start=0, size=10
+    )
+    assert result["timedOut"] == []
+    assert [hit.title for hit in result["wordResultList"]] == ["铝合金"]
+    encoded = jsonable_encoder(result)
+    assert encoded["templateResultList"][0]["title"] == "铝合金拉伸模板"
+    assert encoded["wordResultList"][0]["kind"] == "word"
+
+
+def test_isolated_search_returns_loaded_rows(sessions):
+    # 排队类型在请求线程中串行执行时走同一函数
+    rows, next_cursor, facet = search_crud._search_type_isolated(
+        "word", "铝", 0, 10, None, "substring", 1000
+    )
+    assert next_cursor is None and facet is None
+    assert jsonable_encoder(rows)[0]["title"] == "铝合金"
@@ -0,0 +1,111 @@
+from contextlib import contextmanager
+
+import pytest
+
+from database import serialnumber_crud
+from settings import settings
+
+
+class _Result:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def first(self):
+        return self.rows[0] if self.rows else None
+
+    def scalar(self):
+        return self.rows[0][0] if self.rows else None
+
+
+class FakeDB:
+    """模拟 PostgreSQL 的序列与 serial_number 表，记录执行过的 SQL。"""
+
+    def __init__(self, counter=0, sequence=None):
+        self.counter = counter
+        self.sequence = sequence  # None 表示序列尚未创建
+        self.statements = []
+        self.init_connections = 0
+
+    def execute(self, clause, params=None):
+        sql = " ".join(str(clause).split())
+        params = params or {}
+        self.statements.append(sql)
+        if sql.startswith("CREATE SEQUENCE"):
+            if self.sequence is None:
+                self.sequence = 0
+        elif sql.startswith("SELECT setval"):
+            self.sequence = max(self.sequence, self.counter)
+        elif sql.startswith("SELECT nextval"):
+            start, self.sequence = self.sequence, self.sequence + params["c"]
+            # 与 PostgreSQL 一样不保证返回顺序
+            return _Result([(n,) for n in reversed(range(start + 1, self.sequence + 1))])
+        elif sql.startswith("SELECT to_regclass"):
+            return _Result([(None if self.sequence is None else params["n"],)])
+        elif sql.startswith("INSERT INTO serial_number") and "SELECT :t" in sql:
+            self.counter = max(self.counter, self.sequence)
+        elif sql.startswith("INSERT INTO serial_number"):
+            self.counter += params["c"]
+            return _Result([(self.counter,)])
+        return _Result([])
+
+    def get_bind(self):
+        return self
+
+    @contextmanager
+    def begin(self):
+        self.init_connections += 1
+        yield self
+
+
+@pytest.fixture(autouse=True)
+def _reset(monkeypatch):
+    monkeypatch.setattr(settings, "SERIAL_NUMBER_GAPLESS_TYPES", "user")
+    serialnumber_crud._ready.clear()
+    yield
+    serialnumber_crud._ready.clear()
+
+
+def test_sequence_mode_aligns_with_counter_and_sorts():
+    db = FakeDB(counter=41)
+    assert serialnumber_crud.allocate(db, "word", 3) == [42, 43, 44]
+    assert serialnumber_crud.get_serial_number(db, "word") == 45
+    # 建序列 / 对齐每个进程只做一次，取号不走 serial_number 表
+    assert db.init_connections == 1
+    assert not any(s.startswith("INSERT INTO serial_number") for s in db.statements)
+
+
+def test_gapless_mode_returns_contiguous_range():
+    db = FakeDB(counter=9)
+    assert serialnumber_crud.allocate(db, "user", 3) == [10, 11, 12]
+    assert serialnumber_crud.get_serial_number(db, "user") == 13
+    assert db.init_connections == 1
+    assert not any(s.startswith("SELECT nextval") for s in db.statements)
+
+
+def test_switching_to_gapless_continues_after_sequence(monkeypatch):
+    db = FakeDB(counter=5)
+    monkeypatch.setattr(settings, "SERIAL_NUMBER_GAPLESS_TYPES", "")
+    assert serialnumber_crud.allocate(db, "user", 2) == [6, 7]
+    monkeypatch.setattr(settings, "SERIAL_NUMBER_GAPLESS_TYPES", "user")
+    # 序列分配过的号码计入表中当前值，不会重号
+    assert serialnumber_crud.allocate(db, "user", 1) == [8]
+    assert db.init_connections == 2
+
+
+def test_gapless_without_sequence_skips_sync():
+    db = FakeDB(counter=0)
+    assert serialnumber_crud.allocate(db, "user") == [1]
+    assert serialnumber_crud.allocate(db, "user") == [2]
+    assert db.sequence is None
+    assert sum(s.startswith("SELECT to_regclass") for s in db.statements) == 1
+
+
+def test_non_positive_count_and_invalid_type():
+    db = FakeDB()
+    assert serialnumber_crud.allocate(db, "word", 0) == []
+    assert db.statements == []
+    with pytest.raises(ValueError):
+        serialnumber_crud.allocate(db, "word; drop table serial_number")
@@ -0,0 +1,113 @@
+import threading
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from common import taxonomy_service
+
+
+class FakeDB:
+    """按插入顺序返回词汇行；before_scan 在全量读取取得行之后调用（模拟读取期间的并发写入）。"""
+
+    def __init__(self):
+        self.rows = {}
+        self.before_scan = None
+        self._object_id = None
+
+    def put(self, word_id, **json_data):
+        self.rows[str(word_id)] = json_data
+
+    def query(self, *columns):
+        self._object_id = None
+        return self
+
+    def filter(self, *criteria):
+        for criterion in criteria:
+            if getattr(criterion.left, "key", None) == "id":
+                self._object_id = str(criterion.right.value)
+        return self
+
+    def order_by(self, *columns):
+        return self
+
+    def __iter__(self):
+        rows = [SimpleNamespace(id=k, json_data=v) for k, v in list(self.rows.items())]
+        if self.before_scan is not None:
+            self.before_scan()
+        return iter(rows)
+
+    def first(self):
+        data = self.rows.get(self._object_id)
+        return None if data is None else SimpleNamespace(id=self._object_id, json_data=data)
+
+
+@pytest.fixture
+def tree():
+    db = FakeDB()
+    root, child = str(uuid.uuid4()), str(uuid.uuid4())
+    db.put(root, name="金属", data_type="object", unit="mm")
+    db.put(child, name="铝合金", data_type="object", super_class_id=root, parent_word_id=root)
+    return db, root, child
+
+
+def test_read_returns_consistent_views_and_writes_copy(tree):
+    db, root, child = tree
+    taxonomy = taxonomy_service.TaxonomySnapshot()
+    with taxonomy.read(db) as before:
+        assert [n["id"] for n in before.children(root)] == [child]
+        assert before.flatten(child, 10)["merged"]["unit"] == "mm"
+
+    leaf = str(uuid.uuid4())
+    db.put(leaf, name="6061", super_class_id=child, parent_word_id=child)
+    db.put(root, name="金属", data_type="object", unit="m")
+    taxonomy.refresh_word(db, leaf)
+    taxonomy.refresh_word(db, root)
+
+    # 已取得的旧版本不受写入影响
+    assert [n["id"] for n in before.children(child)] == []
+    assert before.flatten(child, 10)["merged"]["unit"] == "mm"
+    with taxonomy.read(db) as after:
+        assert after.etag != before.etag
+        assert [n["id"] for n in after.children(child)] == [leaf]
+        assert after.flatten(child, 10)["merged"]["unit"] == "m"
+        assert [n["id"] for n in after.path(leaf, 10)] == [leaf, child, root]
+
+
+def test_writes_do_not_wait_for_first_load(tree):
+    db, root, child = tree
+    taxonomy = taxonomy_service.TaxonomySnapshot()
+    scanning, release = threading.Event(), threading.Event()
+
+    def block():
+        db.before_scan = None
+        scanning.set()
+        assert release.wait(5)
+
+    db.before_scan = block
+    reader = threading.Thread(target=lambda: taxonomy.read(db).__enter__())
+    reader.start()
+    assert scanning.wait(5)
+    try:
+        # 首次全量读取进行中：增量更新不被阻塞，且在替换快照时重放
+        db.put(child, name="铝", data_type="object", super_class_id=root, parent_word_id=root)
+        writer = threading.Thread(target=taxonomy.refresh_word, args=(db, child))
+        writer.start()
+        writer.join(2)
+        assert not writer.is_alive()
+    finally:
+        release.set()
+        reader.join(5)
+    with taxonomy.read(db) as view:
+        assert view.get(child)["name"] == "铝"
+
+
+def test_response_build_does_not_hold_the_lock(tree):
+    db, root, child = tree
+    taxonomy = taxonomy_service.TaxonomySnapshot()
+    with taxonomy.read(db) as view:
+        writer = threading.Thread(target=taxonomy.refresh_word, args=(db, child))
+        writer.start()
+        writer.join(2)
+        assert not writer.is_alive()
+        assert view.get(child)["name"] == "铝合金"
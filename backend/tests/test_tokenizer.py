@@ -0,0 +1,42 @@
+from common import tokenizer
+
+
+def test_document_bigrams_keep_trailing_single_char():
+    assert tokenizer.tokenize("铝合金") == ["铝合", "合金", "金"]
+
+
+def test_query_bigrams_only():
+    assert tokenizer.tokenize("铝合金", for_query=True) == ["铝合", "合金"]
+
+
+def test_single_cjk_char():
+    assert tokenizer.tokenize("铜") == ["铜"]
+    assert tokenizer.tokenize("铜", for_query=True) == ["铜"]
+
+
+def test_mixed_text_splits_runs():
+    # 非 CJK 按整词、小写；标点、下划线、空白都是分隔符
+    assert tokenizer.tokenize("Al-6061 铝合金_T6", for_query=True) == ["al", "6061", "铝合", "合金", "t6"]
+
+
+def test_nfkc_normalization():
+    # 全角字母数字归一为半角
+    assert tokenizer.tokenize("ＡＢＣ１２") == ["abc12"]
+
+
+def test_every_char_is_a_token_prefix():
+    # 单字查询用前缀匹配：文档中的每个字都是某个词元的首字
+    text = "高温合金"
+    tokens = tokenizer.tokenize(text)
+    assert all(any(t.startswith(ch) for t in tokens) for ch in text)
+
+
+def test_term_frequencies_merge_fields():
+    assert tokenizer.term_frequencies(["合金", "合金钢", None]) == {"合金": 2, "金": 1, "金钢": 1, "钢": 1}
+
+
+def test_is_cjk():
+    assert tokenizer.is_cjk("abc合")
+    assert tokenizer.is_cjk("かな")
+    assert not tokenizer.is_cjk("abc")
+    assert not tokenizer.is_cjk(None)
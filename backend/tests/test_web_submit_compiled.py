@@ -0,0 +1,136 @@
+import copy
+import json
+import random
+
+import pytest
+
+from common import constants
+from data_parser import web_submit
+
+WORD_ORDER = [
+    {"title": "名称", "type": "string", "required": True},
+    {"title": "厚度", "type": "number", "unit": "mm"},
+    {"title": "强度范围", "type": "number_range", "unit": "MPa"},
+    {"title": "牌号", "type": "enum_text"},
+    {"title": "测试日期", "type": "date"},
+    {"title": "标识", "type": "MGID"},
+    {"title": constants.MGID_CUSTOM_FIELD_TITLE, "type": "string"},
+    {"title": "照片", "type": "image"},
+    {"title": "报告", "type": "file"},
+    {"title": "", "type": "string"},  # 模板自身缺 title
+    {"title": "缺类型"},
+    {"title": "必填缺失", "type": "string", "required": True},
+    {"title": "元素", "type": "array", "order": [{"title": "元素", "type": "string"}]},
+    {
+        "title": "成分",
+        "type": "object",
+        "order": [
+            {"title": "元素", "type": "string"},
+            {"title": "含量", "type": "number", "unit": "%"},
+            {"title": "附件", "type": "file"},
+            {"title": "嵌套必填", "type": "string", "required": True},
+        ],
+    },
+    {
+        "title": "测试记录",
+        "type": "array",
+        "order": [
+            {
+                "title": "记录",
+                "type": "object",
+                "order": [
+                    {"title": "温度", "type": "number", "unit": "℃"},
+                    {"title": "曲线", "type": "array", "order": [{"title": "点", "type": "number", "unit": ""}]},
+                ],
+            }
+        ],
+    },
+]
+
+PAYLOAD = {
+    "名称": "6061 铝合金",
+    "厚度": 2.5,
+    "强度范围": {"start": 240, "end": 310, "extra": "dropped"},
+    "牌号": ["T6"],
+    "测试日期": "2024-05-01",
+    "标识": "MG-0001",
+    constants.MGID_CUSTOM_FIELD_TITLE: "custom",
+    "照片": "file:a.png:sha-a",
+    "报告": "",
+    "元素": ["Al", "Mg", "Si"],
+    "成分": {"元素": "Mg", "含量": 1.0, "附件": "file:b.pdf:sha-b"},
+    "测试记录": [{"温度": 25, "曲线": [1, 2, 3]}, {"温度": 100, "曲线": []}],
+    "模板外字段": "ignored",
+}
+
+
+def _both(word_order, post_data):
+    """返回 (解释执行结果, 编译执行结果)，各自含 (normalized, errors, data_content)。"""
+    legacy_in, compiled_in = copy.deepcopy(post_data), copy.deepcopy(post_data)
+    legacy_out, compiled_out = [], []
+    legacy = web_submit.get_development_data_rec(legacy_in, word_order, legacy_out)
+    compiled = web_submit.compile_word_order(word_order)(compiled_in, compiled_out)
+    return (legacy, legacy_out, legacy_in), (compiled, compiled_out, compiled_in)
+
+
+@pytest.mark.parametrize("as_json", [False, True])
+def test_parity_on_full_template(as_json):
+    post_data = json.dumps(PAYLOAD, ensure_ascii=False) if as_json else PAYLOAD
+    legacy, compiled = _both(WORD_ORDER, post_data)
+    assert compiled == legacy
+    (normalized, errors), content, _ = compiled
+    # 模板错误与必填缺失按模板顺序给出，嵌套对象的错误不回传
+    assert [e["field"] for e in errors] == ["<missing>", "缺类型", "必填缺失"]
+    # file / image 字段按解析出的内容改写为 file:<name>:<sha256>
+    photo = next(item["content"] for item in content if item["title"] == "照片")
+    assert normalized["照片"] == ":".join(["file", photo["name"], photo["sha256"]])
+    assert [item["title"] for item in content][:3] == ["名称", "厚度", "强度范围"]
+
+
+def test_parity_when_nested_object_is_a_json_string():
+    post_data = dict(PAYLOAD, 成分=json.dumps(PAYLOAD["成分"], ensure_ascii=False))
+    legacy, compiled = _both(WORD_ORDER, post_data)
+    assert compiled[:2] == legacy[:2]
+
+
+def test_compiled_run_does_not_reparse_nested_objects(monkeypatch):
+    run = web_submit.compile_word_order(WORD_ORDER)
+    calls = []
+    original = web_submit.safe_json_loads
+    monkeypatch.setattr(web_submit, "safe_json_loads", lambda s: calls.append(s) or original(s))
+    run(json.dumps(PAYLOAD, ensure_ascii=False), [])
+    assert len(calls) == 1
+
+
+def _random_template(rng, depth):
+    order, payload = [], {}
+    for i in range(rng.randint(1, 8)):
+        title = f"f{depth}_{i}"
+        kind = rng.choice(["string", "number", "number_range", "date", "file", "array", "object"])
+        if kind in ("array", "object") and depth == 0:
+            kind = "string"
+        item = {"title": title, "type": kind, "required": rng.random() < 0.3}
+        value = f"v{i}"
+        if kind == "number":
+            item["unit"], value = "mm", rng.random()
+        elif kind == "number_range":
+            item["unit"], value = "MPa", {"start": i, "end": i + 1}
+        elif kind == "file":
+            value = rng.choice(["", f"file:{title}.png:sha{i}"])
+        elif kind == "array":
+            item["order"] = [{"title": "x", "type": "number", "unit": "g"}]
+            value = [rng.random() for _ in range(rng.randint(0, 4))]
+        elif kind == "object":
+            item["order"], value = _random_template(rng, depth - 1)
+        order.append(item)
+        if rng.random() < 0.8:
+            payload[title] = value
+    return order, payload
+
+
+@pytest.mark.parametrize("seed", range(25))
+def test_parity_on_random_templates(seed):
+    rng = random.Random(seed)
+    word_order, payload = _random_template(rng, depth=3)
+    legacy, compiled = _both(word_order, payload)
+    assert compiled == legacy